@@ -0,0 +1,79 @@
+"""
+Per-user backup and restore.
+
+    python -m app.backup export alice -o alice.salapi
+    python -m app.backup import alice alice.salapi --replace
+
+Archives are zstd-compressed msgpack (see app/services/backup.py). Both directions
+stream, so a heavy user moves between environments without loading their rows into
+memory. The user must already exist on the importing side; logins aren't backed up.
+"""
+import argparse
+import sys
+import time
+
+from app.database import SessionLocal
+from app.models import User
+from app.services.backup import BackupError, export_user, restore_user
+
+READ_CHUNK = 1 << 20
+
+
+def _read_chunks(f):
+    return iter(lambda: f.read(READ_CHUNK), b"")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Back up or restore one user's data.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="Write a user's rows to an archive.")
+    exp.add_argument("username")
+    exp.add_argument("-o", "--output", default=None, help="Archive path (default: <username>.salapi, - for stdout).")
+    imp = sub.add_parser("import", help="Restore an archive into a user.")
+    imp.add_argument("username")
+    imp.add_argument("archive", help="Archive path (- for stdin).")
+    imp.add_argument("--replace", action="store_true", help="Delete the user's existing rows first.")
+    args = parser.parse_args(argv)
+
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == args.username).first()
+        if not user:
+            print(f"❌ No user named {args.username}; register them first.")
+            return 1
+        if args.command == "export":
+            path = args.output or f"{args.username}.salapi"
+            out = sys.stdout.buffer if path == "-" else open(path, "wb")
+            size = 0
+            try:
+                for chunk in export_user(db, user.id):
+                    out.write(chunk)
+                    size += len(chunk)
+            finally:
+                if out is not sys.stdout.buffer:
+                    out.close()
+            print(f"✅ Exported {args.username} to {path} ({size / 1024:,.0f} KB) in {time.monotonic() - started:.1f}s.", file=sys.stderr)
+            return 0
+
+        source = sys.stdin.buffer if args.archive == "-" else open(args.archive, "rb")
+        try:
+            counts = restore_user(db, user.id, _read_chunks(source), replace=args.replace)
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+        skipped = counts.pop("skipped", 0)
+        summary = ", ".join(f"{n} {name.replace('_', ' ')}" for name, n in counts.items() if n)
+        print(f"✅ Restored {args.username}: {summary or 'no rows'} in {time.monotonic() - started:.1f}s.")
+        if skipped:
+            print(f"⚠️ Skipped {skipped} budgets on categories that don't exist in this database.")
+        return 0
+    except (BackupError, OSError) as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Request
+from fastapi import HTTPException, Request
 from sqlalchemy.orm import Session
 from app.models.user import User
 from authlib.integrations.starlette_client import OAuth
@@ -13,6 +13,9 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 1 week
 
+# Comma-separated usernames allowed into /admin (operational tools)
+ADMIN_USERNAMES = {u.strip() for u in os.getenv("ADMIN_USERNAMES", "").split(",") if u.strip()}
+
 # Google OAuth Config
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
@@ -55,21 +58,31 @@ def authenticate_user(db: Session, username: str, password: str):
         return False
     return user
 
-async def get_current_user(request: Request, db: Session):
-    token = request.cookies.get("access_token")
+def username_from_token(token: Optional[str]):
+    """The username a (possibly "Bearer "-prefixed) JWT was issued to, or None if invalid."""
     if not token:
         return None
-    
+    if token.startswith("Bearer "):
+        token = token[7:]
     try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-            
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
     except JWTError:
         return None
-        
-    user = db.query(User).filter(User.username == username).first()
+    return payload.get("sub")
+
+
+async def get_current_user(request: Request, db: Session):
+    # Browsers send the cookie; API clients may send "Authorization: Bearer <token>"
+    token = request.cookies.get("access_token") or request.headers.get("authorization")
+    username = username_from_token(token)
+    if username is None:
+        return None
+    return db.query(User).filter(User.username == username).first()
+
+
+def require_admin(request: Request):
+    """Dependency for operator-only routes; 403 unless the user is in ADMIN_USERNAMES."""
+    user = getattr(request.state, "user", None)
+    if not user or user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Admin only")
     return user
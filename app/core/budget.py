@@ -0,0 +1,11 @@
+def query_budget(max_queries: int):
+    """
+    Declares the most SQL statements one request to this route may issue, checked by
+    ``python -m app.querycheck``. Put it directly above the function, under the route
+    decorator.
+    """
+    def decorate(endpoint):
+        endpoint.query_budget = max_queries
+        return endpoint
+
+    return decorate
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+
+
+class LRUCache:
+    """
+    In-process LRU with a TTL. Each worker process has its own copy, so invalidation
+    only reaches the worker that made the change; use a shared backend with several
+    workers.
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: int = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            _, value = self._data.get(key, (None, 0))
+            value = int(value or 0) + 1
+            # Counters never expire: they version other keys
+            self._data[key] = (float("inf"), value)
+            return value
+
+
+class RedisCache:
+    """Shared by every worker. Works with Redis or any server speaking its protocol."""
+
+    def __init__(self, url: str, ttl: int = 300):
+        import redis  # only needed when CACHE_URL points at a server
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        raw = self.client.get(key)
+        return None if raw is None else orjson.loads(raw)
+
+    def set(self, key, value):
+        self.client.set(key, orjson.dumps(value), ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+
+def cache_from_url(url=None, ttl=300):
+    """memory:// (or unset) -> LRUCache; redis://, rediss://, unix:// -> RedisCache."""
+    if not url or url.startswith("memory://"):
+        return LRUCache(ttl=ttl)
+    return RedisCache(url, ttl=ttl)
+
+
+cache = cache_from_url(os.getenv("CACHE_URL"), ttl=int(os.getenv("CACHE_TTL_SECONDS", "300")))
@@ -0,0 +1,163 @@
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Never carry a body, so there is nothing to compress and no length to rewrite
+BODILESS_STATUSES = (204, 304)
+
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+)
+
+
+def choose_encoding(accept_encoding: str):
+    """Picks br over gzip from an Accept-Encoding header; entries with q=0 are refused."""
+    offered = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        offered.add(name.strip())
+    if brotli is not None and "br" in offered:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+            self._gz = None
+        else:
+            self._br = None
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._br is not None:
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._br is not None:
+            return self._br.finish()
+        return self._gz.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    Brotli/gzip for text responses (pages, HTMX fragments, JSON, static CSS/JS).
+
+    Bodies under ``minimum_size`` go out as-is: small OOB fragments and toasts fit in a
+    single packet anyway, so compressing them only costs CPU. Streams (SSE) are never
+    compressed, since buffering would delay events.
+    """
+
+    def __init__(self, app, minimum_size: int = 1400, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        # HEAD responses have no body to measure, yet carry the GET's content-length
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, _CompressingSend(self, send, encoding))
+
+
+class _CompressingSend:
+    def __init__(self, middleware, send, encoding):
+        self.middleware = middleware
+        self.send = send
+        self.encoding = encoding
+        self.start = None
+        self.buffer = b""
+        self.compressor = None
+        self.passthrough = False
+
+    def _eligible(self, headers):
+        content_type = ""
+        for key, value in headers:
+            if key == b"content-encoding":
+                return False
+            if key == b"content-type":
+                content_type = value.decode("latin-1").split(";")[0].strip().lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def __call__(self, message):
+        kind = message["type"]
+        if kind == "http.response.start":
+            if message["status"] not in BODILESS_STATUSES and self._eligible(message.get("headers", [])):
+                self.start = message  # held until the first body chunk shows the size
+            else:
+                self.passthrough = True
+                await self.send(message)
+            return
+
+        if self.passthrough or kind != "http.response.body":
+            if self.start is not None:
+                await self.send(self.start)
+                self.start = None
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start is not None:
+            # Still deciding: buffer until the body is known to be small or not
+            self.buffer += body
+            if more_body and len(self.buffer) < self.middleware.minimum_size:
+                return
+            body, self.buffer = self.buffer, b""
+            start, self.start = self.start, None
+            headers = [(k, v) for k, v in start["headers"] if k != b"content-length"]
+            headers.append((b"vary", b"Accept-Encoding"))
+
+            if not more_body:
+                if len(body) >= self.middleware.minimum_size:
+                    body = self._compress_whole(body)
+                    headers.append((b"content-encoding", self.encoding.encode()))
+                headers.append((b"content-length", str(len(body)).encode()))
+                await self.send({**start, "headers": headers})
+                await self.send({"type": "http.response.body", "body": body})
+                return
+
+            # Large streamed body: compress chunk by chunk, flushing each one through
+            self.compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers.append((b"content-encoding", self.encoding.encode()))
+            await self.send({**start, "headers": headers})
+
+        chunk = self.compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _compress_whole(self, body):
+        if self.encoding == "br":
+            return brotli.compress(body, quality=self.middleware.brotli_quality)
+        return gzip.compress(body, compresslevel=self.middleware.gzip_level)
@@ -0,0 +1,75 @@
+import asyncio
+import uuid
+from collections import defaultdict
+from typing import Optional
+
+TAB_HEADER = "X-Tab-Id"
+
+
+class EventBus:
+    """
+    In-process pub/sub keyed by user id, used by the /events SSE stream.
+
+    Each open tab gets its own small queue. Events are "latest state wins", so a
+    subscriber that falls behind simply drops older events instead of blocking the
+    publisher. Subscribers only see events published by the same worker process.
+
+    Queues remember the tab they belong to, so a publish can skip the tab whose own
+    request caused it when that request's response already carries the update.
+    """
+
+    def __init__(self, max_queue_size: int = 8):
+        self.max_queue_size = max_queue_size
+        self._subscribers: dict[int, dict[asyncio.Queue, Optional[str]]] = defaultdict(dict)
+
+    def subscribe(self, user_id: int, tab: Optional[str] = None) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._subscribers[user_id][queue] = tab
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if not queues:
+            return
+        queues.pop(queue, None)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def _queues(self, user_id: int, exclude: Optional[str] = None):
+        return [
+            queue
+            for queue, tab in list(self._subscribers.get(user_id, {}).items())
+            if exclude is None or tab != exclude
+        ]
+
+    def has_subscribers(self, user_id: int, exclude: Optional[str] = None) -> bool:
+        return bool(self._queues(user_id, exclude))
+
+    def publish(self, user_id: int, event: str, data: str, exclude: Optional[str] = None):
+        for queue in self._queues(user_id, exclude):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait((event, data))
+
+
+bus = EventBus()
+
+
+def new_tab_id() -> str:
+    """Identifies one rendered page: its SSE stream and its htmx requests carry it."""
+    return uuid.uuid4().hex
+
+
+def origin_tab(request) -> Optional[str]:
+    """The tab a request came from (htmx sends TAB_HEADER), if any."""
+    return request.headers.get(TAB_HEADER) or None
+
+
+def format_sse(event: str, data: str) -> str:
+    """Encodes one server-sent event; every payload line needs its own data: prefix."""
+    lines = [f"event: {event}"]
+    lines.extend(f"data: {line}" for line in data.splitlines() or [""])
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,160 @@
+import os
+import re
+import time
+import tracemalloc
+from collections import deque
+
+from app.core.middleware import PathMatcher
+
+# Long-lived streams would hold the single sampling slot for as long as they stay open
+STREAMING_PATHS = ("/events",)
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+# Frames from the profiler itself and the import system are noise in top sites
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryProfiler:
+    """
+    On-demand tracemalloc for one worker process, switched on from /admin/memory.
+
+    While enabled, one request at a time is sampled: the peak traced memory above the
+    request's starting point is recorded against its route. Requests that arrive while
+    another is being sampled are not recorded themselves, but tracemalloc traces the whole
+    process, so whatever they allocate in the meantime still counts towards the sampled
+    request's peak. Treat per-route figures as upper bounds under concurrent load.
+    Snapshots are kept in a short ring so two points in time can be diffed to spot growth.
+    """
+
+    def __init__(self, max_snapshots: int = 5):
+        self.routes: dict[str, dict] = {}
+        self.snapshots = deque(maxlen=max_snapshots)  # (id, taken_at, snapshot)
+        self._next_snapshot_id = 1
+        self._busy = False
+
+    @property
+    def enabled(self):
+        return tracemalloc.is_tracing()
+
+    def enable(self, frames: int = 10):
+        if not self.enabled:
+            tracemalloc.start(frames)
+        self.routes.clear()
+
+    def disable(self):
+        tracemalloc.stop()
+        self.snapshots.clear()
+
+    def begin(self):
+        """Returns a baseline if this request is sampled, else None."""
+        if not self.enabled or self._busy:
+            return None
+        self._busy = True
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def end(self, route, baseline):
+        current, peak = tracemalloc.get_traced_memory()
+        self._busy = False
+        growth = max(peak - baseline, 0)
+        stats = self.routes.setdefault(route, {"count": 0, "total": 0, "max": 0, "retained": 0})
+        stats["count"] += 1
+        stats["total"] += growth
+        stats["max"] = max(stats["max"], growth)
+        stats["retained"] += current - baseline
+
+    def route_report(self):
+        rows = [
+            {
+                "route": route,
+                "requests": s["count"],
+                "peak_max_kb": round(s["max"] / 1024, 1),
+                "peak_avg_kb": round(s["total"] / s["count"] / 1024, 1),
+                "retained_kb": round(s["retained"] / 1024, 1),
+            }
+            for route, s in self.routes.items()
+        ]
+        return sorted(rows, key=lambda r: r["peak_max_kb"], reverse=True)
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+    def top_sites(self, limit: int = 20, group_by: str = "lineno"):
+        stats = self._snapshot().statistics(group_by)[:limit]
+        return [
+            {"site": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1), "blocks": stat.count}
+            for stat in stats
+        ]
+
+    def take_snapshot(self):
+        snapshot_id = self._next_snapshot_id
+        self._next_snapshot_id += 1
+        self.snapshots.append((snapshot_id, time.time(), self._snapshot()))
+        return snapshot_id
+
+    def diff(self, older=None, newer=None, limit: int = 20):
+        """Top growth between two kept snapshots (default: the last two)."""
+        by_id = {sid: snap for sid, _, snap in self.snapshots}
+        if older is None or newer is None:
+            if len(self.snapshots) < 2:
+                return None
+            older, newer = self.snapshots[-2][0], self.snapshots[-1][0]
+        if older not in by_id or newer not in by_id:
+            return None
+        stats = by_id[newer].compare_to(by_id[older], "lineno")[:limit]
+        growth = [
+            {
+                "site": str(stat.traceback[0]),
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "size_kb": round(stat.size / 1024, 1),
+                "blocks_diff": stat.count_diff,
+            }
+            for stat in stats
+        ]
+        return {"from": older, "to": newer, "growth": growth}
+
+    def status(self):
+        current, peak = tracemalloc.get_traced_memory() if self.enabled else (0, 0)
+        return {
+            "pid": os.getpid(),
+            "enabled": self.enabled,
+            "traced_kb": round(current / 1024, 1),
+            "traced_peak_kb": round(peak / 1024, 1),
+            "snapshots": [{"id": sid, "taken_at": taken} for sid, taken, _ in self.snapshots],
+            "routes": self.route_report(),
+        }
+
+
+profiler = MemoryProfiler()
+
+
+class MemoryProfileMiddleware:
+    """
+    Records per-route peak allocation while the profiler is enabled (no-op otherwise).
+    Streaming paths are never sampled.
+    """
+
+    def __init__(self, app, profiler: MemoryProfiler = profiler, streaming_paths=STREAMING_PATHS):
+        self.app = app
+        self.profiler = profiler
+        self.streaming = PathMatcher(streaming_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.enabled or self.streaming.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        baseline = self.profiler.begin()
+        if baseline is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or _ID_SEGMENT.sub("/{id}", scope["path"])
+            self.profiler.end(f"{scope['method']} {path}", baseline)
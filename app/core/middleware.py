@@ -0,0 +1,107 @@
+import re
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import JSONResponse, RedirectResponse
+
+from app.core.auth import username_from_token
+from app.database import SessionLocal, pin_to_primary
+from app.models import User
+
+# Paths anyone may reach without logging in
+PUBLIC_PATHS = ("/login", "/register", "/auth", "/static", "/favicon.ico", "/api/v1/token")
+# Authlib keeps the Google OAuth state in the session between these two requests
+SESSION_PATHS = ("/login/google", "/auth")
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class PathMatcher:
+    """
+    Prefix matching against a fixed set of paths, compiled into one regex. Prefixes match
+    whole segments: "/auth" matches "/auth" and "/auth/google" but not "/authors".
+    """
+
+    def __init__(self, prefixes):
+        alternatives = "|".join(re.escape(p.rstrip("/")) for p in sorted(prefixes, key=len, reverse=True))
+        self._pattern = re.compile(rf"(?:{alternatives})(?:/|$)")
+
+    def match(self, path: str) -> bool:
+        return self._pattern.match(path) is not None
+
+
+class AuthMiddleware:
+    """
+    Resolves the logged-in user into request.state.user and turns away anonymous requests:
+    401 JSON under /api/, a redirect to /login elsewhere.
+
+    Public paths (static files included) go straight through with no user, before any
+    cookie parsing or token decoding. Elsewhere a session is opened only when a valid
+    token names a user, and closed again before the route runs (routes that need the
+    database open their own). Mutations by a logged-in user pin the client's reads to the
+    primary on the way out.
+    """
+
+    def __init__(self, app, public_paths=PUBLIC_PATHS):
+        self.app = app
+        self.public = PathMatcher(public_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        if self.public.match(scope["path"]):
+            state["user"] = None
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        user = self._load_user(request)
+        state["user"] = user
+        if user is None:
+            if scope["path"].startswith("/api/"):
+                response = JSONResponse({"detail": "Not authenticated"}, status_code=401)
+            else:
+                response = RedirectResponse(url="/login", status_code=303)
+            await response(scope, receive, send)
+            return
+
+        if scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_pinned(message):
+            if message["type"] == "http.response.start":
+                pin_to_primary(MutableHeaders(scope=message))
+            await send(message)
+
+        await self.app(scope, receive, send_pinned)
+
+    @staticmethod
+    def _load_user(request: Request):
+        # Browsers send the cookie; API clients may send "Authorization: Bearer <token>"
+        token = request.cookies.get("access_token") or request.headers.get("authorization")
+        username = username_from_token(token)
+        if username is None:
+            return None
+        db = SessionLocal()
+        try:
+            return db.query(User).filter(User.username == username).first()
+        finally:
+            db.close()
+
+
+class PathScopedMiddleware:
+    """Runs ``middleware`` (built with ``options``) only for requests under ``paths``."""
+
+    def __init__(self, app, paths, middleware, **options):
+        self.app = app
+        self.scoped = middleware(app, **options)
+        self.paths = PathMatcher(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and self.paths.match(scope["path"]):
+            await self.scoped(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
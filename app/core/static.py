@@ -0,0 +1,79 @@
+import hashlib
+import os
+import re
+import stat
+from starlette.staticfiles import StaticFiles
+
+STATIC_DIR = "static"
+IMMUTABLE = "public, max-age=31536000, immutable"
+DIGEST_LENGTH = 10
+HASH_CHUNK = 64 * 1024
+_DIGEST = re.compile(rf"[0-9a-f]{{{DIGEST_LENGTH}}}")
+
+
+class HashedStaticFiles(StaticFiles):
+    """
+    Serves each file under a content-hashed name (css/app.css -> css/app.3f9a1c2b7d.css)
+    with a year-long immutable Cache-Control, so repeat visits never revalidate.
+    Plain names still work with normal ETag revalidation. Hashes follow the file's
+    mtime, so editing an asset in development changes its URL without a restart.
+    """
+
+    def __init__(self, directory: str = STATIC_DIR, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self._hashes: dict[str, tuple[float, str]] = {}  # resolved file -> (mtime, digest)
+
+    def _digest(self, path: str):
+        """Digest of a file inside the static directory, or None for anything else."""
+        full, stat_result = self.lookup_path(path)
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            return None
+        cached = self._hashes.get(full)
+        if cached and cached[0] == stat_result.st_mtime:
+            return cached[1]
+        sha = hashlib.sha256()
+        with open(full, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()[:DIGEST_LENGTH]
+        self._hashes[full] = (stat_result.st_mtime, digest)
+        return digest
+
+    @staticmethod
+    def _hashed_name(path: str, digest: str):
+        stem, ext = os.path.splitext(path)
+        return f"{stem}.{digest}{ext}"
+
+    def url_for(self, path: str) -> str:
+        digest = self._digest(path)
+        return "/static/" + (self._hashed_name(path, digest) if digest else path)
+
+    def _split(self, path: str):
+        """
+        css/app.3f9a1c2b7d.css -> (css/app.css, current digest matches). Only a part shaped
+        like a digest counts, so js/htmx.min.js stays js/htmx.min.js.
+        """
+        stem, ext = os.path.splitext(path)
+        stem, _, digest = stem.rpartition(".")
+        if not stem or not _DIGEST.fullmatch(digest):
+            return None, False
+        logical = stem + ext
+        current = self._digest(logical)
+        if current is None:
+            return None, False
+        return logical, current == digest
+
+    async def get_response(self, path: str, scope):
+        logical, fresh = self._split(path.replace(os.sep, "/"))
+        if logical is None:
+            return await super().get_response(path, scope)
+        # A stale hash (page rendered before a deploy) still gets the current file,
+        # just without the immutable promise
+        response = await super().get_response(logical, scope)
+        if fresh and response.status_code == 200:
+            response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+
+static_files = HashedStaticFiles(STATIC_DIR, check_dir=False)
+static_url = static_files.url_for
@@ -1,8 +1,12 @@
 from fastapi import Request
 from fastapi.templating import Jinja2Templates
+from app.core.events import new_tab_id
+from app.core.static import static_url
 
 # Initialize once here to be shared across all route files
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = static_url
+templates.env.globals["new_tab_id"] = new_tab_id
 
 def render_template(template_name: str, request: Request, context: dict = {}):
     """Base template renderer that automatically injects current_user from request state."""
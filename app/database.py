@@ -1,17 +1,60 @@
 import os
-from sqlalchemy import create_engine
+import time
+from http.cookies import SimpleCookie
+from fastapi import Request
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
-# Docker injects DATABASE_URL. Local dev defaults to SQLite.
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./local.db")
 
-# Railway/Render often use 'postgres://' which SQLAlchemy 1.4+ rejects.
-if SQLALCHEMY_DATABASE_URL and SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
-    SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+def _normalize_url(url):
+    # Railway/Render often use 'postgres://' which SQLAlchemy 1.4+ rejects.
+    if url and url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+# Docker injects DATABASE_URL. Local dev defaults to SQLite.
+SQLALCHEMY_DATABASE_URL = _normalize_url(os.getenv("DATABASE_URL", "sqlite:///./local.db"))
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replica for heavy GETs (reports, forecasts, lists). Unset: reads use the primary.
+READ_DATABASE_URL = _normalize_url(os.getenv("READ_DATABASE_URL"))
+read_engine = create_engine(READ_DATABASE_URL) if READ_DATABASE_URL else engine
+# Sessions on a replica must not write; services check db.info["read_only"]
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=read_engine, info={"read_only": read_engine is not engine}
+)
+
+# Read-your-writes: after a mutation the user's reads go to the primary for this long,
+# which must exceed the replica lag. Kept in a cookie so it holds across workers.
+PIN_COOKIE = "read_primary_until"
+PIN_TO_PRIMARY_SECONDS = int(os.getenv("PIN_TO_PRIMARY_SECONDS", "10"))
+
+
+def archive_path_for(engine):
+    """SQLite only: sibling file holding closed years of cash flows (None for memory/other DBs)."""
+    if engine.dialect.name != "sqlite" or engine.url.database in (None, "", ":memory:"):
+        return None
+    return os.getenv("ARCHIVE_DATABASE_PATH") or os.path.splitext(engine.url.database)[0] + ".archive.db"
+
+
+def attach_archive(engine, path=None):
+    """Attaches the archive file as schema "archive" on every new connection."""
+    path = path or archive_path_for(engine)
+    if path:
+        @event.listens_for(engine, "connect")
+        def _attach(dbapi_connection, _):
+            dbapi_connection.execute("ATTACH DATABASE ? AS archive", (path,))
+    return path
+
+
+ARCHIVE_DATABASE_PATH = attach_archive(engine)
+if read_engine is not engine and read_engine.dialect.name == "sqlite":
+    # Closed years only change on archive runs, so the replica reads the same file
+    attach_archive(read_engine, ARCHIVE_DATABASE_PATH)
+
 
 def get_db():
     db = SessionLocal()
@@ -19,3 +62,46 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def dialect_insert(db):
+    """The dialect's insert() for the session's engine, which has on_conflict_do_update."""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def pin_to_primary(headers):
+    """
+    Marks the client as having just written (call on responses to mutations). Takes
+    response headers: a Response's .headers or MutableHeaders over an ASGI message.
+    """
+    until = int(time.time()) + PIN_TO_PRIMARY_SECONDS
+    cookie = SimpleCookie()
+    cookie[PIN_COOKIE] = str(until)
+    cookie[PIN_COOKIE]["max-age"] = PIN_TO_PRIMARY_SECONDS
+    cookie[PIN_COOKIE]["path"] = "/"
+    cookie[PIN_COOKIE]["httponly"] = True
+    cookie[PIN_COOKIE]["samesite"] = "lax"
+    headers.append("set-cookie", cookie.output(header="").strip())
+
+
+def is_pinned_to_primary(request: Request):
+    try:
+        return float(request.cookies.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def get_read_db(request: Request):
+    """Like get_db, but served by the read replica unless the user wrote moments ago."""
+    if read_engine is engine or is_pinned_to_primary(request):
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,248 @@
+"""
+Load harness: scripted user sessions against a running instance.
+
+    python -m app.loadtest seed --users 200 --months 24
+    gunicorn main:app -k uvicorn.workers.UvicornWorker -w 2 -b 127.0.0.1:8000
+    python -m app.loadtest run --users 10,25,50 --ramp-up 10 --duration 60
+
+seed writes synthetic users (loadtest1..N, password "loadtest") with cards,
+installments and cash flows into the database DATABASE_URL points at (SQLite or
+Postgres), so run it with the same environment as the server. run starts virtual users
+evenly over the ramp-up, each looping: log in, dashboard, forecast month changes, card
+toggle, add cash flow, reports. With a comma-separated --users it runs one stage per
+level and prints p50/p95/p99 latency, throughput and error rate per route for each.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime as dt
+
+import httpx
+from dateutil.relativedelta import relativedelta
+
+USERNAME_PREFIX = "loadtest"
+PASSWORD = "loadtest"
+
+
+def seed(users=200, months=24, cards_per_user=3, installments_per_user=8, cashflows_per_month=30):
+    """Creates missing synthetic users with a realistic spread of data. Idempotent."""
+    from app.core.auth import get_password_hash
+    from app.database import engine, SessionLocal
+    from app.models import Base, User, Card, Installment, CashFlow, Category, CategoryBudget
+    from app.services.budget import rebuild_category_spend
+    from app.services.ledger import snapshot_current_state
+    from app.services.partitions import setup_partitions
+
+    Base.metadata.create_all(bind=engine)
+    setup_partitions(engine)  # the archive table the ledger baseline reads
+    rng = random.Random(42)
+    hashed = get_password_hash(PASSWORD)  # one hash for everyone: hashing dominates otherwise
+    today = date.today()
+    first_month = today.replace(day=1) - relativedelta(months=months - 1)
+
+    db = SessionLocal()
+    try:
+        category_ids = [c.id for c in db.query(Category.id).filter(Category.owner_id == None)] or [None]
+        existing = {
+            u.username
+            for u in db.query(User.username).filter(User.username.like(f"{USERNAME_PREFIX}%"))
+        }
+        created = 0
+        for n in range(1, users + 1):
+            username = f"{USERNAME_PREFIX}{n}"
+            if username in existing:
+                continue
+            user = User(username=username, email=f"{username}@example.com", hashed_password=hashed)
+            db.add(user)
+            db.flush()
+
+            cards = [
+                Card(
+                    name=f"{username}-card{c}",
+                    due_day=rng.randint(1, 28),
+                    card_limit=rng.choice([50000, 100000, 250000]),
+                    owner_id=user.id,
+                )
+                for c in range(1, cards_per_user + 1)
+            ]
+            db.add_all(cards)
+            db.flush()
+
+            for i in range(installments_per_user):
+                terms = rng.choice([1, 3, 6, 12, 24])
+                total = round(rng.uniform(1000, 60000), 2)
+                start = first_month + relativedelta(months=rng.randrange(months))
+                db.add(
+                    Installment(
+                        description=f"Purchase {i + 1}",
+                        total_amount=total,
+                        interest_rate=0.0,
+                        monthly_payment=round(total / terms, 2),
+                        payment_terms=terms,
+                        start_date=start,
+                        card_id=rng.choice(cards).id,
+                        category_id=rng.choice(category_ids),
+                        owner_id=user.id,
+                    )
+                )
+
+            rows = []
+            for m in range(months):
+                month_start = first_month + relativedelta(months=m)
+                rows.append(
+                    {"description": "Salary", "amount": 60000.0, "type": "income",
+                     "date": month_start, "category_id": category_ids[0], "owner_id": user.id}
+                )
+                for _ in range(cashflows_per_month):
+                    day = month_start + relativedelta(days=rng.randrange(28))
+                    rows.append(
+                        {"description": rng.choice(["Groceries", "Lunch", "Fuel", "Coffee", "Bills"]),
+                         "amount": round(rng.uniform(50, 3000), 2), "type": "expense",
+                         "date": day, "category_id": rng.choice(category_ids), "owner_id": user.id}
+                    )
+            db.bulk_insert_mappings(CashFlow, rows)
+            db.add_all(
+                CategoryBudget(owner_id=user.id, category_id=category_id, monthly_limit=rng.choice([5000, 10000, 20000]))
+                for category_id in set(category_ids[:3]) - {None}
+            )
+            # Bulk rows bypass the ledger hooks and the spend totals, so start both from here
+            rebuild_category_spend(db, user.id)
+            snapshot_current_state(db, user.id)
+            db.commit()
+            created += 1
+        return created
+    finally:
+        db.close()
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)  # route label -> seconds
+        self.errors = defaultdict(int)
+
+    def record(self, label, seconds, ok):
+        self.latencies[label].append(seconds)
+        if not ok:
+            self.errors[label] += 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+async def _timed(client, stats, label, method, url, ok_status=(200,), **kwargs):
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        ok = response.status_code in ok_status
+    except httpx.HTTPError:
+        response, ok = None, False
+    stats.record(label, time.perf_counter() - started, ok)
+    return response
+
+
+async def virtual_user(base_url, n, stats, stop_at, think):
+    """One scripted session, repeated until the stage ends."""
+    username = f"{USERNAME_PREFIX}{n}"
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        login = await _timed(
+            client, stats, "POST /login", "POST", "/login",
+            ok_status=(303,), data={"username": username, "password": PASSWORD},
+        )
+        if login is None or login.status_code != 303:
+            return
+        cards = await client.get("/api/v1/cards", params={"fields": "id"})
+        card_ids = [c["id"] for c in cards.json()["data"]] if cards.status_code == 200 else []
+
+        today = date.today()
+        while time.monotonic() < stop_at:
+            await _timed(client, stats, "GET /", "GET", "/")
+            for offset in (0, 1, 2):
+                month = today + relativedelta(months=offset)
+                await _timed(
+                    client, stats, "GET /get-forecast", "GET", "/get-forecast",
+                    params={"forecast_period": month.strftime("%Y-%m")},
+                )
+                await asyncio.sleep(think)
+            if card_ids:
+                await _timed(
+                    client, stats, "POST /toggle-card-status", "POST",
+                    f"/toggle-card-status/{random.choice(card_ids)}/{today.year}/{today.month}",
+                )
+            await _timed(
+                client, stats, "POST /cashflow/add", "POST", "/cashflow/add", ok_status=(303,),
+                data={"description": "Load test", "amount": "125.50", "type": "expense", "date": today.isoformat()},
+            )
+            await asyncio.sleep(think)
+            await _timed(client, stats, "GET /reports/", "GET", "/reports/")
+            await asyncio.sleep(think)
+
+
+async def run_stage(base_url, users, ramp_up, duration, think, first_user=1):
+    stats = Stats()
+    started = time.monotonic()
+    stop_at = started + ramp_up + duration
+    tasks = []
+    for i in range(users):
+        tasks.append(asyncio.create_task(virtual_user(base_url, first_user + i, stats, stop_at, think)))
+        if ramp_up and i < users - 1:
+            await asyncio.sleep(ramp_up / users)
+    await asyncio.gather(*tasks)
+    return stats, time.monotonic() - started
+
+
+def report(users, stats, elapsed):
+    print(f"\n=== {users} concurrent users, {elapsed:.1f}s ===")
+    print(f"{'route':<28}{'reqs':>7}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}")
+    total = errors = 0
+    for label in sorted(stats.latencies):
+        values = sorted(stats.latencies[label])
+        count, failed = len(values), stats.errors[label]
+        total += count
+        errors += failed
+        print(
+            f"{label:<28}{count:>7}{count / elapsed:>8.1f}"
+            f"{percentile(values, 50) * 1000:>9.0f}{percentile(values, 95) * 1000:>9.0f}"
+            f"{percentile(values, 99) * 1000:>9.0f}{failed / count:>9.1%}"
+        )
+    if total:
+        print(f"{'TOTAL':<28}{total:>7}{total / elapsed:>8.1f}{'':>27}{errors / total:>9.1%}")
+    return errors / total if total else 1.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed synthetic data or load test a running instance.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seed_cmd = sub.add_parser("seed", help="Create synthetic users in DATABASE_URL.")
+    seed_cmd.add_argument("--users", type=int, default=200)
+    seed_cmd.add_argument("--months", type=int, default=24, help="Months of cash flow history per user.")
+
+    run_cmd = sub.add_parser("run", help="Drive scripted sessions against --base-url.")
+    run_cmd.add_argument("--base-url", default="http://127.0.0.1:8000")
+    run_cmd.add_argument("--users", default="10", help="Concurrent users; comma-separated for stages, e.g. 10,25,50.")
+    run_cmd.add_argument("--ramp-up", type=float, default=10.0, help="Seconds over which users are started.")
+    run_cmd.add_argument("--duration", type=float, default=60.0, help="Seconds at full load per stage.")
+    run_cmd.add_argument("--think", type=float, default=0.5, help="Pause between page views, in seconds.")
+    args = parser.parse_args(argv)
+
+    if args.command == "seed":
+        started = dt.now()
+        created = seed(users=args.users, months=args.months)
+        print(f"✅ Seeded {created} users in {(dt.now() - started).total_seconds():.1f}s.")
+        return 0
+
+    worst = 0.0
+    for users in [int(u) for u in args.users.split(",") if u.strip()]:
+        stats, elapsed = asyncio.run(run_stage(args.base_url, users, args.ramp_up, args.duration, args.think))
+        worst = max(worst, report(users, stats, elapsed))
+    return 1 if worst > 0.01 else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
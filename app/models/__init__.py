@@ -4,8 +4,12 @@ from .card import Card, CardMonthlyStatus
 from .category import Category
 from .payee import Payee
 from .installment import Installment
-from .cashflow import CashFlow
+from .cashflow import CashFlow, ArchivedCashFlow
 from .user import User
+from .snapshot import DashboardSnapshot
+from .recurring import RecurringCashFlow, RecurringAmountChange
+from .ledger import LedgerEvent, LedgerSnapshot
+from .budget import CategoryBudget, CategorySpend
 
 __all__ = [
     "Base",
@@ -15,5 +19,13 @@ __all__ = [
     "Payee",
     "Installment",
     "CashFlow",
+    "ArchivedCashFlow",
     "User",
+    "DashboardSnapshot",
+    "RecurringCashFlow",
+    "RecurringAmountChange",
+    "LedgerEvent",
+    "LedgerSnapshot",
+    "CategoryBudget",
+    "CategorySpend",
 ]
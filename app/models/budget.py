@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, UniqueConstraint
+from .base import Base
+
+
+class CategoryBudget(Base):
+    """A user's monthly spending limit for one category (their own or a global one)."""
+
+    __tablename__ = "category_budgets"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "category_id", name="uq_category_budget_owner_category"),
+        {"extend_existing": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    monthly_limit = Column(Float, nullable=False)
+
+
+class CategorySpend(Base):
+    """Running total of a user's expense cash flows per category and month (app/services/budget.py)."""
+
+    __tablename__ = "category_spend"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "category_id", "month_year", name="uq_category_spend_owner_category_month"),
+        {"extend_existing": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    month_year = Column(String, nullable=False)  # "YYYY-MM", same format as CardMonthlyStatus
+    amount = Column(Float, nullable=False, default=0.0)
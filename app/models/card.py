@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
@@ -23,7 +23,10 @@ class Card(Base):
 
 class CardMonthlyStatus(Base):
     __tablename__ = "card_monthly_statuses"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        UniqueConstraint("card_id", "month_year", name="uq_card_monthly_status_card_month"),
+        {"extend_existing": True},
+    )
     id = Column(Integer, primary_key=True)
     card_id = Column(Integer, ForeignKey("cards.id"))
     month_year = Column(String)
@@ -1,12 +1,20 @@
-from sqlalchemy import Column, Integer, ForeignKey, String, Float, Date
+from sqlalchemy import Column, Integer, ForeignKey, String, Float, Date, Index, MetaData, Table
 from sqlalchemy.orm import relationship
 from datetime import date
 from .base import Base
 
+# Not part of Base.metadata: only exists where the SQLite archive file is attached
+archive_metadata = MetaData(schema="archive")
+
 
 class CashFlow(Base):
     __tablename__ = "cash_flows"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # Every list/report filters by owner and date range (also the Postgres partition key)
+        Index("ix_cash_flows_owner_date", "owner_id", "date"),
+        # Never reuse ids: archived rows keep theirs (see services.partitions)
+        {"extend_existing": True, "sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True)
     description = Column(String)
@@ -21,3 +29,27 @@ class CashFlow(Base):
 
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("app.models.user.User", back_populates="cash_flows")
+
+
+class ArchivedCashFlow(Base):
+    """Read-only cash flows from closed years, moved out of cash_flows by app.partition archive."""
+    __table__ = Table(
+        "cash_flows",
+        archive_metadata,
+        Column("id", Integer, primary_key=True),
+        Column("description", String),
+        Column("amount", Float, nullable=False),
+        Column("type", String),
+        Column("date", Date),
+        Column("category_id", Integer),
+        Column("owner_id", Integer),
+        Index("ix_archive_cash_flows_owner_date", "owner_id", "date"),
+    )
+
+    is_archived = True
+
+    category = relationship(
+        "app.models.category.Category",
+        primaryjoin="foreign(ArchivedCashFlow.category_id) == Category.id",
+        viewonly=True,
+    )
@@ -1,13 +1,28 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Index, text, literal_column
 from sqlalchemy.orm import relationship
 from datetime import date, datetime as dt
 from dateutil.relativedelta import relativedelta
 from .base import Base
 
 
+# Rendered inline (not as a bound parameter) so the planner can match it against the
+# partial index below; use `Installment.status == ACTIVE_STATUS` in hot queries.
+ACTIVE_STATUS = literal_column("'active'")
+
+
 class Installment(Base):
     __tablename__ = "installments"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # Only live debt is indexed, so per-request scans track active rows, not history
+        Index(
+            "ix_installments_active_owner",
+            "owner_id",
+            "start_date",
+            sqlite_where=text("status = 'active'"),
+            postgresql_where=text("status = 'active'"),
+        ),
+        {"extend_existing": True},
+    )
 
     id = Column(Integer, primary_key=True)
     description = Column(String)
@@ -16,7 +31,7 @@ class Installment(Base):
     monthly_payment = Column(Float)
     payment_terms = Column(Integer)
     start_date = Column(Date)
-    status = Column(String, default="active")
+    status = Column(String, default="active")  # "active" -> "completed" (app/services/lifecycle.py)
     created_at = Column(DateTime, default=dt.now)
     updated_at = Column(DateTime, default=dt.now, onupdate=dt.now)
 
@@ -57,9 +72,9 @@ class Installment(Base):
         """Uses payment_terms as the primary source of truth."""
         return self.payment_terms if self.payment_terms else 1
 
-    def get_progress(self):
-        """Calculates current payment progress."""
-        today = date.today()
+    def get_progress(self, as_of=None):
+        """Calculates current payment progress (optionally as of a given date)."""
+        today = as_of or date.today()
         total = self.total_months_count
 
         if today < self.start_date:
@@ -75,11 +90,11 @@ class Installment(Base):
             "total": total,
         }
 
-    def get_remaining_balance(self):
+    def get_remaining_balance(self, as_of=None):
         """
         Calculates remaining debt based on the Total Amount to Pay (including interest).
         """
-        progress = self.get_progress()
+        progress = self.get_progress(as_of)
         # Remaining = (Principal + Total Interest) - (Monthly Payment * Months Paid)
         remaining = self.total_to_pay - (self.monthly_payment * progress["current"])
         return max(round(remaining, 2), 0)
\ No newline at end of file
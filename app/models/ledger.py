@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from datetime import datetime as dt
+from .base import Base
+
+
+class LedgerEvent(Base):
+    """
+    One append-only change to a user's ledger rows (see app/services/ledger.py).
+    ``before``/``after`` hold the row's columns; inserts have no before, deletes no after.
+    """
+
+    __tablename__ = "ledger_events"
+    __table_args__ = (
+        Index("ix_ledger_events_owner_id", "owner_id", "id"),
+        {"extend_existing": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entity = Column(String, nullable=False)  # "installment", "cashflow", "card", "card_status", ...
+    entity_id = Column(Integer, nullable=True)
+    action = Column(String, nullable=False)  # "insert", "update" or "delete"
+    before = Column(JSON, nullable=True)
+    after = Column(JSON, nullable=True)
+    occurred_at = Column(DateTime, default=dt.now, nullable=False)
+
+
+class LedgerSnapshot(Base):
+    """Folded ledger state for one user up to and including ``last_event_id``."""
+
+    __tablename__ = "ledger_snapshots"
+    __table_args__ = (
+        Index("ix_ledger_snapshots_owner_event", "owner_id", "last_event_id"),
+        {"extend_existing": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    last_event_id = Column(Integer, nullable=False, default=0)
+    state = Column(JSON)
+    taken_at = Column(DateTime, default=dt.now, nullable=False)
@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from datetime import datetime as dt
+from .base import Base
+
+FREQUENCIES = ("monthly", "biweekly", "yearly")
+
+
+class RecurringCashFlow(Base):
+    """A repeating income/expense stored once and expanded on read (app/services/recurring.py)."""
+
+    __tablename__ = "recurring_cash_flows"
+    __table_args__ = {"extend_existing": True}
+
+    id = Column(Integer, primary_key=True)
+    description = Column(String)
+    amount = Column(Float, nullable=False)
+    type = Column(String)  # "income" or "expense", same as CashFlow.type
+    frequency = Column(String, default="monthly")
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=True)  # None = repeats forever
+    created_at = Column(DateTime, default=dt.now)
+
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    category = relationship("app.models.category.Category")
+
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
+
+    amount_changes = relationship(
+        "RecurringAmountChange",
+        back_populates="rule",
+        order_by="RecurringAmountChange.effective_date",
+        cascade="all, delete-orphan",
+    )
+
+
+class RecurringAmountChange(Base):
+    """New amount for every occurrence of a rule on or after effective_date."""
+
+    __tablename__ = "recurring_amount_changes"
+    __table_args__ = {"extend_existing": True}
+
+    id = Column(Integer, primary_key=True)
+    rule_id = Column(Integer, ForeignKey("recurring_cash_flows.id"))
+    effective_date = Column(Date, nullable=False)
+    amount = Column(Float, nullable=False)
+
+    rule = relationship("RecurringCashFlow", back_populates="amount_changes")
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, UniqueConstraint
+from datetime import datetime as dt
+from .base import Base
+
+
+class DashboardSnapshot(Base):
+    """Precomputed dashboard numbers for one user and one month (see app/precompute.py)."""
+
+    __tablename__ = "dashboard_snapshots"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "month_year", name="uq_dashboard_snapshot_owner_month"),
+        {"extend_existing": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
+    month_year = Column(String)  # "YYYY-MM", same format as CardMonthlyStatus
+    payload = Column(JSON)
+    computed_at = Column(DateTime, default=dt.now)
@@ -0,0 +1,43 @@
+"""
+Cash flow history maintenance.
+
+    python -m app.partition migrate                 # Postgres, one-off
+    python -m app.partition archive --before 2025   # SQLite, e.g. every January
+
+migrate rebuilds cash_flows as a yearly range-partitioned table; new yearly partitions
+are then created at startup. archive moves closed years into the attached archive file.
+"""
+import argparse
+
+from app.database import engine
+from app.services.partitions import archive_closed_years, migrate_to_partitions
+from app.services.search import setup_search_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partition or archive historical cash flows.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="Postgres: partition cash_flows by year.")
+    archive = sub.add_parser("archive", help="SQLite: move closed years to the archive file.")
+    archive.add_argument("--before", type=int, default=None, help="Archive years before this one (default: current year).")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "migrate":
+            if migrate_to_partitions(engine):
+                # Search triggers stayed on the old table; put them on the new one
+                setup_search_index(engine)
+                print("✅ cash_flows is now partitioned by year.")
+            else:
+                print("✅ cash_flows is already partitioned.")
+        else:
+            moved = archive_closed_years(engine, args.before)
+            print(f"✅ Archived {moved} cash flows.")
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+"""
+Nightly batch: precompute every user's dashboard and ledger snapshots.
+
+    python -m app.precompute --workers 4 --chunk-size 200 --months 2 --resume
+
+Users are split into id-ordered chunks and each chunk runs in a worker process,
+so total time scales with the number of cores rather than the number of users.
+With --resume, users whose snapshots were already written today are skipped,
+which makes an interrupted run safe to restart.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime as dt
+
+from app.database import engine, SessionLocal
+from app.models import User, DashboardSnapshot
+from app.services.lifecycle import sync_installment_status
+from app.services.ledger import take_snapshot
+from app.services.snapshot import save_dashboard_snapshot, snapshot_months
+
+
+def _init_worker():
+    # Connections inherited from the parent process must not be shared.
+    engine.dispose(close=False)
+
+
+def precompute_chunk(user_ids, months):
+    """Worker entry point: writes snapshots for one chunk of users."""
+    db = SessionLocal()
+    failed = []
+    try:
+        for user_id in user_ids:
+            try:
+                for year, month in months:
+                    save_dashboard_snapshot(db, user_id, year, month)
+                if take_snapshot(db, user_id):
+                    db.commit()
+            except Exception as e:
+                db.rollback()
+                failed.append((user_id, str(e)))
+    finally:
+        db.close()
+    return len(user_ids), failed
+
+
+def pending_user_ids(db, months, resume=False):
+    """Active user ids in id order, minus those already done today when resuming."""
+    user_ids = [
+        row.id
+        for row in db.query(User.id).filter(User.is_active == True).order_by(User.id)
+    ]
+    if not resume:
+        return user_ids
+
+    month_keys = [f"{y}-{m:02d}" for y, m in months]
+    today_start = dt.combine(date.today(), dt.min.time())
+    done_counts = {}
+    for row in db.query(DashboardSnapshot.owner_id).filter(
+        DashboardSnapshot.month_year.in_(month_keys),
+        DashboardSnapshot.computed_at >= today_start,
+    ):
+        done_counts[row.owner_id] = done_counts.get(row.owner_id, 0) + 1
+
+    return [uid for uid in user_ids if done_counts.get(uid, 0) < len(month_keys)]
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def run(workers=None, chunk_size=200, months_ahead=2, resume=False):
+    months = list(snapshot_months(months_ahead))
+
+    db = SessionLocal()
+    try:
+        # Retire finished installments first so snapshots only scan live debt
+        completed, _ = sync_installment_status(db)
+        db.commit()
+        if completed:
+            print(f"✅ Marked {completed} finished installments as completed.")
+        user_ids = pending_user_ids(db, months, resume=resume)
+    finally:
+        db.close()
+
+    total = len(user_ids)
+    if not total:
+        print("✅ Nothing to precompute.")
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    print(f"⏳ Precomputing {total} users × {len(months)} months with {workers} workers...")
+
+    started = time.monotonic()
+    done = 0
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [
+            pool.submit(precompute_chunk, chunk, months)
+            for chunk in chunked(user_ids, chunk_size)
+        ]
+        for future in as_completed(futures):
+            count, failed = future.result()
+            done += count
+            failures.extend(failed)
+            elapsed = time.monotonic() - started
+            print(f"   {done}/{total} users ({done / total:.0%}) in {elapsed:.1f}s")
+
+    for user_id, error in failures:
+        print(f"❌ User {user_id} failed: {error}")
+    print(f"✅ Precompute finished: {done - len(failures)} ok, {len(failures)} failed.")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute dashboard snapshots for all users.")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count).")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Users per worker task.")
+    parser.add_argument("--months", type=int, default=2, help="Months to precompute, starting with the current one.")
+    parser.add_argument("--resume", action="store_true", help="Skip users already precomputed today.")
+    args = parser.parse_args(argv)
+
+    return run(
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        months_ahead=args.months,
+        resume=args.resume,
+    )
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
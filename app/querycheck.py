@@ -0,0 +1,128 @@
+"""
+SQL query budgets: fails when a route issues more statements than it declares.
+
+    python -m app.querycheck            # exits 1 and prints the statements on a breach
+    python -m app.querycheck --verbose  # also lists every route's statements
+
+Routes opt in with @query_budget(n) (app.core.budget). Each is requested through the
+FastAPI test client against a throwaway SQLite database seeded with one synthetic user
+(app.loadtest seed data). Every route is requested twice and the second, warm request
+is measured, so one-off work like a dashboard snapshot miss doesn't count; N+1 patterns
+(lazy relationships in loops or templates) grow with the data and do.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date
+
+# Month used for period/forecast parameters and card toggles
+TODAY = date.today()
+PERIOD = TODAY.strftime("%Y-%m")
+
+# (method, route path) -> request kwargs; {card_id} is filled from the seeded user
+SCENARIOS = {
+    ("GET", "/"): {},
+    ("GET", "/get-forecast"): {"params": {"forecast_period": PERIOD}},
+    ("POST", "/toggle-card-status/{card_id}/{year}/{month}"): {
+        "url": f"/toggle-card-status/{{card_id}}/{TODAY.year}/{TODAY.month}",
+    },
+    ("GET", "/installments/"): {},
+    ("GET", "/installments/list"): {},
+    ("GET", "/installments/add"): {},
+    ("GET", "/cashflow/"): {"params": {"period": PERIOD}},
+    ("GET", "/cashflow/add"): {},
+    ("POST", "/cashflow/add"): {
+        "data": {"description": "Budget check", "amount": "10", "type": "expense", "date": TODAY.isoformat()},
+    },
+    ("GET", "/cashflow/recurring"): {},
+    ("GET", "/reports/"): {"params": {"period": PERIOD}},
+    ("GET", "/settings/"): {},
+    ("GET", "/search/"): {"params": {"q": "lunch"}},
+    ("GET", "/calendar/"): {"params": {"months": 12}},
+}
+
+
+def budgeted_routes(app):
+    for route in app.routes:
+        budget = getattr(getattr(route, "endpoint", None), "query_budget", None)
+        if budget is None:
+            continue
+        for method in sorted(route.methods - {"HEAD"}):
+            yield method, route.path, budget
+
+
+def check(verbose=False):
+    # The engine binds at import, so point it at a scratch database first
+    workdir = tempfile.mkdtemp(prefix="querycheck-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/querycheck.db"
+    os.environ.pop("READ_DATABASE_URL", None)
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from main import app
+    from app.database import engine, SessionLocal
+    from app.loadtest import seed, USERNAME_PREFIX, PASSWORD
+    from app.models import Card, User
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    failures = 0
+    with TestClient(app) as client:
+        seed(users=1, months=6)
+        username = f"{USERNAME_PREFIX}1"
+        login = client.post("/login", data={"username": username, "password": PASSWORD}, follow_redirects=False)
+        client.cookies.set("access_token", login.cookies.get("access_token"))
+        db = SessionLocal()
+        try:
+            card_id = db.query(Card.id).join(User, User.id == Card.owner_id).filter(User.username == username).first()[0]
+        finally:
+            db.close()
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            for method, path, budget in budgeted_routes(app):
+                scenario = SCENARIOS.get((method, path))
+                if scenario is None:
+                    print(f"❌ {method} {path}: declares a budget but has no scenario in app.querycheck")
+                    failures += 1
+                    continue
+                kwargs = dict(scenario)
+                url = kwargs.pop("url", path).format(card_id=card_id)
+
+                for _ in range(2):
+                    statements.clear()
+                    response = client.request(method, url, follow_redirects=False, **kwargs)
+                count = len(statements)
+
+                ok = response.status_code < 400 and count <= budget
+                mark = "✅" if ok else "❌"
+                print(f"{mark} {method} {path}: {count}/{budget} queries (HTTP {response.status_code})")
+                if not ok:
+                    failures += 1
+                if verbose or not ok:
+                    for n, statement in enumerate(statements, 1):
+                        print(f"     {n:>2}. {' '.join(statement.split())}")
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check per-route SQL query budgets.")
+    parser.add_argument("--verbose", action="store_true", help="Print every route's statements.")
+    args = parser.parse_args(argv)
+
+    failures = check(verbose=args.verbose)
+    if failures:
+        print(f"❌ {failures} route(s) over budget.")
+        return 1
+    print("✅ All routes within their query budgets.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,11 @@ from .forecast import router as forecast_router
 from .settings import router as settings_router
 from .auth import router as auth_router
 from .reports import router as reports_router
+from .events import router as events_router
+from .search import router as search_router
+from .api import router as api_router
+from .admin import router as admin_router
+from .calendar import router as calendar_router
 
 __all__ = [
     "cashflow_router",
@@ -13,4 +18,9 @@ __all__ = [
     "settings_router",
     "auth_router",
     "reports_router",
+    "events_router",
+    "search_router",
+    "api_router",
+    "admin_router",
+    "calendar_router",
 ]
@@ -0,0 +1,60 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Form, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+
+from app.core.auth import require_admin
+from app.core.memprof import profiler
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)],
+    default_response_class=ORJSONResponse,
+)
+
+
+@router.get("/memory")
+async def memory_status():
+    """This worker's tracing state and per-route peak allocation (check "pid" per worker)."""
+    return profiler.status()
+
+
+@router.post("/memory/enable")
+async def memory_enable(frames: int = Form(10)):
+    profiler.enable(frames=max(1, min(frames, 50)))
+    return profiler.status()
+
+
+@router.post("/memory/disable")
+async def memory_disable():
+    profiler.disable()
+    return profiler.status()
+
+
+@router.get("/memory/top")
+async def memory_top(limit: int = Query(20, ge=1, le=200), group_by: str = Query("lineno")):
+    if not profiler.enabled:
+        raise HTTPException(status_code=409, detail="Tracing is off; POST /admin/memory/enable first")
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    return {"sites": profiler.top_sites(limit=limit, group_by=group_by)}
+
+
+@router.post("/memory/snapshot")
+async def memory_snapshot():
+    if not profiler.enabled:
+        raise HTTPException(status_code=409, detail="Tracing is off; POST /admin/memory/enable first")
+    return {"id": profiler.take_snapshot()}
+
+
+@router.get("/memory/diff")
+async def memory_diff(
+    older: Optional[int] = Query(None, alias="from"),
+    newer: Optional[int] = Query(None, alias="to"),
+    limit: int = Query(20, ge=1, le=200),
+):
+    """Allocation growth between two snapshots (default: the last two taken)."""
+    result = profiler.diff(older, newer, limit=limit)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Need two kept snapshots to diff")
+    return result
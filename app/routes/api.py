@@ -0,0 +1,400 @@
+import base64
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, Form, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.database import get_db, get_read_db
+from app.models import Installment, CashFlow, Card, Payee, Category, LedgerEvent
+from app.core.auth import authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.services.dashboard import get_dashboard_data
+from app.services.balance import get_balance_page, get_balance_series
+from app.services.calendar import get_payment_calendar, MAX_MONTHS
+from app.services.charts import get_chart_data, DEFAULT_POINTS, MAX_POINTS
+from app.services.ledger import get_ledger_summary
+from app.services.analytics import refresh as refresh_analytics, cashflow_report, card_report
+from app.services.reference import get_user_cards, get_user_categories
+
+router = APIRouter(prefix="/api/v1", tags=["API v1"], default_response_class=ORJSONResponse)
+
+MAX_LIMIT = 200
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+# Field name -> getter. Keys double as the whitelist for ?fields=
+INSTALLMENT_FIELDS = {
+    "id": lambda i: i.id,
+    "description": lambda i: i.description,
+    "total_amount": lambda i: i.total_amount,
+    "interest_rate": lambda i: i.interest_rate,
+    "monthly_payment": lambda i: i.monthly_payment,
+    "payment_terms": lambda i: i.payment_terms,
+    "start_date": lambda i: i.start_date,
+    "end_date": lambda i: i.end_date,
+    "status": lambda i: i.status,
+    "card_id": lambda i: i.card_id,
+    "payee_id": lambda i: i.payee_id,
+    "category_id": lambda i: i.category_id,
+    "remaining_balance": lambda i: i.get_remaining_balance(),
+    "progress": lambda i: i.get_progress(),
+    "created_at": lambda i: i.created_at,
+    "updated_at": lambda i: i.updated_at,
+}
+
+CASHFLOW_FIELDS = {
+    "id": lambda c: c.id,
+    "description": lambda c: c.description,
+    "amount": lambda c: c.amount,
+    "type": lambda c: c.type,
+    "date": lambda c: c.date,
+    "category_id": lambda c: c.category_id,
+}
+
+CARD_FIELDS = {
+    "id": lambda c: c.id,
+    "name": lambda c: c.name,
+    "due_day": lambda c: c.due_day,
+    "card_limit": lambda c: c.card_limit,
+    "color": lambda c: c.color,
+}
+
+PAYEE_FIELDS = {
+    "id": lambda p: p.id,
+    "name": lambda p: p.name,
+    "is_global": lambda p: p.owner_id is None,
+}
+
+CATEGORY_FIELDS = {
+    "id": lambda c: c.id,
+    "name": lambda c: c.name,
+    "color": lambda c: c.color,
+    "is_global": lambda c: c.owner_id is None,
+}
+
+LEDGER_EVENT_FIELDS = {
+    "id": lambda e: e.id,
+    "entity": lambda e: e.entity,
+    "entity_id": lambda e: e.entity_id,
+    "action": lambda e: e.action,
+    "before": lambda e: e.before,
+    "after": lambda e: e.after,
+    "occurred_at": lambda e: e.occurred_at,
+}
+
+
+def parse_fields(fields: Optional[str], allowed: dict):
+    """Resolves ?fields=a,b into getters; unknown names are a 400, not silently dropped."""
+    if not fields:
+        return allowed
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [n for n in names if n not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return {n: allowed[n] for n in names}
+
+
+def serialize(obj, getters: dict):
+    return {name: getter(obj) for name, getter in getters.items()}
+
+
+def encode_cursor(last_id) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_key_cursor(on, last_id: int) -> str:
+    """Cursor for (date, id) keysets."""
+    return encode_cursor(f"{on.isoformat()}:{last_id}")
+
+
+def decode_key_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        on, last_id = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+        return date.fromisoformat(on), int(last_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query, model, fields, cursor, limit, getters):
+    """Keyset pagination on id (newest first): no OFFSET scans, stable under inserts."""
+    if cursor:
+        query = query.filter(model.id < decode_cursor(cursor))
+    rows = query.order_by(model.id.desc()).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    chosen = parse_fields(fields, getters)
+    return {
+        "data": [serialize(r, chosen) for r in rows],
+        "next_cursor": encode_cursor(rows[-1].id) if has_more else None,
+    }
+
+
+@router.post("/token")
+async def issue_token(
+    username: str = Form(...),
+    password: str = Form(...),
+    db: Session = Depends(get_db),
+):
+    """Exchanges credentials for a bearer token (send as "Authorization: Bearer <token>")."""
+    user = authenticate_user(db, username, password)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+
+    access_token = create_access_token(
+        data={"sub": user.username},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+@router.get("/installments")
+async def list_installments(
+    request: Request,
+    fields: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    status: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    user = request.state.user
+    query = db.query(Installment).filter(Installment.owner_id == user.id)
+    if status:
+        query = query.filter(Installment.status == status)
+    return paginate(query, Installment, fields, cursor, limit, INSTALLMENT_FIELDS)
+
+
+@router.get("/cashflows")
+async def list_cashflows(
+    request: Request,
+    fields: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    tx_type: Optional[str] = Query(None, alias="type"),
+    db: Session = Depends(get_db),
+):
+    user = request.state.user
+    query = db.query(CashFlow).filter(CashFlow.owner_id == user.id)
+    if tx_type:
+        query = query.filter(CashFlow.type == tx_type)
+    return paginate(query, CashFlow, fields, cursor, limit, CASHFLOW_FIELDS)
+
+
+@router.get("/cashflows/balance")
+async def list_cashflows_with_balance(
+    request: Request,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    tx_type: Optional[str] = Query(None, alias="type"),
+    category_id: Optional[int] = Query(None),
+    db: Session = Depends(get_read_db),
+):
+    """Cash flows newest first by date, each with the running balance after it."""
+    user = request.state.user
+    key = decode_key_cursor(cursor) if cursor else None
+    rows, next_key = get_balance_page(db, user.id, key, limit, start, end, tx_type, category_id)
+    return {"data": rows, "next_cursor": encode_key_cursor(*next_key) if next_key else None}
+
+
+@router.get("/cashflows/balance/series")
+async def cashflow_balance_series(
+    request: Request,
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    db: Session = Depends(get_read_db),
+):
+    """Closing balance for every day with cash flows in [start, end]."""
+    user = request.state.user
+    return {"series": get_balance_series(db, user.id, start, end)}
+
+
+@router.get("/cards")
+async def list_cards(
+    request: Request,
+    fields: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    user = request.state.user
+    query = db.query(Card).filter(Card.owner_id == user.id)
+    return paginate(query, Card, fields, cursor, limit, CARD_FIELDS)
+
+
+@router.get("/payees")
+async def list_payees(
+    request: Request,
+    fields: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    user = request.state.user
+    query = db.query(Payee).filter(or_(Payee.owner_id == user.id, Payee.owner_id == None))
+    return paginate(query, Payee, fields, cursor, limit, PAYEE_FIELDS)
+
+
+@router.get("/categories")
+async def list_categories(
+    request: Request,
+    fields: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    user = request.state.user
+    query = db.query(Category).filter(or_(Category.owner_id == user.id, Category.owner_id == None))
+    return paginate(query, Category, fields, cursor, limit, CATEGORY_FIELDS)
+
+
+@router.get("/dashboard")
+async def dashboard_snapshot(
+    request: Request,
+    fields: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """Everything the index page renders, from the same batched queries."""
+    user = request.state.user
+    dashboard = get_dashboard_data(db, user.id)
+    stats = dashboard["stats"]
+    installment_getters = parse_fields(fields, INSTALLMENT_FIELDS)
+
+    return {
+        "month": {"year": stats["year"], "month": stats["month"], "name": stats["month_name"]},
+        "totals": {
+            "total_due": stats["total_due"],
+            "total_burn": stats["total_burn"],
+            "total_paid": stats["total_paid"],
+            "total_remaining_debt": stats["total_remaining_debt"],
+            "percentage_paid": stats["percentage_paid"],
+            "savings_delta": stats["savings_delta"],
+            "percent_drop": stats["percent_drop"],
+        },
+        "pending_cards": stats["pending_cards"],
+        "paid_cards": stats["paid_cards"],
+        "recent_cashflow": [serialize(c, CASHFLOW_FIELDS) for c in dashboard["recent_cashflow"]],
+        "installments": [serialize(i, installment_getters) for i in dashboard["installments"]],
+    }
+
+
+@router.get("/charts")
+async def chart_data(
+    request: Request,
+    series: str = Query("spending,income,balance"),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    bucket: str = Query("day"),
+    points: int = Query(DEFAULT_POINTS, ge=3, le=MAX_POINTS),
+    db: Session = Depends(get_read_db),
+):
+    """Spending, income, balance and debt per day/week/month, LTTB-downsampled to ``points``."""
+    user = request.state.user
+    names = [s.strip() for s in series.split(",") if s.strip()]
+    try:
+        return get_chart_data(db, user.id, names, start, end, bucket, points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/calendar")
+async def payment_calendar(
+    request: Request,
+    start: Optional[str] = Query(None, pattern=MONTH_PATTERN),  # YYYY-MM
+    months: int = Query(1, ge=1, le=MAX_MONTHS),
+    db: Session = Depends(get_db),
+):
+    """Card due dates with amount owed and paid/pending status, one block per month."""
+    user = request.state.user
+    year, month = map(int, start.split("-")) if start else (None, None)
+    return {"months": get_payment_calendar(db, user.id, year, month, months)}
+
+
+@router.get("/ledger/events")
+async def list_ledger_events(
+    request: Request,
+    fields: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    entity: Optional[str] = Query(None),
+    entity_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """Audit trail, newest first; filter by entity ("installment", "cashflow", ...) and id."""
+    user = request.state.user
+    query = db.query(LedgerEvent).filter(LedgerEvent.owner_id == user.id)
+    if entity:
+        query = query.filter(LedgerEvent.entity == entity)
+    if entity_id is not None:
+        query = query.filter(LedgerEvent.entity_id == entity_id)
+    return paginate(query, LedgerEvent, fields, cursor, limit, LEDGER_EVENT_FIELDS)
+
+
+@router.get("/ledger/state")
+async def ledger_state_as_of(
+    request: Request,
+    as_of: Optional[datetime] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """Cash totals, card dues and remaining debt as the ledger stood at ``as_of`` (default: now)."""
+    user = request.state.user
+    return get_ledger_summary(db, user.id, as_of)
+
+
+@router.get("/analytics/cashflows")
+async def analytics_cashflows(
+    request: Request,
+    group: str = Query("category,month,type"),
+    start: Optional[str] = Query(None, pattern=MONTH_PATTERN),  # YYYY-MM, inclusive
+    end: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    tx_type: Optional[str] = Query(None, alias="type"),
+    db: Session = Depends(get_read_db),
+):
+    """Cash flow totals grouped by any of year, month, type and category, from the columnar store."""
+    user = request.state.user
+    started = time.perf_counter()
+    dims = [g.strip() for g in group.split(",") if g.strip()]
+    path = refresh_analytics(db, user.id)
+    try:
+        rows = cashflow_report(path, dims, start, end, tx_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if "category" in dims:
+        names = {c.id: c.name for c in get_user_categories(db, user.id)}
+        for row in rows:
+            row["category"] = names.get(row["category"], "Uncategorized")
+    return {"group": dims, "rows": rows, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+@router.get("/analytics/cards")
+async def analytics_cards(
+    request: Request,
+    start: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    end: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    db: Session = Depends(get_read_db),
+):
+    """Installment billing per card and month, from the columnar store."""
+    user = request.state.user
+    started = time.perf_counter()
+    rows = card_report(refresh_analytics(db, user.id), start, end)
+
+    names = {c.id: c.name for c in get_user_cards(db, user.id)}
+    for row in rows:
+        row["card"] = names.get(row["card"], "Unknown")
+    return {"rows": rows, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
@@ -0,0 +1,53 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Request, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_read_db
+from app.services.calendar import get_payment_calendar, MAX_MONTHS
+from app.core.ui import render_template
+from app.core.budget import query_budget
+
+router = APIRouter(prefix="/calendar", tags=["calendar"])
+
+
+def parse_start(start: Optional[str]):
+    """"YYYY-MM" -> (year, month); anything else falls back to the current month."""
+    today = date.today()
+    if start and start.strip():
+        try:
+            y, m = map(int, start.split("-"))
+            if 1 <= m <= 12:
+                return y, m
+        except ValueError:
+            pass
+    return today.year, today.month
+
+
+@router.get("/")
+@query_budget(4)
+async def calendar_page(
+    request: Request,
+    start: Optional[str] = Query(None),  # YYYY-MM
+    months: int = Query(3, ge=1, le=MAX_MONTHS),
+    db: Session = Depends(get_read_db),
+):
+    user = request.state.user
+    year, month = parse_start(start)
+    schedule = get_payment_calendar(db, user.id, year, month, months)
+
+    prev_idx = year * 12 + month - 1 - months
+    next_idx = year * 12 + month - 1 + months
+    return render_template(
+        "calendar.html",
+        request,
+        {
+            "schedule": schedule,
+            "months": months,
+            "start": f"{year}-{month:02d}",
+            "prev_start": f"{prev_idx // 12}-{prev_idx % 12 + 1:02d}",
+            "next_start": f"{next_idx // 12}-{next_idx % 12 + 1:02d}",
+            "grand_total": round(sum(m["total"] for m in schedule), 2),
+            "today": date.today(),
+        },
+    )
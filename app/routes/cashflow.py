@@ -1,17 +1,26 @@
 from fastapi import APIRouter, Request, Depends, Form, Query
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, or_
+from sqlalchemy import func, extract
 from datetime import date, datetime as dt
 from typing import Optional
 
 from app.database import get_db
-from app.models import CashFlow, Category
+from app.models import CashFlow, Category, RecurringCashFlow, RecurringAmountChange
+from app.models.recurring import FREQUENCIES
+from app.services.cashflow import iter_cashflow_entries, month_bounds
+from app.services.reference import get_user_categories
+from app.services.debt import publish_data_changed
+from app.services.budget import record_cashflow_spend
+from app.services.balance import get_running_balances
+from app.core.budget import query_budget
 
 router = APIRouter(prefix="/cashflow", tags=["cashflow"])
 
 
 @router.get("/")
+# The running balances add one window-function query on top of the list
+@query_budget(6)
 async def show_all_cashflow(
     request: Request,
     db: Session = Depends(get_db),
@@ -20,12 +29,12 @@ async def show_all_cashflow(
     tx_type: Optional[str] = Query(None, alias="type")
 ):
     user = request.state.user
-    query = db.query(CashFlow).filter(CashFlow.owner_id == user.id)
+    start, end = None, None
 
     if period and period.strip():
         try:
             y, m = map(int, period.split("-"))
-            query = query.filter(extract('year', CashFlow.date) == y, extract('month', CashFlow.date) == m)
+            start, end = month_bounds(y, m)
         except:
             pass
     
@@ -33,24 +42,31 @@ async def show_all_cashflow(
     if category_id and category_id.strip():
         try:
             cat_id_int = int(category_id)
-            query = query.filter(CashFlow.category_id == cat_id_int)
         except:
             pass
-    
-    if tx_type:
-        query = query.filter(CashFlow.type == tx_type)
 
-    transactions = query.order_by(CashFlow.date.desc()).all()
+    # One pass over real rows + expanded recurring occurrences
+    transactions = []
+    total_income = 0.0
+    total_expense = 0.0
+    for tx in iter_cashflow_entries(db, user.id, start, end, tx_type or None, cat_id_int):
+        transactions.append(tx)
+        if tx.type == "income":
+            total_income += tx.amount
+        elif tx.type == "expense":
+            total_expense += tx.amount
+    transactions.reverse()  # newest first
     
     # Categories: show user's categories or global ones (though we should migrate to user-only)
-    categories = db.query(Category).filter(or_(Category.owner_id == user.id, Category.owner_id == None)).all()
+    categories = get_user_categories(db, user.id)
 
-    total_income = sum(t.amount for t in transactions if t.type == "income")
-    total_expense = sum(t.amount for t in transactions if t.type == "expense")
     net_balance = total_income - total_expense
 
-    from app.services.debt import calculate_monthly_totals
-    stats = calculate_monthly_totals(db, user_id=user.id)
+    # Balance after each real row, over all history (recurring occurrences have none)
+    balances = get_running_balances(db, user.id, start, end)
+
+    from app.services.snapshot import get_dashboard_summary
+    stats = get_dashboard_summary(db, user.id)
 
     from app.core.ui import render_template
     return render_template(
@@ -62,6 +78,7 @@ async def show_all_cashflow(
             "total_income": total_income,
             "total_expense": total_expense,
             "net_balance": net_balance,
+            "balances": balances,
             "filter_period": period,
             "filter_cat": cat_id_int,
             "filter_type": tx_type,
@@ -71,9 +88,10 @@ async def show_all_cashflow(
 
 
 @router.get("/add")
+@query_budget(2)
 async def add_cashflow_form(request: Request, db: Session = Depends(get_db)):
     user = request.state.user
-    categories = db.query(Category).filter(or_(Category.owner_id == user.id, Category.owner_id == None)).all()
+    categories = get_user_categories(db, user.id)
     current_date = date.today().strftime("%Y-%m-%d")
 
     from app.core.ui import render_template
@@ -85,6 +103,7 @@ async def add_cashflow_form(request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/add")
+@query_budget(4)
 async def create_cashflow(
     request: Request,
     description: str = Form(...),
@@ -92,6 +111,8 @@ async def create_cashflow(
     transaction_type: str = Form(..., alias="type"),
     category_id: int = Form(None),
     date_str: str = Form(None, alias="date"),
+    frequency: str = Form(None, alias="repeat"),
+    until_str: str = Form(None, alias="until"),
     db: Session = Depends(get_db),
 ):
     user = request.state.user
@@ -100,6 +121,27 @@ async def create_cashflow(
     except ValueError:
         entry_date = date.today()
 
+    if frequency in FREQUENCIES:
+        # Stored once as a rule; occurrences are expanded on read
+        try:
+            end_date = date.fromisoformat(until_str) if until_str else None
+        except ValueError:
+            end_date = None
+
+        db.add(RecurringCashFlow(
+            description=description,
+            amount=amount,
+            type=transaction_type,
+            frequency=frequency,
+            start_date=entry_date,
+            end_date=end_date,
+            category_id=category_id if category_id else None,
+            owner_id=user.id
+        ))
+        db.commit()
+        publish_data_changed(db, user.id)
+        return RedirectResponse(url="/cashflow/recurring", status_code=303)
+
     new_entry = CashFlow(
         description=description,
         amount=amount,
@@ -110,7 +152,9 @@ async def create_cashflow(
     )
 
     db.add(new_entry)
+    record_cashflow_spend(db, user.id, new_entry)
     db.commit()
+    publish_data_changed(db, user.id)
 
     return RedirectResponse(url="/", status_code=303)
 
@@ -131,12 +175,15 @@ async def update_transaction(
     if not tx:
         return RedirectResponse(url="/cashflow/?error=not_found", status_code=303)
 
+    record_cashflow_spend(db, user.id, tx, -1)
     tx.description = description.strip()
     tx.amount = abs(amount)
     tx.category_id = category_id if category_id else None
     tx.type = transaction_type
+    record_cashflow_spend(db, user.id, tx)
 
     db.commit()
+    publish_data_changed(db, user.id)
     return RedirectResponse(url="/cashflow/", status_code=303)
 
 
@@ -146,7 +193,87 @@ async def delete_transaction(request: Request, transaction_id: int, db: Session
     tx = db.query(CashFlow).filter(CashFlow.id == transaction_id, CashFlow.owner_id == user.id).first()
 
     if tx:
+        record_cashflow_spend(db, user.id, tx, -1)
         db.delete(tx)
         db.commit()
+        publish_data_changed(db, user.id)
 
     return RedirectResponse(url="/cashflow/", status_code=303)
+
+
+@router.get("/recurring")
+@query_budget(3)
+async def list_recurring(request: Request, db: Session = Depends(get_db)):
+    user = request.state.user
+    rules = (
+        db.query(RecurringCashFlow)
+        .filter(RecurringCashFlow.owner_id == user.id)
+        .order_by(RecurringCashFlow.start_date.desc())
+        .all()
+    )
+
+    from app.core.ui import render_template
+    return render_template(
+        "cashflow/recurring.html",
+        request,
+        {"rules": rules, "today": date.today().strftime("%Y-%m-%d")},
+    )
+
+
+@router.post("/recurring/{rule_id}/amount")
+async def change_recurring_amount(
+    request: Request,
+    rule_id: int,
+    amount: float = Form(...),
+    effective_str: str = Form(..., alias="effective_date"),
+    db: Session = Depends(get_db),
+):
+    user = request.state.user
+    rule = db.query(RecurringCashFlow).filter(RecurringCashFlow.id == rule_id, RecurringCashFlow.owner_id == user.id).first()
+
+    if not rule:
+        return RedirectResponse(url="/cashflow/recurring?error=not_found", status_code=303)
+
+    try:
+        effective_date = date.fromisoformat(effective_str)
+    except ValueError:
+        effective_date = date.today()
+
+    db.add(RecurringAmountChange(rule_id=rule.id, effective_date=effective_date, amount=abs(amount)))
+    db.commit()
+    publish_data_changed(db, user.id)
+    return RedirectResponse(url="/cashflow/recurring", status_code=303)
+
+
+@router.post("/recurring/{rule_id}/end")
+async def end_recurring(
+    request: Request,
+    rule_id: int,
+    end_str: str = Form(None, alias="end_date"),
+    db: Session = Depends(get_db),
+):
+    user = request.state.user
+    rule = db.query(RecurringCashFlow).filter(RecurringCashFlow.id == rule_id, RecurringCashFlow.owner_id == user.id).first()
+
+    if rule:
+        try:
+            rule.end_date = date.fromisoformat(end_str) if end_str else date.today()
+        except ValueError:
+            rule.end_date = date.today()
+        db.commit()
+        publish_data_changed(db, user.id)
+
+    return RedirectResponse(url="/cashflow/recurring", status_code=303)
+
+
+@router.post("/recurring/delete/{rule_id}")
+async def delete_recurring(request: Request, rule_id: int, db: Session = Depends(get_db)):
+    user = request.state.user
+    rule = db.query(RecurringCashFlow).filter(RecurringCashFlow.id == rule_id, RecurringCashFlow.owner_id == user.id).first()
+
+    if rule:
+        db.delete(rule)
+        db.commit()
+        publish_data_changed(db, user.id)
+
+    return RedirectResponse(url="/cashflow/recurring", status_code=303)
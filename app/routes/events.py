@@ -0,0 +1,38 @@
+import asyncio
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.events import bus, format_sse
+from app.services.reminders import scheduler
+
+router = APIRouter(tags=["events"])
+
+KEEPALIVE_SECONDS = 15
+
+
+@router.get("/events")
+async def event_stream(request: Request):
+    """Server-sent events: OOB fragments pushed when this user's data changes, plus due reminders."""
+    user = request.state.user
+    queue = bus.subscribe(user.id, request.query_params.get("tab"))
+    scheduler.track(user.id)
+
+    async def stream():
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event, data)
+        finally:
+            bus.unsubscribe(user.id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
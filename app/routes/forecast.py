@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends, Request, Query, Response
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Form, Request, Query, Response
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
-from datetime import datetime as dt
-
-from app.database import get_db
-from app.services.debt import calculate_monthly_totals, get_global_updates_fragment
+from datetime import date, datetime as dt
+
+from app.database import get_db, get_read_db
+from app.services.debt import (
+    calculate_monthly_totals,
+    get_global_updates_fragment,
+    publish_data_changed,
+    card_months_up_to,
+    bulk_set_card_status,
+)
+from app.services.lifecycle import sync_installment_status
+from app.services.snapshot import invalidate_dashboard_snapshots
 from app.models import CardMonthlyStatus, Card
+from app.core.budget import query_budget
+from app.core.events import origin_tab
 from fastapi.templating import Jinja2Templates
 
 templates = Jinja2Templates(directory="templates")
@@ -13,11 +24,25 @@ templates = Jinja2Templates(directory="templates")
 router = APIRouter()
 
 
+def _parse_month(value):
+    """(year, month) from "YYYY-MM"; ValueError unless it names a real month."""
+    y, m = map(int, value.split("-"))
+    date(y, m, 1)
+    return y, m
+
+
+def _if_current(stats, year, month):
+    """``stats`` if they are for this month, which is what other tabs are sent."""
+    today = date.today()
+    return stats if (year, month) == (today.year, today.month) else None
+
+
 @router.get("/get-forecast", response_class=HTMLResponse)
+@query_budget(4)
 async def get_forecast(
     request: Request,
     forecast_period: str = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     user = request.state.user
     year, month = None, None
@@ -34,7 +59,9 @@ async def get_forecast(
         },
     ).body.decode()
 
-    global_updates = get_global_updates_fragment(db, stats["year"], stats["month"], user_id=user.id)
+    global_updates = get_global_updates_fragment(
+        db, stats["year"], stats["month"], user_id=user.id, stats=stats
+    )
 
     return HTMLResponse(content=forecast_html + global_updates)
 
@@ -42,6 +69,7 @@ async def get_forecast(
 @router.post(
     "/toggle-card-status/{card_id}/{year}/{month}", response_class=HTMLResponse
 )
+@query_budget(11)
 async def toggle_card_status(
     request: Request, card_id: int, year: int, month: int, db: Session = Depends(get_db)
 ):
@@ -70,9 +98,12 @@ async def toggle_card_status(
         )
         db.add(status_obj)
 
+    sync_installment_status(db, user.id)
+    invalidate_dashboard_snapshots(db, user.id)
     db.commit()
 
     stats = calculate_monthly_totals(db, year, month, user_id=user.id)
+    publish_data_changed(db, user.id, origin=origin_tab(request), stats=_if_current(stats, year, month))
 
     status_container_html = templates.TemplateResponse(
         "partials/card_status_container.html",
@@ -85,6 +116,64 @@ async def toggle_card_status(
     ).body.decode()
 
     msg = f"{card.name} Updated!"
-    global_html = get_global_updates_fragment(db, year, month, toast_msg=msg, user_id=user.id)
+    global_html = get_global_updates_fragment(
+        db, year, month, toast_msg=msg, user_id=user.id, stats=stats
+    )
+
+    return HTMLResponse(content=status_container_html + global_html)
+
+
+@router.post("/bulk-card-status", response_class=HTMLResponse)
+async def bulk_card_status(
+    request: Request,
+    year: int = Form(...),
+    month: int = Form(...),
+    pairs: List[str] = Form([]),
+    up_to: Optional[str] = Form(None),
+    is_paid: bool = Form(True),
+    db: Session = Depends(get_db),
+):
+    """
+    Settles many card-months at once. Send ``pairs`` as repeated "card_id:YYYY-MM"
+    values and/or ``up_to=YYYY-MM`` for every card with dues up to that month.
+    ``year``/``month`` is the month currently on screen; its fragments are rendered once.
+    """
+    user = request.state.user
+
+    try:
+        targets = set()
+        for pair in pairs:
+            card_id, month_year = pair.split(":", 1)
+            y, m = _parse_month(month_year)
+            targets.add((int(card_id), f"{y}-{m:02d}"))
+        if up_to:
+            targets |= card_months_up_to(db, user.id, *_parse_month(up_to))
+    except ValueError:
+        return Response(status_code=400)
+
+    updated = bulk_set_card_status(db, user.id, targets, is_paid=is_paid)
+    sync_installment_status(db, user.id)
+    if updated:
+        invalidate_dashboard_snapshots(db, user.id)
+    db.commit()
+
+    stats = calculate_monthly_totals(db, year, month, user_id=user.id)
+    publish_data_changed(db, user.id, origin=origin_tab(request), stats=_if_current(stats, year, month))
+
+    status_container_html = templates.TemplateResponse(
+        "partials/card_status_container.html",
+        {
+            "request": request,
+            "year": year,
+            "month": month,
+            **stats,
+        },
+    ).body.decode()
+
+    label = "paid" if is_paid else "pending"
+    msg = f"{updated} card-month{'s' if updated != 1 else ''} marked {label}!"
+    global_html = get_global_updates_fragment(
+        db, year, month, toast_msg=msg, user_id=user.id, stats=stats
+    )
 
     return HTMLResponse(content=status_container_html + global_html)
@@ -3,19 +3,25 @@ from typing import Optional
 from fastapi import APIRouter, Depends, Form, Request, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
 from dateutil.relativedelta import relativedelta
 
-from app.database import get_db
-from app.models import Installment, Card, Payee, Category
-from app.services.debt import calculate_monthly_totals, get_global_updates_fragment
+from app.database import get_db, get_read_db
+from app.models import Installment
+from app.core.events import origin_tab
+from app.services.debt import get_global_updates_fragment, publish_data_changed
+from app.services.cards import check_card_limit
+from app.services.lifecycle import sync_installment_status
+from app.services.reference import get_user_cards, get_user_payees, get_user_categories
+from app.services.snapshot import get_dashboard_summary, invalidate_dashboard_snapshots
 from app.core.ui import templates
+from app.core.budget import query_budget
 
 router = APIRouter(prefix="/installments", tags=["Installments"])
 
 
 @router.get("/")
-async def list_all_installments(request: Request, db: Session = Depends(get_db)):
+@query_budget(4)
+async def list_all_installments(request: Request, db: Session = Depends(get_read_db)):
     user = request.state.user
     installments = (
         db.query(Installment)
@@ -25,14 +31,14 @@ async def list_all_installments(request: Request, db: Session = Depends(get_db))
         .all()
     )
 
-    stats = calculate_monthly_totals(db, user_id=user.id)
+    stats = get_dashboard_summary(db, user.id)
     total_remaining = stats["total_remaining_debt"]
     total_due = stats["total_due"]
     active_count = len([i for i in installments if i.status == "active"])
 
-    cards = db.query(Card).filter(Card.owner_id == user.id).order_by(Card.name).all()
-    payees = db.query(Payee).filter(or_(Payee.owner_id == user.id, Payee.owner_id == None)).order_by(Payee.name).all()
-    categories = db.query(Category).filter(or_(Category.owner_id == user.id, Category.owner_id == None)).all()
+    cards = get_user_cards(db, user.id)
+    payees = get_user_payees(db, user.id)
+    categories = get_user_categories(db, user.id)
 
     from app.core.ui import render_template
     return render_template(
@@ -43,6 +49,7 @@ async def list_all_installments(request: Request, db: Session = Depends(get_db))
             "total_remaining": total_remaining,
             "total_due": total_due,
             "active_count": active_count,
+            "card_utilization": stats["card_utilization"],
             "cards": cards,
             "categories": categories,
             "payees": payees,
@@ -51,11 +58,12 @@ async def list_all_installments(request: Request, db: Session = Depends(get_db))
 
 
 @router.get("/add", response_class=HTMLResponse)
-async def add_installment_form(request: Request, db: Session = Depends(get_db)):
+@query_budget(2)
+async def add_installment_form(request: Request, db: Session = Depends(get_read_db)):
     user = request.state.user
-    cards = db.query(Card).filter(Card.owner_id == user.id).order_by(Card.name).all()
-    payees = db.query(Payee).filter(or_(Payee.owner_id == user.id, Payee.owner_id == None)).order_by(Payee.name).all()
-    categories = db.query(Category).filter(or_(Category.owner_id == user.id, Category.owner_id == None)).all()
+    cards = get_user_cards(db, user.id)
+    payees = get_user_payees(db, user.id)
+    categories = get_user_categories(db, user.id)
     
     payment_terms = [
         {"label": "Straight", "value": 1},
@@ -82,7 +90,8 @@ async def add_installment_form(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/list", response_class=HTMLResponse)
-async def get_installments_list(request: Request, db: Session = Depends(get_db)):
+@query_budget(4)
+async def get_installments_list(request: Request, db: Session = Depends(get_read_db)):
     user = request.state.user
     records = (
         db.query(Installment)
@@ -91,7 +100,7 @@ async def get_installments_list(request: Request, db: Session = Depends(get_db))
         .order_by(Installment.start_date.desc())
         .all()
     )
-    stats = calculate_monthly_totals(db, user_id=user.id)
+    stats = get_dashboard_summary(db, user.id)
 
     from app.core.ui import render_template
     return render_template(
@@ -120,6 +129,9 @@ async def create_installment(
     total_interest_amt = total_amount * (interest_rate / 100) * total_months
     monthly_payment = (total_amount + total_interest_amt) / total_months
 
+    # Checked before the insert so the aggregate reflects the card's existing debt only
+    limit_warning = check_card_limit(db, user.id, card_id, monthly_payment * total_months)
+
     new_item = Installment(
         description=description,
         total_amount=total_amount,
@@ -135,9 +147,16 @@ async def create_installment(
     )
 
     db.add(new_item)
+    db.flush()
+    sync_installment_status(db, user.id)
+    invalidate_dashboard_snapshots(db, user.id)
     db.commit()
+    publish_data_changed(db, user.id)
 
-    return RedirectResponse(url="/installments/", status_code=303)
+    response = RedirectResponse(url="/installments/", status_code=303)
+    if limit_warning:
+        response.set_cookie(key="toast_msg", value=limit_warning)
+    return response
 
 
 @router.delete("/{rec_id}", response_class=HTMLResponse)
@@ -148,7 +167,9 @@ async def delete_installment_htmx(
     item = db.query(Installment).filter(Installment.id == rec_id, Installment.owner_id == user.id).first()
     if item:
         db.delete(item)
+        invalidate_dashboard_snapshots(db, user.id)
         db.commit()
+        publish_data_changed(db, user.id, origin=origin_tab(request))
 
     now = dt.now()
     return get_global_updates_fragment(
@@ -157,9 +178,9 @@ async def delete_installment_htmx(
 
 
 @router.get("/options/cards")
-async def get_card_options(request: Request, db: Session = Depends(get_db)):
+async def get_card_options(request: Request, db: Session = Depends(get_read_db)):
     user = request.state.user
-    cards = db.query(Card).filter(Card.owner_id == user.id).order_by(Card.name).all()
+    cards = get_user_cards(db, user.id)
     return HTMLResponse(
         "".join([f'<option value="{c.id}">{c.name}</option>' for c in cards])
     )
@@ -195,7 +216,11 @@ async def update_installment(
     inst.monthly_payment = (total_amount + interest_rate) / months
     inst.start_date = dt.strptime(start_date_str, "%Y-%m").date()
 
+    db.flush()
+    sync_installment_status(db, user.id)
+    invalidate_dashboard_snapshots(db, user.id)
     db.commit()
+    publish_data_changed(db, user.id)
     return RedirectResponse(url="/installments/", status_code=303)
 
 
@@ -208,6 +233,8 @@ async def delete_installment_redirect(request: Request, installment_id: int, db:
         return RedirectResponse(url="/installments/?error=not_found", status_code=303)
 
     db.delete(inst)
+    invalidate_dashboard_snapshots(db, user.id)
     db.commit()
+    publish_data_changed(db, user.id)
 
     return RedirectResponse(url="/installments/", status_code=303)
@@ -4,10 +4,9 @@ import base64
 from fastapi import APIRouter, Request, UploadFile, File, Depends
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 
 from app.database import get_db
-from app.models import Category
+from app.services.reference import get_user_categories
 
 router = APIRouter(prefix="/receipt", tags=["receipt"])
 
@@ -30,9 +29,7 @@ async def scan_receipt(
     user = request.state.user
 
     # Load user's categories for context
-    categories = db.query(Category).filter(
-        or_(Category.owner_id == user.id, Category.owner_id == None)
-    ).all()
+    categories = get_user_categories(db, user.id)
     category_names = [c.name for c in categories]
 
     # Read image bytes
@@ -4,46 +4,52 @@ from sqlalchemy import or_
 from typing import Optional
 from datetime import datetime as dt
 
-from app.database import get_db
-from app.models import CashFlow, Category
-from app.services.debt import calculate_monthly_totals
+from app.database import get_read_db
+from app.services.cashflow import iter_cashflow_entries, month_bounds
+from app.services.snapshot import get_dashboard_summary
+from app.services.budget import get_budget_status
 from app.core.ui import render_template
+from app.core.budget import query_budget
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
 
 @router.get("/")
+@query_budget(5)
 async def reports_page(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     period: Optional[str] = Query(None),  # YYYY-MM
     tx_type: Optional[str] = Query(None, alias="type"),
 ):
     user = request.state.user
-    from sqlalchemy import extract
-
-    query = db.query(CashFlow).filter(CashFlow.owner_id == user.id)
+    start, end = None, None
+    y, m = None, None
 
     if period and period.strip():
         try:
             y, m = map(int, period.split("-"))
-            query = query.filter(
-                extract("year", CashFlow.date) == y,
-                extract("month", CashFlow.date) == m,
-            )
+            start, end = month_bounds(y, m)
         except Exception:
-            pass
+            y, m = None, None
 
-    if tx_type and tx_type.strip():
-        query = query.filter(CashFlow.type == tx_type)
+    type_filter = tx_type if tx_type and tx_type.strip() else None
 
-    transactions = query.order_by(CashFlow.date.desc()).all()
-
-    # Build category breakdown
+    # Build category breakdown and totals in one pass over real + recurring entries
     category_totals: dict[str, dict] = {}
     uncategorized_total = 0.0
+    uncategorized_count = 0
+    transaction_count = 0
+    total_income = 0.0
+    total_expense = 0.0
+
+    for tx in iter_cashflow_entries(db, user.id, start, end, type_filter):
+        transaction_count += 1
+        if tx.type == "income":
+            total_income += tx.amount
+        elif tx.type == "expense":
+            total_expense += tx.amount
 
-    for tx in transactions:
         if tx.category:
             key = tx.category.name
             if key not in category_totals:
@@ -57,13 +63,14 @@ async def reports_page(
             category_totals[key]["count"] += 1
         else:
             uncategorized_total += tx.amount
+            uncategorized_count += 1
 
     if uncategorized_total > 0:
         category_totals["Uncategorized"] = {
             "name": "Uncategorized",
             "color": "#94a3b8",
             "total": uncategorized_total,
-            "count": sum(1 for t in transactions if not t.category),
+            "count": uncategorized_count,
         }
 
     grand_total = sum(v["total"] for v in category_totals.values())
@@ -74,11 +81,12 @@ async def reports_page(
         item["percentage"] = round((item["total"] / grand_total * 100), 1) if grand_total > 0 else 0
         breakdown.append(item)
 
-    total_income = sum(t.amount for t in transactions if t.type == "income")
-    total_expense = sum(t.amount for t in transactions if t.type == "expense")
     net_balance = total_income - total_expense
 
-    stats = calculate_monthly_totals(db, user_id=user.id)
+    stats = get_dashboard_summary(db, user.id)
+
+    # Budgets cover one month: the filtered one, or this month for all-time views
+    budgets = get_budget_status(db, user.id, y, m)
 
     # Month name for display
     month_label = None
@@ -100,7 +108,9 @@ async def reports_page(
             "filter_period": period,
             "filter_type": tx_type,
             "month_label": month_label,
-            "transaction_count": len(transactions),
+            "transaction_count": transaction_count,
+            "budgets": budgets,
+            "budget_label": month_label or dt.now().strftime("%B %Y"),
             **stats,
         },
     )
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Request, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.services.search import search
+from app.core.ui import render_template
+from app.core.budget import query_budget
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+PER_PAGE = 20
+
+
+@router.get("/")
+@query_budget(4)
+async def search_page(
+    request: Request,
+    q: str = Query(""),
+    page: int = Query(1, ge=1),
+    db: Session = Depends(get_db),
+):
+    user = request.state.user
+    results, has_more = search(db, user.id, q, page=page, per_page=PER_PAGE)
+
+    context = {"q": q, "results": results, "page": page, "has_more": has_more}
+
+    # HTMX keystrokes and "load more" only need the result rows
+    if "hx-request" in request.headers:
+        return render_template("partials/search_results.html", request, context)
+    return render_template("search.html", request, context)
@@ -1,18 +1,27 @@
-from fastapi import APIRouter, Depends, Form, Request, HTTPException
+from datetime import date
+from fastapi import APIRouter, Depends, File, Form, Request, HTTPException, UploadFile
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from fastapi.responses import RedirectResponse, Response
-from app.database import get_db
-from app.models import Card, Category, Payee, Installment, CashFlow
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from app.database import get_db, SessionLocal
+from app.models import Card, Category, Payee, Installment, CashFlow, ArchivedCashFlow
+from app.services.debt import publish_data_changed
+from app.services.partitions import touches_archive
+from app.services.reference import get_user_cards, get_user_payees, get_user_categories
+from app.services.snapshot import invalidate_dashboard_snapshots
+from app.services.budget import set_category_budget, get_user_budgets, delete_category_budget_rows
+from app.services.backup import BackupError, export_user, restore_user, CONTENT_TYPE as BACKUP_CONTENT_TYPE
+from app.core.budget import query_budget
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
 @router.get("/")
+@query_budget(2)
 async def settings_page(request: Request, db: Session = Depends(get_db)):
     user = request.state.user
-    cards = db.query(Card).filter(Card.owner_id == user.id).order_by(Card.name).all()
-    payees = db.query(Payee).filter(or_(Payee.owner_id == user.id, Payee.owner_id == None)).order_by(Payee.name).all()
-    categories = db.query(Category).filter(or_(Category.owner_id == user.id, Category.owner_id == None)).order_by(Category.name).all()
+    cards = get_user_cards(db, user.id)
+    payees = get_user_payees(db, user.id)
+    categories = get_user_categories(db, user.id)
+    budgets = get_user_budgets(db, user.id)
 
     from app.core.ui import render_template
     return render_template(
@@ -22,6 +31,7 @@ async def settings_page(request: Request, db: Session = Depends(get_db)):
             "cards": cards,
             "payees": payees,
             "categories": categories,
+            "budgets": budgets,
         },
     )
 
@@ -37,7 +47,9 @@ async def add_card(
 ):
     user = request.state.user
     db.add(Card(name=name, due_day=due_day, card_limit=card_limit, color=color, owner_id=user.id))
+    invalidate_dashboard_snapshots(db, user.id)
     db.commit()
+    publish_data_changed(db, user.id)
     redirect_url = request.headers.get("referer", "/installments/")
     response = RedirectResponse(url=redirect_url, status_code=303)
     response.set_cookie(key="toast_msg", value="Credit Card added successfully!")
@@ -52,6 +64,7 @@ async def add_category(
     new_cat = Category(name=name, color=color, owner_id=user.id)
     db.add(new_cat)
     db.commit()
+    publish_data_changed(db, user.id)
     redirect_url = request.headers.get("referer", "/installments/")
     response = RedirectResponse(url=redirect_url, status_code=303)
     response.set_cookie(key="toast_msg", value="Category created successfully!")
@@ -63,6 +76,7 @@ async def add_payee(request: Request, name: str = Form(...), db: Session = Depen
     user = request.state.user
     db.add(Payee(name=name, owner_id=user.id))
     db.commit()
+    publish_data_changed(db, user.id)
     redirect_url = request.headers.get("referer", "/installments/")
     response = RedirectResponse(url=redirect_url, status_code=303)
     response.set_cookie(key="toast_msg", value="Payee added successfully!")
@@ -87,7 +101,9 @@ async def delete_card(request: Request, id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Cannot delete Card; it is linked to an existing installment.")
         
     db.delete(card)
+    invalidate_dashboard_snapshots(db, user.id)
     db.commit()
+    publish_data_changed(db, user.id)
     
     if "hx-request" in request.headers:
         response = Response(status_code=200)
@@ -109,7 +125,8 @@ async def delete_category(request: Request, id: int, db: Session = Depends(get_d
         return RedirectResponse(url="/settings/", status_code=303)
 
     if db.query(Installment).filter(Installment.category_id == id).first() or \
-       db.query(CashFlow).filter(CashFlow.category_id == id).first():
+       db.query(CashFlow).filter(CashFlow.category_id == id).first() or \
+       (touches_archive(None) and db.query(ArchivedCashFlow).filter(ArchivedCashFlow.category_id == id).first()):
         if "hx-request" in request.headers:
             response = Response(status_code=200)
             response.headers["HX-Reswap"] = "none"
@@ -117,8 +134,10 @@ async def delete_category(request: Request, id: int, db: Session = Depends(get_d
             return response
         raise HTTPException(status_code=400, detail="Cannot delete Category; it is linked to a transaction or installment.")
         
+    delete_category_budget_rows(db, user.id, id)
     db.delete(cat)
     db.commit()
+    publish_data_changed(db, user.id)
     
     if "hx-request" in request.headers:
         response = Response(status_code=200)
@@ -148,6 +167,7 @@ async def delete_payee(request: Request, id: int, db: Session = Depends(get_db))
         
     db.delete(payee)
     db.commit()
+    publish_data_changed(db, user.id)
     
     if "hx-request" in request.headers:
         response = Response(status_code=200)
@@ -178,7 +198,9 @@ async def edit_card(
         card.due_day = due_day
         card.card_limit = card_limit
         card.color = color
+        invalidate_dashboard_snapshots(db, user.id)
         db.commit()
+        publish_data_changed(db, user.id)
     redirect_url = request.headers.get("referer", "/installments/")
     response = RedirectResponse(url=redirect_url, status_code=303)
     response.set_cookie(key="toast_msg", value="Card updated successfully!")
@@ -198,6 +220,7 @@ async def edit_category(
         cat.name = name
         cat.color = color
         db.commit()
+        publish_data_changed(db, user.id)
     redirect_url = request.headers.get("referer", "/installments/")
     response = RedirectResponse(url=redirect_url, status_code=303)
     response.set_cookie(key="toast_msg", value="Category updated successfully!")
@@ -215,7 +238,71 @@ async def edit_payee(
     if payee:
         payee.name = name
         db.commit()
+        publish_data_changed(db, user.id)
     redirect_url = request.headers.get("referer", "/installments/")
     response = RedirectResponse(url=redirect_url, status_code=303)
     response.set_cookie(key="toast_msg", value="Payee updated successfully!")
     return response
+
+
+@router.post("/category-budget/{id}")
+async def update_category_budget(
+    request: Request,
+    id: int,
+    monthly_limit: float = Form(0.0),
+    db: Session = Depends(get_db),
+):
+    user = request.state.user
+    if set_category_budget(db, user.id, id, monthly_limit):
+        db.commit()
+        publish_data_changed(db, user.id)
+        msg = "Budget saved." if monthly_limit > 0 else "Budget removed."
+    else:
+        msg = "Error: Category not found."
+    response = RedirectResponse(url="/settings/#categories", status_code=303)
+    response.set_cookie(key="toast_msg", value=msg)
+    return response
+
+
+# BACKUP
+@router.get("/backup")
+async def download_backup(request: Request):
+    user = request.state.user
+
+    def stream():
+        # The request's session is gone before a streamed body finishes
+        db = SessionLocal()
+        try:
+            yield from export_user(db, user.id)
+        finally:
+            db.close()
+
+    filename = f"salapi-{user.username}-{date.today():%Y%m%d}.salapi"
+    return StreamingResponse(
+        stream(),
+        media_type=BACKUP_CONTENT_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/restore")
+async def restore_backup(
+    request: Request,
+    archive: UploadFile = File(...),
+    replace: bool = Form(False),
+    db: Session = Depends(get_db),
+):
+    user = request.state.user
+    try:
+        # Uploads are spooled to disk, so this reads the archive a chunk at a time
+        counts = restore_user(db, user.id, iter(lambda: archive.file.read(1 << 20), b""), replace=replace)
+        skipped = counts.pop("skipped", 0)
+        msg = f"Backup restored: {sum(counts.values())} rows."
+        if skipped:
+            msg += f" Skipped {skipped} budgets on categories that don't exist here."
+    except BackupError as e:
+        msg = f"Error: {e}"
+    publish_data_changed(db, user.id)
+    response = RedirectResponse(url="/settings/#backup", status_code=303)
+    response.set_cookie(key="toast_msg", value=msg)
+    return response
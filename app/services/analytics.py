@@ -0,0 +1,386 @@
+"""
+Columnar analytics store: per-user Parquet files queried with DuckDB.
+
+Each user gets a directory under ANALYTICS_DIR:
+
+    cash_flows/part-<n>.parquet   id, version, deleted, date, type, amount, category_id
+    recurring.parquet             recurring occurrences up to today
+    schedule.parquet              installment billing per card and month
+    state.json                    ledger floor, applied event ids and build info
+
+Cash flow parts are append-only. A refresh reads the ledger events above the floor,
+skips the ones it has already applied and appends the rest as one part (updates are new
+versions, deletes are tombstones); queries keep the newest version of each id. Event ids
+are handed out at flush, not commit, so a lower id can become visible after a higher
+one: the floor only moves past events older than COMMIT_LAG, and anything committed
+late above it is still picked up. Once a user has more than
+COMPACT_AFTER parts they are merged back into one. The schedule and recurring files
+are small and are rewritten whenever an installment, card or rule event shows up.
+Report queries never touch the primary database beyond that one ledger read.
+"""
+import fcntl
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import date, datetime as dt, timedelta
+from pathlib import Path
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import func, select
+
+from app.models import CashFlow, ArchivedCashFlow, Installment, LedgerEvent
+from app.services.partitions import touches_archive
+from app.services.recurring import get_active_rules, expand_rules
+
+ANALYTICS_DIR = Path(os.getenv("ANALYTICS_DIR", "./analytics"))
+COMPACT_AFTER = int(os.getenv("ANALYTICS_COMPACT_AFTER", "16"))
+BATCH_SIZE = 10_000
+# Longest a ledger write may stay uncommitted and still be picked up by refresh
+COMMIT_LAG = timedelta(seconds=int(os.getenv("ANALYTICS_COMMIT_LAG", "600")))
+# Bumped when the files' layout changes; stores built by another version are rebuilt
+STORE_VERSION = 4
+
+CASH_ENTITIES = ("cashflow",)
+SCHEDULE_ENTITIES = ("installment", "card")
+RECURRING_ENTITIES = ("recurring", "recurring_amount")
+
+# ?group= name -> DuckDB expression
+CASHFLOW_DIMENSIONS = {
+    "year": "CAST(year(date) AS INTEGER)",
+    "month": "strftime(date, '%Y-%m')",
+    "type": "type",
+    "category": "category_id",
+}
+
+
+def _schemas():
+    import pyarrow as pa
+
+    cash = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("version", pa.int64()),
+            ("deleted", pa.bool_()),
+            ("date", pa.date32()),
+            ("type", pa.string()),
+            ("amount", pa.float64()),
+            ("category_id", pa.int64()),
+        ]
+    )
+    recurring = pa.schema(
+        [("date", pa.date32()), ("type", pa.string()), ("amount", pa.float64()), ("category_id", pa.int64())]
+    )
+    schedule = pa.schema(
+        [
+            ("installment_id", pa.int64()),
+            ("card_id", pa.int64()),
+            ("category_id", pa.int64()),
+            ("month", pa.date32()),
+            ("amount", pa.float64()),
+        ]
+    )
+    return cash, recurring, schedule
+
+
+def user_dir(user_id):
+    return ANALYTICS_DIR / str(int(user_id))
+
+
+@contextmanager
+def _locked(path):
+    path.mkdir(parents=True, exist_ok=True)
+    with open(path / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _write_table(path, schema, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(pa.Table.from_pydict(columns, schema=schema), tmp)
+    os.replace(tmp, path)  # readers never see half a file
+
+
+def _load_state(path):
+    try:
+        return json.loads((path / "state.json").read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _save_state(path, state):
+    tmp = path / "state.json.tmp"
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path / "state.json")
+
+
+def _next_part(path, state):
+    state["next_part"] = state.get("next_part", 0) + 1
+    return path / "cash_flows" / f"part-{state['next_part']:06d}.parquet"
+
+
+def _build_cash_flows(db, user_id, path, state):
+    """Full copy of the user's cash flows (live and archived) as the first part."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    cash_schema, _, _ = _schemas()
+    shutil.rmtree(path / "cash_flows", ignore_errors=True)
+    (path / "cash_flows").mkdir(parents=True)
+    target = _next_part(path, state)
+    tmp = target.with_suffix(".tmp")
+
+    tables = [CashFlow.__table__]
+    if touches_archive(None):
+        tables.append(ArchivedCashFlow.__table__)
+    conn = db.connection()
+    with pq.ParquetWriter(tmp, cash_schema) as writer:
+        for table in tables:
+            query = select(table.c.id, table.c.date, table.c.type, table.c.amount, table.c.category_id).where(
+                table.c.owner_id == user_id
+            )
+            for rows in conn.execute(query.execution_options(yield_per=BATCH_SIZE)).partitions():
+                writer.write_table(
+                    pa.Table.from_pydict(
+                        {
+                            "id": [r.id for r in rows],
+                            "version": [0] * len(rows),
+                            "deleted": [False] * len(rows),
+                            "date": [r.date for r in rows],
+                            "type": [r.type for r in rows],
+                            "amount": [r.amount for r in rows],
+                            "category_id": [r.category_id for r in rows],
+                        },
+                        schema=cash_schema,
+                    )
+                )
+    os.replace(tmp, target)
+
+
+def _build_schedule(db, user_id, path):
+    """One row per installment per billed month (start_date <= M-01 <= end_date)."""
+    _, _, schedule_schema = _schemas()
+    columns = {name: [] for name in schedule_schema.names}
+    for inst in db.query(Installment).filter(
+        Installment.owner_id == user_id, Installment.start_date != None
+    ):
+        month = inst.start_date.replace(day=1)
+        if month < inst.start_date:
+            month += relativedelta(months=1)
+        while month <= inst.end_date:
+            columns["installment_id"].append(inst.id)
+            columns["card_id"].append(inst.card_id)
+            columns["category_id"].append(inst.category_id)
+            columns["month"].append(month)
+            columns["amount"].append(inst.monthly_payment or 0.0)
+            month += relativedelta(months=1)
+    _write_table(path / "schedule.parquet", schedule_schema, columns)
+
+
+def _build_recurring(db, user_id, path, state):
+    """Recurring occurrences from each rule's start up to today."""
+    _, recurring_schema, _ = _schemas()
+    today = date.today()
+    columns = {name: [] for name in recurring_schema.names}
+    rules = get_active_rules(db, user_id, date.min, today)
+    for occ in expand_rules(rules, date.min, today):
+        columns["date"].append(occ.date)
+        columns["type"].append(occ.type)
+        columns["amount"].append(occ.amount)
+        columns["category_id"].append(occ.category_id)
+    _write_table(path / "recurring.parquet", recurring_schema, columns)
+    state["recurring_through"] = today.isoformat()
+
+
+def _append_cash_events(path, state, events):
+    cash_schema, _, _ = _schemas()
+    columns = {name: [] for name in cash_schema.names}
+    for ev in events:
+        row = ev.after or ev.before
+        columns["id"].append(row["id"])
+        columns["version"].append(ev.id)
+        columns["deleted"].append(ev.action == "delete")
+        columns["date"].append(date.fromisoformat(row["date"]) if row.get("date") else None)
+        columns["type"].append(row.get("type"))
+        columns["amount"].append(row.get("amount"))
+        columns["category_id"].append(row.get("category_id"))
+    _write_table(_next_part(path, state), cash_schema, columns)
+
+
+def _compact(path, state):
+    """Merges every part into one, keeping only each id's newest live version."""
+    import duckdb
+
+    parts = sorted((path / "cash_flows").glob("part-*.parquet"))
+    target = _next_part(path, state)
+    tmp = target.with_suffix(".tmp")
+    con = duckdb.connect()
+    try:
+        con.execute(
+            f"COPY ({_latest_cash_flows_sql(parts)} WHERE NOT deleted) TO '{_quote(tmp)}' (FORMAT PARQUET)"
+        )
+    finally:
+        con.close()
+    os.replace(tmp, target)
+    for part in parts:
+        part.unlink()
+
+
+def _user_events(db, user_id, *columns):
+    return db.query(*columns).filter(
+        LedgerEvent.owner_id == user_id,
+        LedgerEvent.entity.in_(CASH_ENTITIES + SCHEDULE_ENTITIES + RECURRING_ENTITIES),
+    )
+
+
+def refresh(db, user_id):
+    """
+    Brings a user's store up to date with the ledger and returns its directory. The
+    first call copies everything; later calls only apply events they haven't seen.
+    """
+    path = user_dir(user_id)
+    with _locked(path):
+        state = _load_state(path)
+        if state is None or state.get("store_version") != STORE_VERSION:
+            state = {"store_version": STORE_VERSION}
+            # Read the events first: ones racing the copy are replayed, never lost
+            state["floor"] = (
+                _user_events(db, user_id, func.max(LedgerEvent.id))
+                .filter(LedgerEvent.occurred_at < dt.now() - COMMIT_LAG)
+                .scalar()
+                or 0
+            )
+            state["applied"] = [
+                row.id
+                for row in _user_events(db, user_id, LedgerEvent.id)
+                .filter(LedgerEvent.id > state["floor"])
+                .order_by(LedgerEvent.id)
+            ]
+            _build_cash_flows(db, user_id, path, state)
+            _build_schedule(db, user_id, path)
+            _build_recurring(db, user_id, path, state)
+            state["built_at"] = dt.now().isoformat(timespec="seconds")
+            _save_state(path, state)
+            return path
+
+        rows = (
+            _user_events(
+                db,
+                user_id,
+                LedgerEvent.id,
+                LedgerEvent.entity,
+                LedgerEvent.action,
+                LedgerEvent.before,
+                LedgerEvent.after,
+                LedgerEvent.occurred_at,
+            )
+            .filter(LedgerEvent.id > state["floor"])
+            .order_by(LedgerEvent.id)
+            .all()
+        )
+        applied = set(state["applied"])
+        events = [ev for ev in rows if ev.id not in applied]
+        cutoff = dt.now() - COMMIT_LAG
+        floor = max((ev.id for ev in rows if ev.occurred_at < cutoff), default=state["floor"])
+        stale_recurring = state.get("recurring_through", "") < date.today().isoformat()
+        if not events and not stale_recurring and floor == state["floor"]:
+            return path
+
+        cash_events = [ev for ev in events if ev.entity in CASH_ENTITIES]
+        if cash_events:
+            _append_cash_events(path, state, cash_events)
+        if any(ev.entity in SCHEDULE_ENTITIES for ev in events):
+            _build_schedule(db, user_id, path)
+        if stale_recurring or any(ev.entity in RECURRING_ENTITIES for ev in events):
+            _build_recurring(db, user_id, path, state)
+        state["floor"] = floor
+        state["applied"] = sorted(i for i in applied.union(ev.id for ev in events) if i > floor)
+        if len(list((path / "cash_flows").glob("part-*.parquet"))) > COMPACT_AFTER:
+            _compact(path, state)
+        _save_state(path, state)
+    return path
+
+
+def drop_user_store(user_id):
+    """Forgets a user's store; the next refresh rebuilds it (after writes the ledger can't see)."""
+    path = user_dir(user_id)
+    if path.exists():
+        with _locked(path):
+            for child in path.iterdir():
+                if child.name != ".lock":
+                    shutil.rmtree(child) if child.is_dir() else child.unlink()
+
+
+# --- Queries ---------------------------------------------------------------
+
+
+def _quote(path):
+    return str(path).replace("'", "''")
+
+
+def _latest_cash_flows_sql(parts):
+    files = ", ".join(f"'{_quote(p)}'" for p in parts)
+    return (
+        "SELECT * FROM ("
+        f"SELECT * FROM read_parquet([{files}]) "
+        "QUALIFY row_number() OVER (PARTITION BY id ORDER BY version DESC) = 1)"
+    )
+
+
+def _query(sql, params):
+    import duckdb
+
+    con = duckdb.connect()
+    try:
+        return con.execute(sql, params).fetchall()
+    finally:
+        con.close()
+
+
+def _month_range(start, end):
+    """"YYYY-MM" bounds -> first day of start, first day after end."""
+    lo = date.fromisoformat(f"{start}-01") if start else date.min
+    hi = date.fromisoformat(f"{end}-01") + relativedelta(months=1) if end else date.max
+    return lo, hi
+
+
+def cashflow_report(path, group_by=("category", "month", "type"), start=None, end=None, tx_type=None):
+    """Totals over real and recurring cash flows grouped by any of CASHFLOW_DIMENSIONS."""
+    unknown = [g for g in group_by if g not in CASHFLOW_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown dimensions: {', '.join(unknown)}")
+
+    parts = sorted((path / "cash_flows").glob("part-*.parquet"))
+    sources = [f"SELECT date, type, amount, category_id FROM read_parquet('{_quote(path / 'recurring.parquet')}')"]
+    if parts:
+        sources.append(
+            f"SELECT date, type, amount, category_id FROM ({_latest_cash_flows_sql(parts)}) WHERE NOT deleted"
+        )
+    lo, hi = _month_range(start, end)
+    selected = [f"{CASHFLOW_DIMENSIONS[g]} AS {g}" for g in group_by]
+    sql = (
+        f"SELECT {', '.join(selected + ['round(sum(amount), 2)', 'count(*)'])} "
+        f"FROM ({' UNION ALL '.join(sources)}) "
+        "WHERE date >= $lo AND date < $hi AND ($type IS NULL OR type = $type) "
+        + ("GROUP BY ALL ORDER BY ALL" if group_by else "")
+    )
+    rows = _query(sql, {"lo": lo, "hi": hi, "type": tx_type})
+    return [dict(zip(list(group_by) + ["total", "count"], row)) for row in rows]
+
+
+def card_report(path, start=None, end=None):
+    """Installment billing per card and month."""
+    lo, hi = _month_range(start, end)
+    sql = (
+        "SELECT card_id, strftime(month, '%Y-%m') AS month, round(sum(amount), 2), count(*) "
+        f"FROM read_parquet('{_quote(path / 'schedule.parquet')}') "
+        "WHERE month >= $lo AND month < $hi GROUP BY ALL ORDER BY ALL"
+    )
+    rows = _query(sql, {"lo": lo, "hi": hi})
+    return [dict(zip(("card", "month", "total", "count"), row)) for row in rows]
+
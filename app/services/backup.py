@@ -0,0 +1,287 @@
+"""
+Per-user backup and restore.
+
+An archive is one zstd stream of msgpack objects:
+
+    {"format": "salapi-backup", "version": 1, "exported_at": ..., "globals": {...}}
+    {"table": "cards", "columns": [...]}       # once per table, parents before children
+    {"rows": [[...], ...]}                     # up to BATCH_SIZE rows at a time
+    {"end": true, "counts": {...}}
+
+Both directions work batch by batch, so memory stays flat however many rows a user
+has. Restore bulk-inserts each batch; parent tables use INSERT ... RETURNING so
+foreign keys in later tables can be remapped to the new ids. References to global
+categories/payees travel by name. Columns are listed per table, so an archive from an
+older schema restores as long as its version is not newer than BACKUP_VERSION.
+"""
+from datetime import date, datetime as dt
+from sqlalchemy import insert, delete, select, exists, Date, DateTime
+from sqlalchemy.exc import IntegrityError
+
+from app.models import (
+    Card, CardMonthlyStatus, Category, Payee, Installment, CashFlow, ArchivedCashFlow,
+    RecurringCashFlow, RecurringAmountChange, CategoryBudget, CategorySpend,
+)
+from app.services.partitions import touches_archive
+
+BACKUP_FORMAT = "salapi-backup"
+BACKUP_VERSION = 1
+BATCH_SIZE = 1000
+CONTENT_TYPE = "application/vnd.salapi.backup+zstd"
+
+# (name, model, foreign keys remapped on restore: column -> referenced table), in restore order
+BACKUP_TABLES = [
+    ("categories", Category, {}),
+    ("payees", Payee, {}),
+    ("cards", Card, {}),
+    ("recurring_cash_flows", RecurringCashFlow, {"category_id": "categories"}),
+    ("recurring_amount_changes", RecurringAmountChange, {"rule_id": "recurring_cash_flows"}),
+    ("installments", Installment, {"card_id": "cards", "payee_id": "payees", "category_id": "categories"}),
+    ("cash_flows", CashFlow, {"category_id": "categories"}),
+    ("card_monthly_statuses", CardMonthlyStatus, {"card_id": "cards"}),
+    ("category_budgets", CategoryBudget, {"category_id": "categories"}),
+]
+TABLES_BY_NAME = {name: (model, fks) for name, model, fks in BACKUP_TABLES}
+
+# Tables other rows point at: their new ids are collected while restoring
+REFERENCED = {fk_table for _, _, fks in BACKUP_TABLES for fk_table in fks.values()}
+
+# Shared rows (owner_id NULL) that user rows may reference; matched by name
+GLOBAL_MODELS = {"categories": Category, "payees": Payee}
+
+# Rows that mean nothing without their reference: skipped when a global it names is missing here
+SKIP_UNMAPPED = {"category_budgets"}
+
+
+class BackupError(ValueError):
+    pass
+
+
+def _encode(value):
+    if isinstance(value, (date, dt)):
+        return value.isoformat()
+    raise TypeError(f"Cannot back up {type(value).__name__}")
+
+
+def _owned_queries(db, user_id, name, model):
+    """Queries yielding the user's rows of one table (cash flows include the archive)."""
+    columns = [c for c in model.__table__.columns if c.name != "owner_id"]
+    if model is CardMonthlyStatus:
+        owner = exists().where(Card.id == model.card_id, Card.owner_id == user_id)
+        return [select(*columns).where(owner)]
+    if model is RecurringAmountChange:
+        owner = exists().where(RecurringCashFlow.id == model.rule_id, RecurringCashFlow.owner_id == user_id)
+        return [select(*columns).where(owner)]
+    queries = [select(*columns).where(model.owner_id == user_id)]
+    if model is CashFlow and touches_archive(None):
+        archived = ArchivedCashFlow.__table__
+        queries.append(select(*[archived.c[c.name] for c in columns]).where(archived.c.owner_id == user_id))
+    return queries
+
+
+def export_user(db, user_id):
+    """Yields the compressed archive for one user, chunk by chunk."""
+    import msgpack
+    import zstandard
+
+    packer = msgpack.Packer(default=_encode)
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def emit(obj):
+        return compressor.compress(packer.pack(obj))
+
+    global_names = {
+        name: {row.id: row.name for row in db.query(model.id, model.name).filter(model.owner_id == None)}
+        for name, model in GLOBAL_MODELS.items()
+    }
+    yield emit(
+        {
+            "format": BACKUP_FORMAT,
+            "version": BACKUP_VERSION,
+            "exported_at": dt.now().isoformat(timespec="seconds"),
+            "globals": global_names,
+        }
+    )
+
+    counts, skipped = {}, {}
+    conn = db.connection()
+    for name, model, _ in BACKUP_TABLES:
+        columns = [c.name for c in model.__table__.columns if c.name != "owner_id"]
+        chunk = emit({"table": name, "columns": columns})
+        if chunk:
+            yield chunk
+        counts[name] = 0
+        for query in _owned_queries(db, user_id, name, model):
+            result = conn.execute(query.execution_options(yield_per=BATCH_SIZE))
+            for rows in result.partitions():
+                counts[name] += len(rows)
+                chunk = emit({"rows": [list(row) for row in rows]})
+                if chunk:
+                    yield chunk
+
+    yield emit({"end": True, "counts": counts})
+    yield compressor.flush()
+
+
+def _read_objects(chunks):
+    import msgpack
+    import zstandard
+
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+    try:
+        for chunk in chunks:
+            unpacker.feed(decompressor.decompress(chunk))
+            yield from unpacker
+    except (zstandard.ZstdError, msgpack.UnpackException, ValueError) as e:
+        raise BackupError(f"Not a valid backup archive: {e}")
+
+
+def user_has_data(db, user_id):
+    return any(
+        db.query(exists().where(model.owner_id == user_id)).scalar()
+        for model in (Card, Category, Payee, Installment, CashFlow, RecurringCashFlow, CategoryBudget)
+    )
+
+
+def delete_user_rows(db, user_id):
+    """Removes everything a backup would restore for this user, children first. Does not commit."""
+    card_ids = select(Card.id).where(Card.owner_id == user_id)
+    rule_ids = select(RecurringCashFlow.id).where(RecurringCashFlow.owner_id == user_id)
+    db.execute(delete(CardMonthlyStatus).where(CardMonthlyStatus.card_id.in_(card_ids)))
+    db.execute(delete(RecurringAmountChange).where(RecurringAmountChange.rule_id.in_(rule_ids)))
+    for model in (CategoryBudget, CategorySpend, Installment, CashFlow, RecurringCashFlow, Card, Payee, Category):
+        db.execute(delete(model).where(model.owner_id == user_id))
+    if touches_archive(None):
+        archived = ArchivedCashFlow.__table__
+        db.execute(delete(archived).where(archived.c.owner_id == user_id))
+
+
+def _converters(model):
+    converters = {}
+    for column in model.__table__.columns:
+        if isinstance(column.type, DateTime):
+            converters[column.name] = dt.fromisoformat
+        elif isinstance(column.type, Date):
+            converters[column.name] = date.fromisoformat
+    return converters
+
+
+def restore_user(db, user_id, chunks, replace=False):
+    """
+    Restores an archive (an iterable of bytes chunks) into ``user_id``. The account must
+    be empty unless ``replace`` is set, which deletes the user's rows first. Commits on
+    success and returns {table: rows restored}, plus "skipped" for budgets on global
+    categories this database doesn't have. Raises BackupError on a bad archive.
+    """
+    from app.services.analytics import drop_user_store
+    from app.services.budget import rebuild_category_spend
+    from app.services.ledger import snapshot_current_state
+    from app.services.lifecycle import sync_installment_status
+    from app.services.reference import invalidate_user_references
+    from app.services.snapshot import invalidate_dashboard_snapshots
+
+    objects = _read_objects(chunks)
+    header = next(objects, None)
+    if header is None:
+        raise BackupError("Archive is empty or truncated.")
+    if not isinstance(header, dict) or header.get("format") != BACKUP_FORMAT:
+        raise BackupError("Not a Salapi backup archive.")
+    if header.get("version", 0) > BACKUP_VERSION:
+        raise BackupError(f"Archive version {header['version']} is newer than this app supports.")
+
+    if replace:
+        delete_user_rows(db, user_id)
+    elif user_has_data(db, user_id):
+        raise BackupError("This account already has data; restore with replace to overwrite it.")
+
+    # Old global id -> this database's global id, by name
+    global_ids = {}
+    for name, model in GLOBAL_MODELS.items():
+        here = {row.name: row.id for row in db.query(model.id, model.name).filter(model.owner_id == None)}
+        exported = header.get("globals", {}).get(name, {})
+        global_ids[name] = {int(old): here.get(n) for old, n in exported.items()}
+
+    remaps = {name: {} for name in REFERENCED}
+    counts, skipped = {}, {}
+    conn = db.connection()
+    table = model = fks = columns = None
+    ended = None
+
+    try:
+        for obj in objects:
+            if "table" in obj:
+                if obj["table"] not in TABLES_BY_NAME:
+                    raise BackupError(f"Unknown table in archive: {obj['table']}")
+                name = obj["table"]
+                model, fks = TABLES_BY_NAME[name]
+                table = model.__table__
+                columns = obj["columns"]
+                converters = _converters(model)
+                counts.setdefault(name, 0)
+            elif "rows" in obj:
+                if table is None:
+                    raise BackupError("Rows before any table header.")
+                batch, old_ids = [], []
+                for values in obj["rows"]:
+                    row = dict(zip(columns, values))
+                    old_ids.append(row.pop("id", None))
+                    # Columns this schema no longer has are dropped; new ones take defaults
+                    row = {k: v for k, v in row.items() if k in table.c}
+                    for key, convert in converters.items():
+                        if row.get(key) is not None:
+                            row[key] = convert(row[key])
+                    unmapped = False
+                    for key, target in fks.items():
+                        old = row.get(key)
+                        if old is None:
+                            continue
+                        new = remaps[target].get(old)
+                        if new is None and target in global_ids:
+                            new = global_ids[target].get(old)
+                        row[key] = new
+                        unmapped = unmapped or new is None
+                    if unmapped and name in SKIP_UNMAPPED:
+                        skipped[name] = skipped.get(name, 0) + 1
+                        continue
+                    if "owner_id" in table.c:
+                        row["owner_id"] = user_id
+                    batch.append(row)
+                if not batch:
+                    continue
+                if name in REFERENCED:
+                    new_ids = conn.execute(
+                        insert(table).returning(table.c.id, sort_by_parameter_order=True), batch
+                    ).scalars().all()
+                    remaps[name].update(zip(old_ids, new_ids))
+                else:
+                    conn.execute(insert(table), batch)
+                counts[name] += len(batch)
+            elif obj.get("end"):
+                ended = obj
+                break
+    except IntegrityError as e:
+        db.rollback()
+        raise BackupError(f"Restore conflicts with existing rows: {e.orig}")
+    except BackupError:
+        db.rollback()
+        raise
+
+    if ended is None:
+        db.rollback()
+        raise BackupError("Archive is truncated.")
+    expected = ended.get("counts", {})
+    if any(counts.get(name, 0) + skipped.get(name, 0) != n for name, n in expected.items()):
+        db.rollback()
+        raise BackupError("Archive row counts don't match; it may be corrupted.")
+
+    sync_installment_status(db, user_id)
+    rebuild_category_spend(db, user_id)
+    invalidate_dashboard_snapshots(db, user_id)
+    snapshot_current_state(db, user_id)
+    db.commit()
+    invalidate_user_references(user_id)
+    drop_user_store(user_id)
+    if skipped:
+        counts["skipped"] = sum(skipped.values())
+    return counts
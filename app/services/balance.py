@@ -0,0 +1,132 @@
+"""
+Running balance of a user's cash flows, computed by the database.
+
+Each row's balance is SUM(+income / -expense) OVER (ORDER BY date, id) across every real
+cash flow the user has, archived years included. A row's balance only depends on rows
+that sort before it, so pages walk history newest first with a (date, id) keyset: the
+window is limited to rows older than the cursor and the outer query takes the next
+``limit`` of them. A page deep in history is as correct as the first and never brings
+earlier rows back to Python. Recurring occurrences are expanded on read and have no
+rows, so they are not part of the balance.
+"""
+from sqlalchemy import and_, case, func, literal_column, or_, select, union_all
+
+from app.models import CashFlow, ArchivedCashFlow
+from app.services.partitions import touches_archive
+
+
+def signed_cash_flows(user_id, start=None):
+    """
+    The user's live and archived cash flows with their signed amount. Pass ``start`` when
+    callers only read rows from that date on, so the archive is skipped if it can't match.
+    """
+    tables = [CashFlow.__table__]
+    if touches_archive(start):
+        tables.append(ArchivedCashFlow.__table__)
+    selects = [
+        select(
+            t.c.id,
+            t.c.date,
+            t.c.description,
+            t.c.amount,
+            t.c.type,
+            t.c.category_id,
+            case((t.c.type == "income", t.c.amount), (t.c.type == "expense", -t.c.amount), else_=0.0).label("signed"),
+            literal_column("1" if t is not CashFlow.__table__ else "0").label("archived"),
+        ).where(t.c.owner_id == user_id, t.c.date != None)
+        for t in tables
+    ]
+    return (union_all(*selects) if len(selects) > 1 else selects[0]).subquery("flows")
+
+
+def _before(cols, key):
+    """(date, id) < key, spelled out so both SQLite and Postgres can use the date index."""
+    on, row_id = key
+    return or_(cols.date < on, and_(cols.date == on, cols.id < row_id))
+
+
+def _with_balance(user_id, end=None, cursor=None):
+    rows = signed_cash_flows(user_id)
+    query = select(
+        rows,
+        func.sum(rows.c.signed).over(order_by=(rows.c.date, rows.c.id)).label("balance"),
+    )
+    # Later rows never change an earlier row's balance, so they are cut before the window
+    if end is not None:
+        query = query.where(rows.c.date <= end)
+    if cursor is not None:
+        query = query.where(_before(rows.c, cursor))
+    return query.subquery("balances")
+
+
+def get_balance_page(db, user_id, cursor=None, limit=50, start=None, end=None, tx_type=None, category_id=None):
+    """
+    Newest-first cash flows with their running balance, one keyset page at a time.
+    ``cursor`` is the (date, id) of the last row of the previous page. Filters narrow
+    the rows shown; balances always cover every cash flow. Returns (rows, next_cursor).
+    """
+    balances = _with_balance(user_id, end, cursor)
+    query = select(balances)
+    if start is not None:
+        query = query.where(balances.c.date >= start)
+    if tx_type:
+        query = query.where(balances.c.type == tx_type)
+    if category_id:
+        query = query.where(balances.c.category_id == category_id)
+    rows = db.execute(
+        query.order_by(balances.c.date.desc(), balances.c.id.desc()).limit(limit + 1)
+    ).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = (rows[-1].date, rows[-1].id) if has_more else None
+    return [_as_dict(row) for row in rows], next_cursor
+
+
+def _as_dict(row):
+    return {
+        "id": row.id,
+        "date": row.date,
+        "description": row.description,
+        "amount": row.amount,
+        "type": row.type,
+        "category_id": row.category_id,
+        "archived": bool(row.archived),
+        "balance": round(row.balance or 0.0, 2),
+    }
+
+
+def get_running_balances(db, user_id, start=None, end=None):
+    """
+    {cash flow id: balance after it} for every row dated within [start, end]. Ids are
+    unique across live and archived rows (see services.partitions).
+    """
+    balances = _with_balance(user_id, end)
+    query = select(balances.c.id, balances.c.balance)
+    if start is not None:
+        query = query.where(balances.c.date >= start)
+    return {row.id: round(row.balance or 0.0, 2) for row in db.execute(query)}
+
+
+def get_balance_series(db, user_id, start=None, end=None):
+    """
+    Closing balance per day that has cash flows, oldest first: [{"date", "balance"}].
+    Days before ``start`` still count toward the opening balance.
+    """
+    rows = signed_cash_flows(user_id)
+    daily = select(rows.c.date, func.sum(rows.c.signed).label("net")).group_by(rows.c.date)
+    if end is not None:
+        daily = daily.where(rows.c.date <= end)
+    daily = daily.subquery("daily")
+
+    series = select(
+        daily.c.date,
+        func.sum(daily.c.net).over(order_by=daily.c.date).label("balance"),
+    ).subquery("series")
+    query = select(series)
+    if start is not None:
+        query = query.where(series.c.date >= start)
+    return [
+        {"date": row.date, "balance": round(row.balance or 0.0, 2)}
+        for row in db.execute(query.order_by(series.c.date))
+    ]
@@ -0,0 +1,226 @@
+"""
+Per-category monthly budgets.
+
+Spend is kept as a running total per (user, category, month) in category_spend. Adding,
+editing or deleting an expense applies its signed amount with one upsert, so budget vs
+actual reads a handful of aggregate rows instead of re-summing transactions. Installments
+with a category count toward every month they bill (see calendar.billed_range); those
+come from the user's installment rows at read time, since one installment spans many
+months. Recurring rules are not counted.
+
+Bulk writes that bypass the routes (backup restore, loadtest seed) call
+``rebuild_category_spend`` afterwards.
+"""
+from datetime import date
+from sqlalchemy import and_, delete, extract, func, insert, or_, select, exists
+
+from app.database import dialect_insert
+from app.models import (
+    CashFlow, ArchivedCashFlow, Category, CategoryBudget, CategorySpend, Installment,
+)
+from app.models.installment import ACTIVE_STATUS
+from app.services.calendar import billed_range
+from app.services.partitions import touches_archive
+from app.services.reference import get_user_categories
+
+
+def month_key(d):
+    return f"{d.year}-{d.month:02d}"
+
+
+def record_spend(db, user_id, category_id, on, amount):
+    """Adds ``amount`` (negative to take it off) to one category-month. Does not commit."""
+    if not category_id or not on or not amount:
+        return
+    stmt = dialect_insert(db)(CategorySpend.__table__).values(
+        owner_id=user_id, category_id=category_id, month_year=month_key(on), amount=amount
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["owner_id", "category_id", "month_year"],
+        set_={"amount": CategorySpend.__table__.c.amount + stmt.excluded.amount},
+    )
+    db.execute(stmt)
+
+
+def record_cashflow_spend(db, user_id, tx, sign=1):
+    """Counts a cash flow toward its category-month (sign=-1 takes it back off). Income is ignored."""
+    if tx.type == "expense":
+        record_spend(db, user_id, tx.category_id, tx.date, sign * (tx.amount or 0.0))
+
+
+def rebuild_category_spend(db, user_id=None):
+    """
+    Recomputes category_spend from the cash flows (and the archive) with one GROUP BY,
+    for one user or everyone. Does not commit.
+    """
+    spend = CategorySpend.__table__
+    clear = delete(spend)
+    if user_id is not None:
+        clear = clear.where(spend.c.owner_id == user_id)
+    db.execute(clear)
+
+    tables = [CashFlow.__table__]
+    if touches_archive(None):
+        tables.append(ArchivedCashFlow.__table__)
+
+    totals = {}
+    for table in tables:
+        year, month = extract("year", table.c.date), extract("month", table.c.date)
+        query = (
+            select(table.c.owner_id, table.c.category_id, year, month, func.sum(table.c.amount))
+            .where(table.c.type == "expense", table.c.category_id != None, table.c.date != None)
+            .group_by(table.c.owner_id, table.c.category_id, year, month)
+        )
+        if user_id is not None:
+            query = query.where(table.c.owner_id == user_id)
+        for owner_id, category_id, y, m, amount in db.execute(query):
+            key = (owner_id, category_id, f"{int(y)}-{int(m):02d}")
+            totals[key] = totals.get(key, 0.0) + (amount or 0.0)
+
+    rows = [
+        {"owner_id": owner_id, "category_id": category_id, "month_year": month_year, "amount": amount}
+        for (owner_id, category_id, month_year), amount in totals.items()
+    ]
+    if rows:
+        db.execute(insert(spend), rows)
+    return len(rows)
+
+
+def setup_budgets(session_factory):
+    """Backfills category_spend once, for databases that predate it."""
+    db = session_factory()
+    try:
+        if not db.query(exists().where(CategorySpend.id != None)).scalar():
+            if rebuild_category_spend(db):
+                db.commit()
+    finally:
+        db.close()
+
+
+def set_category_budget(db, user_id, category_id, monthly_limit):
+    """
+    Sets (or, for a limit of zero or less, removes) the user's limit for one of their own
+    or a global category. Returns False if the category isn't visible to them. Does not commit.
+    """
+    visible = db.query(
+        exists().where(
+            Category.id == category_id,
+            or_(Category.owner_id == user_id, Category.owner_id == None),
+        )
+    ).scalar()
+    if not visible:
+        return False
+
+    budget = (
+        db.query(CategoryBudget)
+        .filter(CategoryBudget.owner_id == user_id, CategoryBudget.category_id == category_id)
+        .first()
+    )
+    if monthly_limit is None or monthly_limit <= 0:
+        if budget:
+            db.delete(budget)
+    elif budget:
+        budget.monthly_limit = monthly_limit
+    else:
+        db.add(CategoryBudget(owner_id=user_id, category_id=category_id, monthly_limit=monthly_limit))
+    return True
+
+
+def delete_category_budget_rows(db, user_id, category_id):
+    """Drops the budget and spend rows of a category being deleted. Does not commit."""
+    for model in (CategoryBudget, CategorySpend):
+        db.execute(delete(model).where(model.owner_id == user_id, model.category_id == category_id))
+
+
+def get_user_budgets(db, user_id):
+    """{category_id: monthly_limit} for the settings page."""
+    return {
+        row.category_id: row.monthly_limit
+        for row in db.query(CategoryBudget.category_id, CategoryBudget.monthly_limit).filter(
+            CategoryBudget.owner_id == user_id
+        )
+    }
+
+
+def get_budget_status(db, user_id, year=None, month=None, today=None):
+    """
+    Budget vs actual for every budgeted category in one month, most used first:
+    [{"category_id", "name", "color", "limit", "cash", "installments", "spent",
+      "remaining", "percentage", "over"}].
+
+    One query: the budgets joined to that month's spend row and to the categorized
+    installments that could bill in the month (one row per budget and installment).
+    Like calculate_monthly_totals, months from the current one onward only count
+    active installments.
+    """
+    today = today or date.today()
+    yr = int(year) if year else today.year
+    mo = int(month) if month else today.month
+    month_start = date(yr, mo, 1)
+
+    billing = [
+        Installment.owner_id == CategoryBudget.owner_id,
+        Installment.category_id == CategoryBudget.category_id,
+        Installment.start_date <= month_start,
+    ]
+    if month_start >= today.replace(day=1):
+        billing.append(Installment.status == ACTIVE_STATUS)
+    rows = (
+        db.query(
+            CategoryBudget.category_id,
+            CategoryBudget.monthly_limit,
+            CategorySpend.amount,
+            Installment.start_date,
+            Installment.payment_terms,
+            Installment.monthly_payment,
+        )
+        .outerjoin(
+            CategorySpend,
+            and_(
+                CategorySpend.owner_id == CategoryBudget.owner_id,
+                CategorySpend.category_id == CategoryBudget.category_id,
+                CategorySpend.month_year == month_key(month_start),
+            ),
+        )
+        .outerjoin(Installment, and_(*billing))
+        .filter(CategoryBudget.owner_id == user_id)
+        .all()
+    )
+    if not rows:
+        return []
+
+    budgets, billed = {}, {}
+    target = yr * 12 + mo - 1
+    for row in rows:
+        budgets[row.category_id] = row
+        billed.setdefault(row.category_id, 0.0)
+        if row.start_date is None:
+            continue
+        billed_from, billed_to = billed_range(row.start_date, row.payment_terms)
+        if billed_from <= target <= billed_to:
+            billed[row.category_id] += row.monthly_payment or 0.0
+
+    categories = {c.id: c for c in get_user_categories(db, user_id)}
+    status = []
+    for row in budgets.values():
+        category = categories.get(row.category_id)
+        if category is None:
+            continue
+        cash = round(row.amount or 0.0, 2)
+        spent = round(cash + billed[row.category_id], 2)
+        status.append(
+            {
+                "category_id": row.category_id,
+                "name": category.name,
+                "color": category.color,
+                "limit": row.monthly_limit,
+                "cash": cash,
+                "installments": round(billed[row.category_id], 2),
+                "spent": spent,
+                "remaining": round(row.monthly_limit - spent, 2),
+                "percentage": round(spent / row.monthly_limit * 100, 1) if row.monthly_limit else 0,
+                "over": spent > row.monthly_limit,
+            }
+        )
+    status.sort(key=lambda s: s["percentage"], reverse=True)
+    return status
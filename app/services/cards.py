@@ -0,0 +1,127 @@
+from datetime import date
+from sqlalchemy import func, case, extract, and_
+from app.models import Card, Installment
+from app.models.installment import ACTIVE_STATUS
+
+UPCOMING_MONTHS = 3
+
+
+def month_index(col):
+    """year * 12 + month, so month arithmetic stays portable across SQLite/Postgres."""
+    return extract("year", col) * 12 + extract("month", col)
+
+
+def last_billing_index():
+    """Month index of Installment.end_date (straight payments bill the month after start)."""
+    start = month_index(Installment.start_date)
+    terms = func.coalesce(Installment.payment_terms, 1)
+    return case((terms == 1, start + 1), else_=start + terms - 1)
+
+
+def get_card_utilization(db, user_id, year=None, month=None, card_id=None):
+    """
+    Outstanding balance, upcoming commitments and headroom for each of a user's cards,
+    computed in one grouped query over installments joined to cards.
+
+    Mirrors Installment.get_progress / end_date: a payment counts as made for every
+    month from start_date up to the target month, and a straight (1-term) payment
+    stays on the bill for the month after it starts.
+    """
+    today = date.today()
+    yr = int(year) if year else today.year
+    mo = int(month) if month else today.month
+    current = yr * 12 + mo
+
+    start = month_index(Installment.start_date)
+    terms = func.coalesce(Installment.payment_terms, 1)
+    end = last_billing_index()
+    monthly = func.coalesce(Installment.monthly_payment, 0.0)
+
+    paid_months = case(
+        (start > current, 0),
+        (current - start + 1 > terms, terms),
+        else_=current - start + 1,
+    )
+    total_to_pay = func.coalesce(Installment.total_amount, 0.0) + func.coalesce(
+        Installment.interest_rate, 0.0
+    )
+    remaining = total_to_pay - monthly * paid_months
+    outstanding = case((remaining > 0, remaining), else_=0.0)
+
+    upcoming = [
+        func.coalesce(
+            func.sum(
+                case((and_(start <= current + i, end >= current + i), monthly), else_=0.0)
+            ),
+            0.0,
+        ).label(f"due_{i}")
+        for i in range(UPCOMING_MONTHS)
+    ]
+
+    query = (
+        db.query(
+            Card.id,
+            Card.name,
+            Card.color,
+            Card.card_limit,
+            func.coalesce(func.sum(outstanding), 0.0).label("outstanding"),
+            func.count(Installment.id).label("installment_count"),
+            *upcoming,
+        )
+        .outerjoin(
+            Installment,
+            and_(
+                Installment.card_id == Card.id,
+                Installment.owner_id == user_id,
+                Installment.status == ACTIVE_STATUS,
+            ),
+        )
+        .filter(Card.owner_id == user_id)
+        .group_by(Card.id, Card.name, Card.color, Card.card_limit)
+        .order_by(Card.name)
+    )
+    if card_id:
+        query = query.filter(Card.id == card_id)
+
+    results = []
+    for row in query.all():
+        limit = row.card_limit or 0.0
+        outstanding_amt = round(row.outstanding or 0.0, 2)
+        results.append(
+            {
+                "id": row.id,
+                "name": row.name,
+                "color": row.color,
+                "card_limit": round(limit, 2),
+                "outstanding": outstanding_amt,
+                "upcoming": [round(getattr(row, f"due_{i}") or 0.0, 2) for i in range(UPCOMING_MONTHS)],
+                "upcoming_total": round(
+                    sum(getattr(row, f"due_{i}") or 0.0 for i in range(UPCOMING_MONTHS)), 2
+                ),
+                "headroom": round(limit - outstanding_amt, 2) if limit else None,
+                "utilization": round(outstanding_amt / limit * 100, 1) if limit else None,
+                "installment_count": row.installment_count,
+            }
+        )
+    return results
+
+
+def check_card_limit(db, user_id, card_id, new_amount):
+    """
+    Returns a warning message if adding ``new_amount`` of debt would push the card
+    past its limit, otherwise None. Cards without a limit (0) are never flagged.
+    """
+    rows = get_card_utilization(db, user_id, card_id=card_id)
+    if not rows:
+        return None
+
+    card = rows[0]
+    if not card["card_limit"]:
+        return None
+
+    projected = card["outstanding"] + new_amount
+    if projected <= card["card_limit"]:
+        return None
+    over_by = projected - card["card_limit"]
+    # Plain ASCII: this ends up in the toast_msg cookie
+    return f"Warning: {card['name']} is now {over_by:,.2f} over its limit!"
@@ -1,23 +1,73 @@
+import calendar
+import heapq
+from datetime import date
 from sqlalchemy.orm import Session, joinedload
-from app.models import CashFlow
+from app.models import CashFlow, ArchivedCashFlow
+from app.services.partitions import touches_archive
+from app.services.recurring import get_active_rules, expand_rules
 
 
-def get_monthly_cashflow(db: Session, year: int, month: int):
-    month_str = f"{year}-{month:02d}"
+def month_bounds(year: int, month: int):
+    """First and last day of a month."""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
 
-    # We fetch the flows and join the category to get the colors/names
-    flows = (
-        db.query(CashFlow)
-        .options(joinedload(CashFlow.category))
-        .filter((CashFlow.is_recurring == True) | (CashFlow.month_year == month_str))
-        .all()
+
+def _cashflow_rows(db: Session, model, user_id, start, end, tx_type, category_id):
+    query = (
+        db.query(model)
+        .options(joinedload(model.category))
+        .filter(model.owner_id == user_id)
     )
+    # Bounds on date let Postgres prune cash_flows to the partitions of those years
+    if start:
+        query = query.filter(model.date >= start)
+    if end:
+        query = query.filter(model.date <= end)
+    if tx_type:
+        query = query.filter(model.type == tx_type)
+    if category_id:
+        query = query.filter(model.category_id == category_id)
+    return query.order_by(model.date, model.id).yield_per(500)
+
+
+def iter_cashflow_entries(
+    db: Session, user_id, start=None, end=None, tx_type=None, category_id=None
+):
+    """
+    Real CashFlow rows merged with expanded recurring occurrences, oldest first.
+
+    Both sides are streamed, so callers can total a window in a single pass without
+    ever materializing one row per recurrence. Open-ended windows expand recurring
+    rules up to today only. Archived closed years (SQLite) are only read when the
+    window reaches back before this year.
+    """
+    streams = [_cashflow_rows(db, CashFlow, user_id, start, end, tx_type, category_id)]
+    if touches_archive(start):
+        streams.append(_cashflow_rows(db, ArchivedCashFlow, user_id, start, end, tx_type, category_id))
+
+    window_start = start or date.min
+    window_end = end or date.today()
+    rules = get_active_rules(db, user_id, window_start, window_end, tx_type, category_id)
+    streams.append(expand_rules(rules, window_start, window_end))
+
+    return heapq.merge(*streams, key=lambda entry: entry.date)
+
+
+def get_monthly_cashflow(db: Session, user_id, year: int, month: int):
+    start, end = month_bounds(year, month)
 
-    total_income = sum(f.amount for f in flows if f.amount > 0)
-    total_expenses = sum(abs(f.amount) for f in flows if f.amount < 0)
+    items = []
+    total_income = 0.0
+    total_expenses = 0.0
+    for entry in iter_cashflow_entries(db, user_id, start, end):
+        items.append(entry)
+        if entry.type == "income":
+            total_income += entry.amount
+        else:
+            total_expenses += entry.amount
 
     return {
-        "items": flows,  # Passing the actual objects so UI can access .category.color
+        "items": items,  # CashFlow rows and recurring Occurrences; both expose .category
         "total_income": round(total_income, 2),
         "total_other_expenses": round(total_expenses, 2),
         "liquid_cash": round(total_income - total_expenses, 2),
@@ -0,0 +1,211 @@
+"""
+Chart series over long ranges: spending, income, balance and debt.
+
+Cash flows are summed per day by the database (one GROUP BY, archive included when the
+range reaches it); NumPy then folds the days into day/week/month buckets on a regular
+grid, so empty buckets are zeros rather than gaps. Series longer than the point budget
+are downsampled with largest-triangle-three-buckets (LTTB), which keeps the peaks and
+dips a plain stride would drop. A five-year daily chart ships a few hundred points.
+
+Like the running balance, cash series count real cash flows only; recurring occurrences
+have no rows. Debt is the installments' remaining balance at the end of each bucket,
+computed as in Installment.get_remaining_balance.
+"""
+from datetime import date, timedelta
+from sqlalchemy import func, select
+
+from app.models import Installment
+from app.services.balance import signed_cash_flows
+
+SERIES = ("spending", "income", "balance", "debt")
+BUCKETS = ("day", "week", "month")
+DEFAULT_POINTS = 300
+MAX_POINTS = 2000
+MAX_DAYS = 366 * 20
+DEBT_BLOCK = 512
+
+
+def _bucket_starts(days, bucket):
+    """Floors datetime64[D] values to the start of their day/week (Monday)/month."""
+    if bucket == "day":
+        return days
+    if bucket == "week":
+        n = days.astype("int64")
+        # 1970-01-01 was a Thursday: shift by 3 so Mondays land on multiples of 7
+        return (n - (n + 3) % 7).astype("datetime64[D]")
+    return days.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def _grid(start, end, bucket):
+    """Every bucket start in [start, end] and the day each bucket ends (clipped to ``end``)."""
+    import numpy as np
+
+    first = _bucket_starts(np.array([start], dtype="datetime64[D]"), bucket)[0]
+    last = np.datetime64(end, "D")
+    if bucket == "month":
+        months = np.arange(first.astype("datetime64[M]"), last.astype("datetime64[M]") + 1)
+        starts = months.astype("datetime64[D]")
+        ends = (months + 1).astype("datetime64[D]") - 1
+    else:
+        step = 7 if bucket == "week" else 1
+        starts = np.arange(first, last + 1, step)
+        ends = starts + (step - 1)
+    return starts, np.minimum(ends, last)
+
+
+def lttb(x, y, threshold):
+    """
+    Indices of the ``threshold`` points LTTB keeps from (x, y); x ascending floats.
+    Bucket averages are computed in one reduceat; only the pick itself, which depends
+    on the previously kept point, walks the buckets.
+    """
+    import numpy as np
+
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets over the interior points; first and last are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    avg_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    # Each bucket is scored against the next bucket's average (the last one against the end point)
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def _cash_series(db, user_id, start, end, names, starts):
+    import numpy as np
+
+    rows = signed_cash_flows(user_id, start)
+    daily = db.execute(
+        select(rows.c.date, rows.c.type, func.sum(rows.c.amount))
+        .where(rows.c.date >= start, rows.c.date <= end)
+        .group_by(rows.c.date, rows.c.type)
+    ).all()
+
+    totals = {"income": np.zeros(len(starts)), "expense": np.zeros(len(starts))}
+    if daily:
+        days = np.array([r[0] for r in daily], dtype="datetime64[D]")
+        types = np.array([r[1] for r in daily], dtype=object)
+        amounts = np.array([r[2] or 0.0 for r in daily], dtype=float)
+        slot = np.searchsorted(starts, days, side="right") - 1
+        for tx_type, total in totals.items():
+            mask = types == tx_type
+            total += np.bincount(slot[mask], weights=amounts[mask], minlength=len(starts))
+
+    series = {}
+    if "spending" in names:
+        series["spending"] = totals["expense"]
+    if "income" in names:
+        series["income"] = totals["income"]
+    if "balance" in names:
+        # The opening balance needs the archive even when the range itself doesn't reach it
+        before = signed_cash_flows(user_id)
+        opening = db.execute(select(func.sum(before.c.signed)).where(before.c.date < start)).scalar() or 0.0
+        series["balance"] = opening + np.cumsum(totals["income"] - totals["expense"])
+    return series
+
+
+def _debt_series(db, user_id, end, ends):
+    import numpy as np
+
+    rows = db.query(
+        Installment.start_date,
+        Installment.payment_terms,
+        Installment.monthly_payment,
+        Installment.total_amount,
+        Installment.interest_rate,
+    ).filter(
+        Installment.owner_id == user_id,
+        Installment.start_date != None,
+        Installment.start_date <= end,
+    ).all()
+    if not rows:
+        return np.zeros(len(ends))
+
+    starts = np.array([r.start_date for r in rows], dtype="datetime64[D]")
+    terms = np.array([r.payment_terms or 1 for r in rows], dtype=np.int64)
+    monthly = np.array([r.monthly_payment or 0.0 for r in rows], dtype=float)
+    to_pay = np.array([(r.total_amount or 0.0) + (r.interest_rate or 0.0) for r in rows], dtype=float)
+
+    def month_and_day(d):
+        months = d.astype("datetime64[M]")
+        return months.astype(np.int64), (d - months.astype("datetime64[D]")).astype(np.int64)
+
+    start_month, start_day = month_and_day(starts)
+    debt = np.empty(len(ends))
+    # Buckets x installments in blocks, so a long daily range stays small in memory
+    for lo in range(0, len(ends), DEBT_BLOCK):
+        block = ends[lo:lo + DEBT_BLOCK]
+        end_month, end_day = month_and_day(block)
+        months = block.astype("datetime64[M]")
+        last_day = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64) - 1
+        # Whole months elapsed + 1, capped at the terms, as in get_progress. relativedelta
+        # clamps the start day to the end month's length (Jan 31 + 1 month = Feb 28), so a
+        # month is complete once the end reaches that clamped day.
+        due_day = np.minimum(start_day[None, :], last_day[:, None])
+        elapsed = end_month[:, None] - start_month[None, :] - (end_day[:, None] < due_day)
+        paid_months = np.clip(elapsed + 1, 0, terms[None, :])
+        remaining = np.maximum(to_pay[None, :] - monthly[None, :] * paid_months, 0.0)
+        started = block[:, None] >= starts[None, :]
+        debt[lo:lo + DEBT_BLOCK] = np.where(started, remaining, 0.0).sum(axis=1)
+    return debt
+
+
+def get_chart_data(db, user_id, names, start=None, end=None, bucket="day", points=DEFAULT_POINTS):
+    """
+    {"bucket", "start", "end", "series": {name: {"x": [...], "y": [...], "raw_points",
+    "downsampled"}}} for the requested series. x is each bucket's first day (ISO).
+    Raises ValueError for unknown series or buckets and ranges over MAX_DAYS.
+    """
+    import numpy as np
+
+    names = list(dict.fromkeys(names))
+    unknown = [n for n in names if n not in SERIES]
+    if unknown or not names:
+        raise ValueError(f"Unknown series: {', '.join(unknown) or '(none)'}; choose from {', '.join(SERIES)}")
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket: {bucket}; choose from {', '.join(BUCKETS)}")
+    end = end or date.today()
+    start = start or end - timedelta(days=365)
+    if start > end:
+        raise ValueError("start must not be after end")
+    if (end - start).days > MAX_DAYS:
+        raise ValueError(f"Range is limited to {MAX_DAYS} days")
+    points = max(3, min(int(points), MAX_POINTS))
+
+    starts, ends = _grid(start, end, bucket)
+    # Widen to the first bucket's start so it isn't a partial week/month
+    start = starts[0].item()
+    values = {}
+    if any(n in names for n in ("spending", "income", "balance")):
+        values.update(_cash_series(db, user_id, start, end, names, starts))
+    if "debt" in names:
+        values["debt"] = _debt_series(db, user_id, end, ends)
+
+    x = starts.astype("datetime64[D]").astype(np.int64).astype(float)
+    labels = np.datetime_as_string(starts, unit="D")
+    series = {}
+    for name in names:
+        y = values[name]
+        keep = lttb(x, y, points)
+        series[name] = {
+            "x": labels[keep].tolist(),
+            "y": np.round(y[keep], 2).tolist(),
+            "raw_points": len(y),
+            "downsampled": len(keep) < len(y),
+        }
+    return {"bucket": bucket, "start": start, "end": end, "series": series}
@@ -0,0 +1,33 @@
+from sqlalchemy.orm import joinedload
+from app.models import CashFlow, Installment
+from app.models.installment import ACTIVE_STATUS
+from app.services.debt import calculate_monthly_totals
+
+
+def get_dashboard_data(db, user_id, recent_limit=5):
+    """
+    Everything the index page (and /api/v1/dashboard) shows, from one batched set of
+    queries: the user's active installments with card and payee, this month's card statuses
+    and the latest cash flows. Stats and the burn-down reuse the installment list.
+    """
+    installments = (
+        db.query(Installment)
+        .options(joinedload(Installment.card), joinedload(Installment.payee))
+        .filter(Installment.owner_id == user_id, Installment.status == ACTIVE_STATUS)
+        .all()
+    )
+    stats = calculate_monthly_totals(db, user_id=user_id, items=installments)
+
+    recent_cashflow = (
+        db.query(CashFlow)
+        .filter(CashFlow.owner_id == user_id)
+        .order_by(CashFlow.id.desc())
+        .limit(recent_limit)
+        .all()
+    )
+
+    return {
+        "stats": stats,
+        "recent_cashflow": recent_cashflow,
+        "installments": installments,
+    }
@@ -1,37 +1,58 @@
 from datetime import datetime as dt, date
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import delete, func, inspect, select, text
 from sqlalchemy.orm import joinedload
-from app.models import Installment, CardMonthlyStatus
+from app.database import dialect_insert
+from app.models import Installment, Card, CardMonthlyStatus
+from app.models.installment import ACTIVE_STATUS
+from app.services.calendar import billed_range
 import calendar
 
+# Rows per bulk upsert statement, well under SQLite's bound-parameter limit
+UPSERT_CHUNK = 200
+
 
 def calculate_monthly_totals(
-    db_session, year=None, month=None, card_id=None, payee_id=None, user_id=None
+    db_session, year=None, month=None, card_id=None, payee_id=None, user_id=None, as_of=None,
+    items=None,
 ):
-    """Calculates summary stats and separates cards by their payment status."""
-    today = date.today()
+    """Calculates summary stats and separates cards by their payment status.
+
+    ``as_of`` pins "today" for balances and the burn-down trend, so batch jobs
+    can compute what a user will see on a future date. ``items`` lets callers that
+    already loaded the user's installments (with cards) skip the installment query.
+    """
+    today = as_of or date.today()
     yr = int(year) if year else today.year
     mo = int(month) if month else today.month
 
     target_date = date(yr, mo, 1)
     month_year_str = f"{yr}-{mo:02d}"
 
-    query = db_session.query(Installment).options(joinedload(Installment.card))
+    if items is None:
+        query = db_session.query(Installment).options(joinedload(Installment.card))
 
-    if user_id:
-        query = query.filter(Installment.owner_id == user_id)
-    if card_id:
-        query = query.filter(Installment.card_id == card_id)
-    if payee_id:
-        query = query.filter(Installment.payee_id == payee_id)
+        # Completed installments can't bill this month or later; past months need history
+        if target_date >= today.replace(day=1):
+            query = query.filter(Installment.status == ACTIVE_STATUS)
+        if user_id:
+            query = query.filter(Installment.owner_id == user_id)
+        if card_id:
+            query = query.filter(Installment.card_id == card_id)
+        if payee_id:
+            query = query.filter(Installment.payee_id == payee_id)
 
-    all_items = query.all()
+        all_items = query.all()
+    else:
+        all_items = items
 
     status_query = db_session.query(CardMonthlyStatus).filter(CardMonthlyStatus.month_year == month_year_str)
     
-    # If we want to be strict, CardMonthlyStatus should also have owner_id
-    # But currently it relates to Card, and if we filter Installments by user_id, 
-    # we only get cards belonging to that user.
-    # However, let's filter statuses by checking the card's owner.
+    # CardMonthlyStatus has no owner_id; scope it through the card's owner.
+    if user_id:
+        status_query = status_query.join(Card, Card.id == CardMonthlyStatus.card_id).filter(
+            Card.owner_id == user_id
+        )
     
     statuses = status_query.all()
     paid_status_map = {s.card_id: s.is_paid for s in statuses}
@@ -45,7 +66,7 @@ def calculate_monthly_totals(
     active_items = []
 
     for item in all_items:
-        total_remaining_debt += item.get_remaining_balance()
+        total_remaining_debt += item.get_remaining_balance(today)
 
         if item.start_date <= target_date <= item.end_date:
             active_items.append(item)
@@ -84,7 +105,11 @@ def calculate_monthly_totals(
         percentage_paid = round((total_paid / total_due) * 100)
 
     # Trend Analysis Logic
-    burn_down = get_debt_burn_down(db_session, months_to_forecast=4, user_id=user_id)
+    # Unfiltered views already hold every installment the burn-down needs
+    burn_down = get_debt_burn_down(
+        db_session, months_to_forecast=4, user_id=user_id, start=today,
+        items=all_items if not (card_id or payee_id) else None,
+    )
     three_months_out = burn_down[3]
     future_total = three_months_out["total"]
     savings_delta = total_due - future_total
@@ -108,6 +133,98 @@ def calculate_monthly_totals(
     }
 
 
+def card_months_up_to(db, user_id, year, month):
+    """
+    Every (card_id, "YYYY-MM") with an installment due, up to and including the given
+    month. Months follow calendar.billed_range, so a mid-month start bills from the next.
+    """
+    last = date(year, month, 1)
+    target = year * 12 + month - 1
+    rows = db.query(Installment.card_id, Installment.start_date, Installment.payment_terms).filter(
+        Installment.owner_id == user_id,
+        Installment.card_id != None,
+        Installment.start_date <= last,
+    )
+
+    pairs = set()
+    for row in rows:
+        billed_from, billed_to = billed_range(row.start_date, row.payment_terms)
+        for index in range(billed_from, min(billed_to, target) + 1):
+            pairs.add((row.card_id, f"{index // 12}-{index % 12 + 1:02d}"))
+    return pairs
+
+
+def setup_card_statuses(engine):
+    """
+    Startup hook: gives databases that predate it the unique (card_id, month_year) key
+    bulk_set_card_status upserts on, keeping the newest row of any duplicates.
+    """
+    table = CardMonthlyStatus.__table__
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        keys = [c["column_names"] for c in inspector.get_unique_constraints(table.name)]
+        keys += [i["column_names"] for i in inspector.get_indexes(table.name) if i["unique"]]
+        if ["card_id", "month_year"] in keys:
+            return
+        newest = select(func.max(table.c.id)).group_by(table.c.card_id, table.c.month_year)
+        conn.execute(delete(table).where(table.c.id.not_in(newest)))
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_card_monthly_status_card_month "
+            "ON card_monthly_statuses (card_id, month_year)"
+        ))
+
+
+def bulk_set_card_status(db, user_id, pairs, is_paid=True):
+    """
+    Marks many (card_id, "YYYY-MM") pairs paid/unpaid with one INSERT ... ON CONFLICT
+    DO UPDATE per UPSERT_CHUNK pairs. Pairs for cards the user doesn't own are ignored.
+    Does not commit.
+    """
+    owned = {
+        row.id for row in db.query(Card.id).filter(Card.owner_id == user_id)
+    }
+    pairs = sorted({(card_id, month_year) for card_id, month_year in pairs if card_id in owned})
+    if not pairs:
+        return 0
+
+    table = CardMonthlyStatus.__table__
+    paid_at = dt.now() if is_paid else None
+    ids = {}
+    for lo in range(0, len(pairs), UPSERT_CHUNK):
+        stmt = dialect_insert(db)(table).values(
+            [
+                {"card_id": card_id, "month_year": month_year, "is_paid": is_paid, "paid_at": paid_at}
+                for card_id, month_year in pairs[lo:lo + UPSERT_CHUNK]
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["card_id", "month_year"],
+            set_={"is_paid": stmt.excluded.is_paid, "paid_at": stmt.excluded.paid_at},
+        ).returning(table.c.id, table.c.card_id, table.c.month_year)
+        ids.update({(row.card_id, row.month_year): row.id for row in db.execute(stmt)})
+
+    # Core statements skip the ORM hooks that feed the ledger; the upsert can't tell
+    # inserted rows from updated ones, and folding only reads the after state
+    from app.services.ledger import log_events
+
+    log_events(
+        db,
+        user_id,
+        "card_status",
+        [
+            (
+                ids.get((card_id, month_year)),
+                "upsert",
+                None,
+                {"card_id": card_id, "month_year": month_year, "is_paid": is_paid,
+                 "paid_at": paid_at.isoformat() if paid_at else None},
+            )
+            for card_id, month_year in pairs
+        ],
+    )
+    return len(pairs)
+
+
 def get_card_status(db, card_id, year, month):
     """Simplified status: Only PAID or PENDING."""
     from app.models import CardMonthlyStatus
@@ -140,6 +257,8 @@ def get_monthly_forecast(db, year, month, card_id=None, payee_id=None, user_id=N
         joinedload(Installment.card), joinedload(Installment.payee)
     )
 
+    if target_date >= date.today().replace(day=1):
+        query = query.filter(Installment.status == ACTIVE_STATUS)
     if user_id:
         query = query.filter(Installment.owner_id == user_id)
     if card_id:
@@ -180,12 +299,16 @@ def get_monthly_forecast(db, year, month, card_id=None, payee_id=None, user_id=N
 
 
 def get_global_updates_fragment(
-    db, year, month, card_id=None, payee_id=None, toast_msg=None, user_id=None
+    db, year, month, card_id=None, payee_id=None, toast_msg=None, user_id=None, stats=None
 ):
-    """Standardized helper for Out-of-Band UI updates with Fully Paid state."""
-    stats = calculate_monthly_totals(
-        db, year, month, card_id=card_id, payee_id=payee_id, user_id=user_id
-    )
+    """Standardized helper for Out-of-Band UI updates with Fully Paid state.
+
+    Pass ``stats`` when the caller already ran calculate_monthly_totals for this month.
+    """
+    if stats is None:
+        stats = calculate_monthly_totals(
+            db, year, month, card_id=card_id, payee_id=payee_id, user_id=user_id
+        )
     total_val = stats.get("total_burn", 0)
 
     # Check if balance is zero or less
@@ -222,16 +345,16 @@ def get_global_updates_fragment(
     return "".join(fragments)
 
 
-def get_debt_burn_down(db_session, months_to_forecast=12, user_id=None):
+def get_debt_burn_down(db_session, months_to_forecast=12, user_id=None, start=None, items=None):
     """Day 10: Calculates the total monthly bill for the next X months."""
-    today = date.today()
+    today = start or date.today()
     forecast = []
     
-    query = db_session.query(Installment)
-    if user_id:
-        query = query.filter(Installment.owner_id == user_id)
-    
-    items = query.all()
+    if items is None:
+        query = db_session.query(Installment).filter(Installment.status == ACTIVE_STATUS)
+        if user_id:
+            query = query.filter(Installment.owner_id == user_id)
+        items = query.all()
 
     for i in range(months_to_forecast):
         target_month = (today.month + i - 1) % 12 + 1
@@ -252,7 +375,7 @@ def get_debt_burn_down(db_session, months_to_forecast=12, user_id=None):
 
 def get_freedom_date(db_session, user_id=None):
     """Day 10: Finds the furthest end_date for the 'Freedom' milestone."""
-    query = db_session.query(Installment)
+    query = db_session.query(Installment).filter(Installment.status == ACTIVE_STATUS)
     if user_id:
         query = query.filter(Installment.owner_id == user_id)
         
@@ -260,3 +383,22 @@ def get_freedom_date(db_session, user_id=None):
     if not items:
         return "No active debt"
     return max(item.end_date for item in items).strftime("%B %Y")
+
+
+def publish_data_changed(db, user_id, origin=None, stats=None):
+    """
+    Pushes freshly rendered OOB fragments to every open tab of this user (SSE). Pass
+    ``origin`` (see events.origin_tab) when the response itself carries the fragments,
+    so that tab isn't sent them twice and nothing is rendered if it is the only one.
+    Pass ``stats`` when the caller already ran calculate_monthly_totals for this month.
+    """
+    from app.core.events import bus
+    from app.services.reminders import scheduler
+
+    scheduler.reschedule(user_id)
+    if not bus.has_subscribers(user_id, exclude=origin):
+        return
+
+    today = date.today()
+    fragments = get_global_updates_fragment(db, today.year, today.month, user_id=user_id, stats=stats)
+    bus.publish(user_id, "data-changed", fragments, exclude=origin)
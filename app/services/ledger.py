@@ -0,0 +1,387 @@
+"""
+Append-only ledger log and snapshot rebuild.
+
+Every ORM insert/update/delete of a user's ledger rows is written to ledger_events in
+the same transaction, with the row's columns before and after. Bulk statements that
+bypass the ORM (bulk_set_card_status) log through ``log_events``; lifecycle status
+flips are derived data and are not logged.
+
+A user's state is the latest LedgerSnapshot folded forward with the events after it:
+installments and cards as rows, paid card-months as a set, and cash flows only as
+per-month income/expense totals, so folding an event is O(1). Picking the last
+snapshot taken before a moment and folding only events up to it answers "as of"
+questions. History starts with the baseline snapshot taken at first startup.
+"""
+import os
+from collections import defaultdict
+from datetime import date, datetime as dt
+from sqlalchemy import event, func, insert, inspect as sa_inspect, select, exists
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Installment, CashFlow, ArchivedCashFlow, Card, CardMonthlyStatus, Category, Payee,
+    RecurringCashFlow, RecurringAmountChange, LedgerEvent, LedgerSnapshot, User,
+)
+from app.services.partitions import touches_archive
+
+LEDGER_SNAPSHOT_EVERY = int(os.getenv("LEDGER_SNAPSHOT_EVERY", "500"))
+
+# model -> entity name in ledger_events
+LEDGER_ENTITIES = {
+    Installment: "installment",
+    CashFlow: "cashflow",
+    Card: "card",
+    CardMonthlyStatus: "card_status",
+    Category: "category",
+    Payee: "payee",
+    RecurringCashFlow: "recurring",
+    RecurringAmountChange: "recurring_amount",
+}
+
+# Rows without owner_id belong to the owner of their parent: model -> (parent, fk column)
+OWNED_VIA = {
+    CardMonthlyStatus: (Card, "card_id"),
+    RecurringAmountChange: (RecurringCashFlow, "rule_id"),
+}
+
+
+def _jsonable(value):
+    if isinstance(value, (date, dt)):
+        return value.isoformat()
+    return value
+
+
+def _row_state(target):
+    mapper = sa_inspect(target).mapper
+    return {attr.key: _jsonable(getattr(target, attr.key)) for attr in mapper.column_attrs}
+
+
+def _queue(session, target, action, before, after):
+    model = type(target)
+    session.info.setdefault("ledger_pending", []).append(
+        {
+            "model": model,
+            "owner_id": getattr(target, "owner_id", None),
+            "parent_id": getattr(target, OWNED_VIA[model][1]) if model in OWNED_VIA else None,
+            "entity": LEDGER_ENTITIES[model],
+            "entity_id": target.id,
+            "action": action,
+            "before": before,
+            "after": after,
+            "occurred_at": dt.now(),
+        }
+    )
+
+
+def _after_insert(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        _queue(session, target, "insert", None, _row_state(target))
+
+
+def _after_update(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None:
+        return
+    state = sa_inspect(target)
+    after = _row_state(target)
+    before = dict(after)
+    changed = False
+    for attr in mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if history.has_changes():
+            changed = True
+            before[attr.key] = _jsonable(history.deleted[0]) if history.deleted else None
+    if changed:
+        _queue(session, target, "update", before, after)
+
+
+def _after_delete(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        _queue(session, target, "delete", _row_state(target), None)
+
+
+for _model in LEDGER_ENTITIES:
+    event.listen(_model, "after_insert", _after_insert)
+    event.listen(_model, "after_update", _after_update)
+    event.listen(_model, "after_delete", _after_delete)
+
+
+@event.listens_for(Session, "after_flush")
+def _write_pending(session, flush_context):
+    pending = session.info.pop("ledger_pending", None)
+    if not pending:
+        return
+
+    # Resolve owners of child rows: identity map first, one query for the rest
+    missing = defaultdict(set)
+    owners = {}
+    for row in pending:
+        if row["owner_id"] is None and row["parent_id"] is not None:
+            parent = OWNED_VIA[row["model"]][0]
+            loaded = session.identity_map.get(session.identity_key(parent, row["parent_id"]))
+            if loaded is not None:
+                owners[(parent, row["parent_id"])] = loaded.owner_id
+            else:
+                missing[parent].add(row["parent_id"])
+    for parent, ids in missing.items():
+        for pid, owner_id in session.connection().execute(
+            select(parent.id, parent.owner_id).where(parent.id.in_(ids))
+        ):
+            owners[(parent, pid)] = owner_id
+
+    rows = []
+    for row in pending:
+        owner_id = row.pop("owner_id")
+        model = row.pop("model")
+        parent_id = row.pop("parent_id")
+        if owner_id is None and parent_id is not None:
+            owner_id = owners.get((OWNED_VIA[model][0], parent_id))
+        if owner_id is None:
+            continue  # global categories/payees belong to nobody's ledger
+        rows.append({"owner_id": owner_id, **row})
+    if rows:
+        session.connection().execute(insert(LedgerEvent.__table__), rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("ledger_pending", None)
+
+
+def log_events(db, user_id, entity, changes):
+    """
+    Logs changes made with bulk statements the ORM hooks can't see. ``changes`` is a
+    list of (entity_id, action, before, after) tuples. Does not commit.
+    """
+    if not changes:
+        return
+    now = dt.now()
+    db.execute(
+        insert(LedgerEvent.__table__),
+        [
+            {
+                "owner_id": user_id,
+                "entity": entity,
+                "entity_id": entity_id,
+                "action": action,
+                "before": before,
+                "after": after,
+                "occurred_at": now,
+            }
+            for entity_id, action, before, after in changes
+        ],
+    )
+
+
+# --- Folding ---------------------------------------------------------------
+
+
+def empty_state():
+    return {"installments": {}, "cards": {}, "paid": {}, "cash": {}}
+
+
+def _cash_add(state, row, sign):
+    if not row or row.get("type") not in ("income", "expense") or not row.get("date"):
+        return
+    month = state["cash"].setdefault(row["date"][:7], {"income": 0.0, "expense": 0.0})
+    month[row["type"]] = round(month[row["type"]] + sign * (row.get("amount") or 0.0), 2)
+
+
+def apply_event(state, entity, action, before, after):
+    """Folds one event into ``state`` in place."""
+    if entity == "cashflow":
+        _cash_add(state, before, -1)
+        _cash_add(state, after, +1)
+    elif entity in ("installment", "card"):
+        rows = state["installments" if entity == "installment" else "cards"]
+        if after:
+            rows[str(after["id"])] = after
+        elif before:
+            rows.pop(str(before["id"]), None)
+    elif entity == "card_status":
+        if before:
+            state["paid"].pop(f"{before['card_id']}:{before['month_year']}", None)
+        if after:
+            key = f"{after['card_id']}:{after['month_year']}"
+            if after.get("is_paid"):
+                state["paid"][key] = True
+            else:
+                state["paid"].pop(key, None)
+    # categories, payees and recurring rules are kept for the audit trail only
+    return state
+
+
+def current_state(db, user_id):
+    """The state built straight from the live rows (used for baselines)."""
+    state = empty_state()
+    for inst in db.query(Installment).filter(Installment.owner_id == user_id):
+        state["installments"][str(inst.id)] = _row_state(inst)
+    for card in db.query(Card).filter(Card.owner_id == user_id):
+        state["cards"][str(card.id)] = _row_state(card)
+    for row in (
+        db.query(CardMonthlyStatus.card_id, CardMonthlyStatus.month_year)
+        .join(Card, Card.id == CardMonthlyStatus.card_id)
+        .filter(Card.owner_id == user_id, CardMonthlyStatus.is_paid == True)
+    ):
+        state["paid"][f"{row.card_id}:{row.month_year}"] = True
+
+    models = [CashFlow, ArchivedCashFlow] if touches_archive(None) else [CashFlow]
+    for model in models:
+        for row in (
+            db.query(model.date, model.type, func.sum(model.amount).label("amount"))
+            .filter(model.owner_id == user_id)
+            .group_by(model.date, model.type)
+        ):
+            _cash_add(state, {"date": row.date.isoformat(), "type": row.type, "amount": row.amount}, +1)
+    return state
+
+
+def _last_event_id(db, user_id):
+    return (
+        db.query(func.max(LedgerEvent.id)).filter(LedgerEvent.owner_id == user_id).scalar() or 0
+    )
+
+
+def snapshot_current_state(db, user_id):
+    """Writes a snapshot of the live rows, covering every event logged so far. Does not commit."""
+    snapshot = LedgerSnapshot(
+        owner_id=user_id, last_event_id=_last_event_id(db, user_id), state=current_state(db, user_id)
+    )
+    db.add(snapshot)
+    return snapshot
+
+
+def ledger_state(db, user_id, as_of=None):
+    """
+    Rebuilds the user's state at ``as_of`` (a datetime; None = now) from the latest
+    snapshot taken by then plus the events after it.
+    Returns (state, last_event_id, events_folded, snapshot_id).
+    """
+    snap_query = db.query(LedgerSnapshot.id, LedgerSnapshot.last_event_id, LedgerSnapshot.state).filter(
+        LedgerSnapshot.owner_id == user_id
+    )
+    if as_of is not None:
+        snap_query = snap_query.filter(LedgerSnapshot.taken_at <= as_of)
+    # A column query hands back a fresh copy of the JSON, so folding can't leak into the session
+    snapshot = snap_query.order_by(LedgerSnapshot.last_event_id.desc(), LedgerSnapshot.id.desc()).first()
+
+    state = snapshot.state if snapshot else empty_state()
+    last_id = snapshot.last_event_id if snapshot else 0
+
+    events = db.query(
+        LedgerEvent.id, LedgerEvent.entity, LedgerEvent.action, LedgerEvent.before, LedgerEvent.after
+    ).filter(LedgerEvent.owner_id == user_id, LedgerEvent.id > last_id)
+    if as_of is not None:
+        events = events.filter(LedgerEvent.occurred_at <= as_of)
+
+    folded = 0
+    for ev in events.order_by(LedgerEvent.id).yield_per(500):
+        apply_event(state, ev.entity, ev.action, ev.before, ev.after)
+        last_id = ev.id
+        folded += 1
+    return state, last_id, folded, snapshot.id if snapshot else None
+
+
+def summarize(state, on=None):
+    """Derived numbers for the month of ``on``: cash totals, card dues and remaining debt."""
+    on = on or date.today()
+    month_key = f"{on.year}-{on.month:02d}"
+    first_of_month = date(on.year, on.month, 1)
+
+    cash_months = dict(sorted(state["cash"].items()))
+    income = sum(m["income"] for m in cash_months.values())
+    expense = sum(m["expense"] for m in cash_months.values())
+
+    cards = {}
+    remaining = 0.0
+    for row in state["installments"].values():
+        fields = {k: v for k, v in row.items() if k in Installment.__table__.columns}
+        fields["start_date"] = date.fromisoformat(row["start_date"]) if row.get("start_date") else None
+        for key in ("created_at", "updated_at"):
+            fields.pop(key, None)
+        inst = Installment(**fields)
+        if not inst.start_date:
+            continue
+        remaining += inst.get_remaining_balance(on)
+        if inst.start_date <= first_of_month <= inst.end_date and inst.card_id:
+            card = state["cards"].get(str(inst.card_id), {})
+            entry = cards.setdefault(
+                inst.card_id,
+                {
+                    "card_id": inst.card_id,
+                    "name": card.get("name", "Unknown"),
+                    "amount": 0.0,
+                    "status": "PAID" if state["paid"].get(f"{inst.card_id}:{month_key}") else "PENDING",
+                },
+            )
+            entry["amount"] = round(entry["amount"] + (inst.monthly_payment or 0.0), 2)
+
+    due = round(sum(c["amount"] for c in cards.values()), 2)
+    paid = round(sum(c["amount"] for c in cards.values() if c["status"] == "PAID"), 2)
+    return {
+        "month": month_key,
+        "cash": {
+            "income": round(income, 2),
+            "expense": round(expense, 2),
+            "balance": round(income - expense, 2),
+            "months": cash_months,
+        },
+        "debt": {
+            "total_due": due,
+            "total_paid": paid,
+            "total_burn": round(due - paid, 2),
+            "total_remaining_debt": round(remaining, 2),
+            "cards": sorted(cards.values(), key=lambda c: c["name"]),
+        },
+    }
+
+
+def get_ledger_summary(db, user_id, as_of=None):
+    """
+    ``summarize`` for the state at ``as_of``. Reading the current state also writes a
+    fresh snapshot once LEDGER_SNAPSHOT_EVERY events have piled up since the last one.
+    """
+    state, last_id, folded, snapshot_id = ledger_state(db, user_id, as_of)
+    if as_of is None and folded >= LEDGER_SNAPSHOT_EVERY and not db.info.get("read_only"):
+        db.add(LedgerSnapshot(owner_id=user_id, last_event_id=last_id, state=state))
+        db.commit()
+
+    on = as_of.date() if as_of else date.today()
+    summary = summarize(state, on)
+    summary["as_of"] = (as_of or dt.now()).isoformat(timespec="seconds")
+    summary["last_event_id"] = last_id
+    summary["events_folded"] = folded
+    summary["from_snapshot"] = snapshot_id
+    return summary
+
+
+def take_snapshot(db, user_id):
+    """Snapshots the folded state if events arrived since the last snapshot. Does not commit."""
+    state, last_id, folded, snapshot_id = ledger_state(db, user_id)
+    if snapshot_id is not None and not folded:
+        return None
+    snapshot = LedgerSnapshot(owner_id=user_id, last_event_id=last_id, state=state)
+    db.add(snapshot)
+    return snapshot
+
+
+def setup_ledger(session_factory):
+    """Startup hook: baseline snapshot for users whose data predates the ledger."""
+    db = session_factory()
+    try:
+        user_ids = [
+            row.id
+            for row in db.query(User.id).filter(
+                ~exists().where(LedgerSnapshot.owner_id == User.id),
+                ~exists().where(LedgerEvent.owner_id == User.id),
+            )
+        ]
+        for user_id in user_ids:
+            snapshot_current_state(db, user_id)
+        db.commit()
+        if user_ids:
+            print(f"✅ Took baseline ledger snapshots for {len(user_ids)} users.")
+    finally:
+        db.close()
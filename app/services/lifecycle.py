@@ -0,0 +1,60 @@
+from datetime import date, datetime as dt
+from app.models import Installment
+from app.models.installment import ACTIVE_STATUS
+from app.services.cards import last_billing_index
+
+
+def sync_installment_status(db, user_id=None, today=None):
+    """
+    Marks installments "completed" once their last billing month has passed.
+
+    Scoped to one user (the hook used after edits and card-status toggles) it also
+    reopens completed installments whose schedule now runs past this month. The
+    unscoped run (nightly/startup) only touches active rows. Does not commit.
+    Returns (completed, reopened) row counts.
+    """
+    today = today or date.today()
+    current = today.year * 12 + today.month
+    last_billing = last_billing_index()
+    now = dt.now()
+
+    finished = db.query(Installment).filter(
+        Installment.status == ACTIVE_STATUS,
+        Installment.start_date != None,
+        last_billing < current,
+    )
+    if user_id:
+        finished = finished.filter(Installment.owner_id == user_id)
+    completed = finished.update(
+        {"status": "completed", "updated_at": now}, synchronize_session=False
+    )
+
+    reopened = 0
+    if user_id:
+        reopened = (
+            db.query(Installment)
+            .filter(
+                Installment.owner_id == user_id,
+                Installment.status == "completed",
+                last_billing >= current,
+            )
+            .update({"status": "active", "updated_at": now}, synchronize_session=False)
+        )
+    return completed, reopened
+
+
+def setup_lifecycle(engine, session_factory):
+    """Startup hook: ensures the active-rows partial index exists, then completes finished debt."""
+    # create_all only builds indexes together with new tables
+    with engine.begin() as conn:
+        for index in Installment.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+    db = session_factory()
+    try:
+        completed, _ = sync_installment_status(db)
+        db.commit()
+        if completed:
+            print(f"✅ Marked {completed} finished installments as completed.")
+    finally:
+        db.close()
@@ -0,0 +1,226 @@
+"""
+Keeps historical cash flows out of the hot path.
+
+* Postgres: ``cash_flows`` becomes a table range-partitioned by ``date``, one partition
+  per year plus a default partition for outliers. Queries with a date window (every
+  month view and report) are pruned to the matching years by the planner.
+* SQLite: closed years are moved into ``archive.cash_flows`` in an attached sibling file
+  (see app.database.attach_archive). Only windows reaching before January 1st of the
+  current year read from it. ``cash_flows`` uses AUTOINCREMENT, so ids that moved to the
+  archive (or were deleted) are never handed out again and stay unique across both.
+
+``migrate_to_partitions`` and ``archive_closed_years`` are run from ``python -m app.partition``.
+"""
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.schema import CreateTable
+from app.database import ARCHIVE_DATABASE_PATH
+from app.models import CashFlow
+from app.models.cashflow import archive_metadata
+
+DEFAULT_PARTITION = "cash_flows_default"
+
+
+def partition_name(year):
+    return f"cash_flows_y{year}"
+
+
+def _year_bounds(year):
+    return f"{year}-01-01", f"{year + 1}-01-01"
+
+
+def _columns():
+    return ", ".join(c.name for c in CashFlow.__table__.columns)
+
+
+def is_partitioned(conn):
+    if conn.dialect.name != "postgresql":
+        return False
+    kind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('cash_flows')")
+    ).scalar()
+    return kind == "p"
+
+
+def ensure_year_partitions(conn, years):
+    """
+    Creates missing yearly partitions. A year whose rows already landed in the default
+    partition is left there (still correct, just not pruned) rather than moved.
+    """
+    existing = set(
+        conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'cash_flows'::regclass"
+            )
+        ).scalars()
+    )
+    created = []
+    for year in sorted(set(years)):
+        name = partition_name(year)
+        if name in existing:
+            continue
+        lo, hi = _year_bounds(year)
+        stranded = conn.execute(
+            text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= :lo AND date < :hi)"),
+            {"lo": lo, "hi": hi},
+        ).scalar()
+        if stranded:
+            continue
+        conn.exec_driver_sql(
+            f"CREATE TABLE {name} PARTITION OF cash_flows FOR VALUES FROM ('{lo}') TO ('{hi}')"
+        )
+        created.append(year)
+    return created
+
+
+def migrate_to_partitions(engine):
+    """
+    One-off Postgres migration: rebuilds cash_flows as a yearly partitioned table.
+
+    Runs in a single transaction. The id sequence is kept, so ids (and the search index
+    keyed on them) survive. The primary key becomes (id, date) because Postgres requires
+    the partition key in every unique constraint; rows without a date get today's.
+    """
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("Partitioning is only supported on Postgres; use archive on SQLite.")
+
+    cols = _columns()
+    this_year = date.today().year
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            return False
+
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence('cash_flows', 'id')")).scalar()
+        years = set(
+            conn.execute(
+                text("SELECT DISTINCT CAST(EXTRACT(YEAR FROM date) AS INTEGER) FROM cash_flows WHERE date IS NOT NULL")
+            ).scalars()
+        )
+        years.update({this_year, this_year + 1})
+
+        if sequence:
+            conn.exec_driver_sql(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+        conn.exec_driver_sql("DROP INDEX IF EXISTS ix_cash_flows_owner_date")
+        conn.exec_driver_sql("ALTER TABLE cash_flows RENAME TO cash_flows_unpartitioned")
+        conn.exec_driver_sql(
+            "ALTER TABLE cash_flows_unpartitioned RENAME CONSTRAINT cash_flows_pkey TO cash_flows_unpartitioned_pkey"
+        )
+        conn.exec_driver_sql(
+            "CREATE TABLE cash_flows (LIKE cash_flows_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (date)"
+        )
+        conn.exec_driver_sql(
+            "ALTER TABLE cash_flows ALTER COLUMN date SET NOT NULL, "
+            "ADD PRIMARY KEY (id, date), "
+            "ADD FOREIGN KEY (category_id) REFERENCES categories (id), "
+            "ADD FOREIGN KEY (owner_id) REFERENCES users (id)"
+        )
+        conn.exec_driver_sql("CREATE INDEX ix_cash_flows_owner_date ON cash_flows (owner_id, date)")
+        conn.exec_driver_sql(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF cash_flows DEFAULT")
+        ensure_year_partitions(conn, years)
+
+        select_cols = ", ".join(
+            "COALESCE(date, CURRENT_DATE)" if c.name == "date" else c.name
+            for c in CashFlow.__table__.columns
+        )
+        conn.exec_driver_sql(
+            f"INSERT INTO cash_flows ({cols}) SELECT {select_cols} FROM cash_flows_unpartitioned"
+        )
+        conn.exec_driver_sql("DROP TABLE cash_flows_unpartitioned")
+        if sequence:
+            conn.exec_driver_sql(f"ALTER SEQUENCE {sequence} OWNED BY cash_flows.id")
+    return True
+
+
+def archive_closed_years(engine, before_year=None):
+    """
+    SQLite: moves cash flows dated before January 1st of ``before_year`` (default: this
+    year) into the attached archive. Only closed years can be archived. Archived rows
+    are read-only and drop out of the search index. Returns the number of rows moved.
+    """
+    if not ARCHIVE_DATABASE_PATH or engine.dialect.name != "sqlite":
+        raise RuntimeError("Archiving needs a file-backed SQLite database; use partitions on Postgres.")
+
+    this_year = date.today().year
+    before_year = before_year or this_year
+    if before_year > this_year:
+        raise ValueError("Only closed years can be archived.")
+
+    archive_metadata.create_all(engine)
+    cols = _columns()
+    cutoff = f"{before_year}-01-01"
+    with engine.begin() as conn:
+        conn.execute(
+            text(f"INSERT INTO archive.cash_flows ({cols}) SELECT {cols} FROM main.cash_flows WHERE date < :cutoff"),
+            {"cutoff": cutoff},
+        )
+        moved = conn.execute(
+            text("DELETE FROM main.cash_flows WHERE date < :cutoff"), {"cutoff": cutoff}
+        ).rowcount
+    return moved
+
+
+def ensure_sqlite_autoincrement(engine):
+    """
+    SQLite: rebuilds a cash_flows table created before it used AUTOINCREMENT, keeping
+    every id, and starts the counter past the archive's highest id. Without it SQLite
+    reuses the highest ids once they are archived or deleted. The search triggers that
+    mention cash_flows are dropped for the swap and put back. Returns True if rebuilt.
+    """
+    from app.services.search import setup_search_index
+
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as conn:
+        ddl = conn.execute(
+            text("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = 'cash_flows'")
+        ).scalar()
+        if not ddl or "AUTOINCREMENT" in ddl.upper():
+            return False
+
+        triggers = conn.execute(
+            text("SELECT name FROM main.sqlite_master WHERE type = 'trigger' AND sql LIKE '%cash_flows%'")
+        ).scalars().all()
+        for name in triggers:
+            conn.exec_driver_sql(f'DROP TRIGGER "{name}"')
+
+        # The model's DDL under a temporary name; indexes keep their names, so they follow the swap
+        create = str(CreateTable(CashFlow.__table__).compile(dialect=conn.dialect))
+        conn.exec_driver_sql(create.replace("CREATE TABLE cash_flows ", "CREATE TABLE cash_flows_rebuilt ", 1))
+        cols = _columns()
+        conn.exec_driver_sql(f"INSERT INTO cash_flows_rebuilt ({cols}) SELECT {cols} FROM main.cash_flows")
+        conn.exec_driver_sql("DROP TABLE main.cash_flows")
+        conn.exec_driver_sql("ALTER TABLE cash_flows_rebuilt RENAME TO cash_flows")
+        for index in CashFlow.__table__.indexes:
+            index.create(bind=conn)
+
+        high = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM main.cash_flows")).scalar()
+        if ARCHIVE_DATABASE_PATH:
+            archive_metadata.create_all(conn)
+            high = max(high, conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM archive.cash_flows")).scalar())
+        conn.execute(text("DELETE FROM main.sqlite_sequence WHERE name = 'cash_flows'"))
+        conn.execute(text("INSERT INTO main.sqlite_sequence (name, seq) VALUES ('cash_flows', :seq)"), {"seq": high})
+    setup_search_index(engine)
+    return True
+
+
+def touches_archive(start):
+    """Whether a window starting at ``start`` (None = unbounded) can include archived rows."""
+    if not ARCHIVE_DATABASE_PATH:
+        return False
+    return start is None or start < date(date.today().year, 1, 1)
+
+
+def setup_partitions(engine):
+    """Startup hook: cash flow indexes, the SQLite archive table and ids, and next year's partition."""
+    if ensure_sqlite_autoincrement(engine):
+        print("✅ Rebuilt cash_flows with AUTOINCREMENT ids.")
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            this_year = date.today().year
+            ensure_year_partitions(conn, [this_year, this_year + 1])
+        else:
+            for index in CashFlow.__table__.indexes:
+                index.create(bind=conn, checkfirst=True)
+    if ARCHIVE_DATABASE_PATH and engine.dialect.name == "sqlite":
+        archive_metadata.create_all(engine)
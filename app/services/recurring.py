@@ -0,0 +1,101 @@
+import heapq
+from bisect import bisect_right
+from datetime import timedelta
+from typing import NamedTuple, Optional
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload, selectinload
+from app.models import RecurringCashFlow
+
+
+class Occurrence(NamedTuple):
+    """One expanded instance of a RecurringCashFlow; quacks like a CashFlow in templates."""
+
+    date: object
+    amount: float
+    type: str
+    description: str
+    category: object
+    category_id: Optional[int]
+    rule_id: int
+    id: Optional[int] = None  # no row to edit/delete
+    is_recurring: bool = True
+
+
+def _first_index(rule, start):
+    """Index of the first occurrence on/after ``start`` (may undershoot by one for yearly/monthly)."""
+    if start <= rule.start_date:
+        return 0
+    if rule.frequency == "biweekly":
+        return -(-(start - rule.start_date).days // 14)
+    if rule.frequency == "yearly":
+        return max(start.year - rule.start_date.year - 1, 0)
+    diff = relativedelta(start, rule.start_date)
+    return max(diff.years * 12 + diff.months - 1, 0)
+
+
+def _nth_date(rule, n):
+    # Always step from start_date so month-end days don't drift (Jan 31 -> Feb 28 -> Mar 31)
+    if rule.frequency == "biweekly":
+        return rule.start_date + timedelta(days=14 * n)
+    if rule.frequency == "yearly":
+        return rule.start_date + relativedelta(years=n)
+    return rule.start_date + relativedelta(months=n)
+
+
+def iter_occurrences(rule, start, end):
+    """Lazily yields a rule's occurrences within [start, end], oldest first."""
+    if rule.end_date and rule.end_date < end:
+        end = rule.end_date
+
+    changes = [(c.effective_date, c.amount) for c in rule.amount_changes]
+    change_dates = [d for d, _ in changes]
+
+    n = _first_index(rule, start)
+    while True:
+        occurs_on = _nth_date(rule, n)
+        n += 1
+        if occurs_on > end:
+            return
+        if occurs_on < start:
+            continue
+
+        idx = bisect_right(change_dates, occurs_on)
+        amount = changes[idx - 1][1] if idx else rule.amount
+        yield Occurrence(
+            date=occurs_on,
+            amount=amount,
+            type=rule.type,
+            description=rule.description,
+            category=rule.category,
+            category_id=rule.category_id,
+            rule_id=rule.id,
+        )
+
+
+def get_active_rules(db, user_id, start, end, tx_type=None, category_id=None):
+    """Rules that can produce at least one occurrence inside [start, end]."""
+    query = (
+        db.query(RecurringCashFlow)
+        .options(
+            joinedload(RecurringCashFlow.category),
+            selectinload(RecurringCashFlow.amount_changes),
+        )
+        .filter(
+            RecurringCashFlow.owner_id == user_id,
+            RecurringCashFlow.start_date <= end,
+            or_(RecurringCashFlow.end_date == None, RecurringCashFlow.end_date >= start),
+        )
+    )
+    if tx_type:
+        query = query.filter(RecurringCashFlow.type == tx_type)
+    if category_id:
+        query = query.filter(RecurringCashFlow.category_id == category_id)
+    return query.all()
+
+
+def expand_rules(rules, start, end):
+    """Merges every rule's occurrences into one date-ordered stream without materializing them."""
+    return heapq.merge(
+        *(iter_occurrences(rule, start, end) for rule in rules), key=lambda o: o.date
+    )
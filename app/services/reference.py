@@ -0,0 +1,113 @@
+"""
+Cached per-user reference lists (cards, payees, categories) used by nearly every form.
+
+Entries are plain tuples so they can live in a shared cache. They are dropped after any
+commit that inserted, updated or deleted one of the rows: a user's own rows invalidate
+that user's entry, and global rows (owner_id NULL) bump a generation that retires every
+user's entry of that kind. A read that loaded just before such a commit can still store
+the old rows afterwards; they last until the cache TTL. Replica sessions read through
+the cache but never fill it, since their rows may lag the primary by longer than that.
+"""
+from typing import NamedTuple, Optional
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session, object_session
+from app.core.cache import cache
+from app.models import Card, Payee, Category
+
+
+class CardRef(NamedTuple):
+    id: int
+    name: str
+    due_day: Optional[int]
+    card_limit: Optional[float]
+    color: Optional[str]
+    owner_id: Optional[int]
+
+
+class PayeeRef(NamedTuple):
+    id: int
+    name: str
+    owner_id: Optional[int]
+
+
+class CategoryRef(NamedTuple):
+    id: int
+    name: str
+    color: Optional[str]
+    owner_id: Optional[int]
+
+
+# model -> (cache kind, row type, includes global rows)
+REFERENCE_MODELS = {
+    Card: ("cards", CardRef, False),
+    Payee: ("payees", PayeeRef, True),
+    Category: ("categories", CategoryRef, True),
+}
+
+
+def _key(kind, user_id):
+    generation = cache.get(f"ref:{kind}:gen") or 0
+    return f"ref:{kind}:{generation}:{user_id}"
+
+
+def _load(db, model, user_id):
+    kind, ref, with_global = REFERENCE_MODELS[model]
+    key = _key(kind, user_id)
+    rows = cache.get(key)
+    if rows is None:
+        query = db.query(*[getattr(model, field) for field in ref._fields])
+        if with_global:
+            query = query.filter(or_(model.owner_id == user_id, model.owner_id == None))
+        else:
+            query = query.filter(model.owner_id == user_id)
+        rows = [tuple(row) for row in query.order_by(model.name, model.id)]
+        if not db.info.get("read_only"):
+            cache.set(key, rows)
+    return [ref(*row) for row in rows]
+
+
+def get_user_cards(db, user_id):
+    return _load(db, Card, user_id)
+
+
+def get_user_payees(db, user_id):
+    """The user's payees plus the global ones, by name."""
+    return _load(db, Payee, user_id)
+
+
+def get_user_categories(db, user_id):
+    """The user's categories plus the global ones, by name."""
+    return _load(db, Category, user_id)
+
+
+def invalidate_user_references(user_id):
+    """Drops a user's cached lists; for writes that bypass the ORM hooks below."""
+    for kind, _, _ in REFERENCE_MODELS.values():
+        cache.delete(_key(kind, user_id))
+
+
+def _mark_changed(mapper, connection, target):
+    # Invalidate on commit, not flush: until then other sessions still read the old rows
+    session = object_session(target)
+    if session is not None:
+        kind = REFERENCE_MODELS[type(target)][0]
+        session.info.setdefault("reference_changes", set()).add((kind, target.owner_id))
+
+
+for _model in REFERENCE_MODELS:
+    for _name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _name, _mark_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_reference(session):
+    for kind, owner_id in session.info.pop("reference_changes", ()):
+        if owner_id is None:
+            cache.incr(f"ref:{kind}:gen")
+        else:
+            cache.delete(_key(kind, owner_id))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_reference_changes(session):
+    session.info.pop("reference_changes", None)
@@ -0,0 +1,239 @@
+"""
+In-process reminders for card bills that are coming due.
+
+Each tracked user has a heap of upcoming reminders built from the payment calendar
+(unpaid card-months with Card.due_day). A second heap holds every user's earliest
+reminder, so the scheduler task sleeps until exactly that moment instead of polling.
+Users are tracked when they open the /events stream and reloaded only when their own
+data changes (publish_data_changed) or their month rolls over; nothing ever scans
+all users. Delivery goes through a pluggable sink, the SSE toast by default.
+
+Like the event bus, state is per worker process.
+"""
+import asyncio
+import heapq
+import html
+import itertools
+import os
+from datetime import date, datetime as dt, time, timedelta
+from typing import NamedTuple, Optional
+from dateutil.relativedelta import relativedelta
+
+from app.database import SessionLocal
+from app.services.calendar import get_payment_calendar
+
+REMINDER_LEAD_DAYS = int(os.getenv("REMINDER_LEAD_DAYS", "3"))
+REMINDER_HOUR = int(os.getenv("REMINDER_HOUR", "9"))
+
+ROLLOVER = "rollover"
+DUE = "due"
+
+
+class Reminder(NamedTuple):
+    fire_at: dt
+    user_id: int
+    kind: str
+    card_id: Optional[int] = None
+    card_name: Optional[str] = None
+    month_year: Optional[str] = None
+    due_date: Optional[date] = None
+    amount: float = 0.0
+
+    def message(self, today=None):
+        days = (self.due_date - (today or date.today())).days
+        when = "today" if days <= 0 else "tomorrow" if days == 1 else f"in {days} days"
+        return f"{self.card_name}: ₱{self.amount:,.2f} due {when} ({self.due_date.strftime('%b %d')})"
+
+
+class BusSink:
+    """Pushes a toast to the user's open tabs over /events. Offline users aren't delivered."""
+
+    def send(self, reminder: Reminder) -> bool:
+        from app.core.events import bus
+
+        if not bus.has_subscribers(reminder.user_id):
+            return False
+        fragment = f"""
+            <div id="toast-container" hx-swap-oob="true"
+                 class="fixed bottom-5 right-5 bg-amber-500 text-white px-6 py-3 rounded-xl shadow-2xl flex items-center gap-3 z-50">
+                <span class="text-lg">⏰</span>
+                <span class="font-bold text-sm">{html.escape(reminder.message())}</span>
+            </div>
+        """
+        bus.publish(reminder.user_id, "reminder", fragment)
+        return True
+
+
+class LogSink:
+    """Prints reminders; handy for local runs and as a template for other channels."""
+
+    def send(self, reminder: Reminder) -> bool:
+        print(f"⏰ user {reminder.user_id}: {reminder.message()}")
+        return True
+
+
+def load_user_reminders(user_id, now=None):
+    """Reminders for this and next month's unpaid bills, plus the user's next rollover."""
+    now = now or dt.now()
+    today = now.date()
+    lead = timedelta(days=REMINDER_LEAD_DAYS)
+
+    db = SessionLocal()
+    try:
+        schedule = get_payment_calendar(db, user_id, today.year, today.month, months=2, today=today)
+    finally:
+        db.close()
+
+    reminders = []
+    for month in schedule:
+        for entry in month["entries"]:
+            if entry["status"] == "PAID" or entry["date"] < today:
+                continue
+            fire_at = max(dt.combine(entry["date"] - lead, time(REMINDER_HOUR)), now)
+            reminders.append(
+                Reminder(
+                    fire_at=fire_at,
+                    user_id=user_id,
+                    kind=DUE,
+                    card_id=entry["card_id"],
+                    card_name=entry["card_name"],
+                    month_year=f"{month['year']}-{month['month']:02d}",
+                    due_date=entry["date"],
+                    amount=entry["amount"],
+                )
+            )
+    # Next month's bills only enter the two-month window once this one ends
+    next_month = dt.combine(today.replace(day=1) + relativedelta(months=1), time.min)
+    reminders.append(Reminder(fire_at=next_month, user_id=user_id, kind=ROLLOVER))
+    return reminders
+
+
+class ReminderScheduler:
+    def __init__(self, sink=None, loader=load_user_reminders):
+        self.sink = sink or BusSink()
+        self.loader = loader
+        self._users: dict[int, list] = {}  # user_id -> heap of (fire_at, seq, Reminder)
+        self._heads: list = []  # (fire_at, seq, user_id); only each user's latest seq is live
+        self._head_seq: dict[int, int] = {}
+        self._seq = itertools.count()
+        self._dirty: set[int] = set()
+        self._sent: dict[int, set] = {}  # user_id -> {(card_id, month_year)} already delivered
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def track(self, user_id):
+        """Starts scheduling a user's reminders (no-op if already tracked)."""
+        if self.running and user_id not in self._users:
+            self._users[user_id] = []
+            self._mark(user_id)
+
+    def reschedule(self, user_id):
+        """Rebuilds a tracked user's heap after their cards, installments or statuses changed."""
+        if self.running and user_id in self._users:
+            self._mark(user_id)
+
+    def untrack(self, user_id):
+        self._users.pop(user_id, None)
+        self._head_seq.pop(user_id, None)
+        self._dirty.discard(user_id)
+
+    def _mark(self, user_id):
+        self._dirty.add(user_id)
+        self._wakeup.set()
+
+    def _push_head(self, user_id):
+        heap = self._users.get(user_id)
+        if heap:
+            seq = next(self._seq)
+            self._head_seq[user_id] = seq
+            heapq.heappush(self._heads, (heap[0][0], seq, user_id))
+
+    async def _reload(self, user_id):
+        try:
+            reminders = await asyncio.to_thread(self.loader, user_id)
+        except Exception as e:
+            print(f"⚠️ Reminders for user {user_id} failed to load: {e}")
+            return
+        if user_id not in self._users:
+            return  # untracked while loading
+        # Forget deliveries for months that dropped out of the window
+        months = {r.month_year for r in reminders}
+        sent = {k for k in self._sent.get(user_id, ()) if k[1] in months}
+        self._sent[user_id] = sent
+
+        heap = [
+            (r.fire_at, next(self._seq), r)
+            for r in reminders
+            if (r.card_id, r.month_year) not in sent
+        ]
+        heapq.heapify(heap)
+        self._users[user_id] = heap
+        self._push_head(user_id)
+
+    def _fire(self, user_id, now):
+        heap = self._users.get(user_id)
+        while heap and heap[0][0] <= now:
+            _, _, reminder = heapq.heappop(heap)
+            if reminder.kind == ROLLOVER:
+                self._mark(user_id)
+                return
+            if not self.sink.send(reminder):
+                # Nobody to tell; reload on their next visit instead of keeping state
+                self.untrack(user_id)
+                return
+            self._sent.setdefault(user_id, set()).add((reminder.card_id, reminder.month_year))
+        self._push_head(user_id)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            while self._dirty:
+                await self._reload(self._dirty.pop())
+
+            now = dt.now()
+            delay = None
+            while self._heads:
+                fire_at, seq, user_id = self._heads[0]
+                if self._head_seq.get(user_id) != seq:
+                    heapq.heappop(self._heads)  # stale: user reloaded or untracked
+                    continue
+                if fire_at > now:
+                    delay = (fire_at - now).total_seconds()
+                    break
+                heapq.heappop(self._heads)
+                try:
+                    self._fire(user_id, now)
+                except Exception as e:
+                    # Drop that one reminder (it isn't marked sent, so a reload retries it)
+                    print(f"⚠️ Reminder for user {user_id} failed to send: {e}")
+                    self._push_head(user_id)
+
+            if self._dirty:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+scheduler = ReminderScheduler()
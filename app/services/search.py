@@ -0,0 +1,267 @@
+"""
+Full-text search over cash flows and installments (descriptions, payee and category names).
+
+The index lives in the database and is kept current by triggers, so every write path
+(routes, seed, precompute, bulk imports) maintains it without application code:
+
+* SQLite: an FTS5 virtual table ``search_index``.
+* Postgres: a ``search_documents`` table with a generated, GIN-indexed tsvector.
+
+Both use the same rowid scheme (cash flow id * 2, installment id * 2 + 1), so a single
+row is located by primary key on update/delete. The owner is stored as an indexed
+token (``u<id>``) so the index itself narrows results to one user.
+"""
+import re
+from sqlalchemy import text, inspect
+from app.models import CashFlow, Installment
+
+# --- SQLite (FTS5) ---------------------------------------------------------------
+
+SQLITE_TABLE = """
+CREATE VIRTUAL TABLE search_index USING fts5(
+    description, payee, category, owner_tag,
+    kind UNINDEXED, ref_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+_SQLITE_CASHFLOW_ROW = """
+    INSERT INTO search_index(rowid, description, payee, category, owner_tag, kind, ref_id)
+    VALUES (NEW.id * 2, NEW.description, '',
+            (SELECT name FROM categories WHERE id = NEW.category_id),
+            'u' || NEW.owner_id, 'cashflow', NEW.id);
+"""
+
+_SQLITE_INSTALLMENT_ROW = """
+    INSERT INTO search_index(rowid, description, payee, category, owner_tag, kind, ref_id)
+    VALUES (NEW.id * 2 + 1, NEW.description,
+            (SELECT name FROM payees WHERE id = NEW.payee_id),
+            (SELECT name FROM categories WHERE id = NEW.category_id),
+            'u' || NEW.owner_id, 'installment', NEW.id);
+"""
+
+SQLITE_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS search_cf_ai AFTER INSERT ON cash_flows BEGIN {_SQLITE_CASHFLOW_ROW} END",
+    f"""CREATE TRIGGER IF NOT EXISTS search_cf_au AFTER UPDATE ON cash_flows BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 2; {_SQLITE_CASHFLOW_ROW} END""",
+    """CREATE TRIGGER IF NOT EXISTS search_cf_ad AFTER DELETE ON cash_flows BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 2; END""",
+    f"CREATE TRIGGER IF NOT EXISTS search_inst_ai AFTER INSERT ON installments BEGIN {_SQLITE_INSTALLMENT_ROW} END",
+    f"""CREATE TRIGGER IF NOT EXISTS search_inst_au AFTER UPDATE ON installments BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 2 + 1; {_SQLITE_INSTALLMENT_ROW} END""",
+    """CREATE TRIGGER IF NOT EXISTS search_inst_ad AFTER DELETE ON installments BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 2 + 1; END""",
+    """CREATE TRIGGER IF NOT EXISTS search_cat_au AFTER UPDATE OF name ON categories BEGIN
+        UPDATE search_index SET category = NEW.name WHERE rowid IN (
+            SELECT id * 2 FROM cash_flows WHERE category_id = NEW.id
+            UNION ALL SELECT id * 2 + 1 FROM installments WHERE category_id = NEW.id); END""",
+    """CREATE TRIGGER IF NOT EXISTS search_payee_au AFTER UPDATE OF name ON payees BEGIN
+        UPDATE search_index SET payee = NEW.name WHERE rowid IN (
+            SELECT id * 2 + 1 FROM installments WHERE payee_id = NEW.id); END""",
+]
+
+SQLITE_BACKFILL = """
+INSERT INTO search_index(rowid, description, payee, category, owner_tag, kind, ref_id)
+SELECT cf.id * 2, cf.description, '', c.name, 'u' || cf.owner_id, 'cashflow', cf.id
+FROM cash_flows cf LEFT JOIN categories c ON c.id = cf.category_id
+UNION ALL
+SELECT i.id * 2 + 1, i.description, p.name, c.name, 'u' || i.owner_id, 'installment', i.id
+FROM installments i
+LEFT JOIN payees p ON p.id = i.payee_id
+LEFT JOIN categories c ON c.id = i.category_id
+"""
+
+SQLITE_QUERY = """
+SELECT kind, ref_id, description, payee, category,
+       bm25(search_index, 4.0, 2.0, 1.0, 0.0) AS rank
+FROM search_index
+WHERE search_index MATCH :match
+ORDER BY rank
+LIMIT :limit OFFSET :offset
+"""
+
+# --- Postgres (tsvector + GIN) ----------------------------------------------------
+
+POSTGRES_TABLE = """
+CREATE TABLE IF NOT EXISTS search_documents (
+    id BIGINT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    ref_id INTEGER NOT NULL,
+    owner_id INTEGER,
+    description TEXT,
+    payee TEXT,
+    category TEXT,
+    document TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(description, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(payee, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(category, '')), 'C')
+    ) STORED
+);
+CREATE INDEX IF NOT EXISTS ix_search_documents_document ON search_documents USING GIN (document);
+CREATE INDEX IF NOT EXISTS ix_search_documents_owner ON search_documents (owner_id);
+"""
+
+POSTGRES_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION search_sync_cash_flow() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM search_documents WHERE id = OLD.id * 2;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO search_documents (id, kind, ref_id, owner_id, description, payee, category)
+        VALUES (NEW.id * 2, 'cashflow', NEW.id, NEW.owner_id, NEW.description, '',
+                (SELECT name FROM categories WHERE id = NEW.category_id));
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION search_sync_installment() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM search_documents WHERE id = OLD.id * 2 + 1;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO search_documents (id, kind, ref_id, owner_id, description, payee, category)
+        VALUES (NEW.id * 2 + 1, 'installment', NEW.id, NEW.owner_id, NEW.description,
+                (SELECT name FROM payees WHERE id = NEW.payee_id),
+                (SELECT name FROM categories WHERE id = NEW.category_id));
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION search_sync_category() RETURNS trigger AS $$
+BEGIN
+    UPDATE search_documents SET category = NEW.name WHERE id IN (
+        SELECT id * 2 FROM cash_flows WHERE category_id = NEW.id
+        UNION ALL SELECT id * 2 + 1 FROM installments WHERE category_id = NEW.id);
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION search_sync_payee() RETURNS trigger AS $$
+BEGIN
+    UPDATE search_documents SET payee = NEW.name WHERE id IN (
+        SELECT id * 2 + 1 FROM installments WHERE payee_id = NEW.id);
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS search_cash_flows ON cash_flows;
+CREATE TRIGGER search_cash_flows AFTER INSERT OR UPDATE OR DELETE ON cash_flows
+    FOR EACH ROW EXECUTE FUNCTION search_sync_cash_flow();
+DROP TRIGGER IF EXISTS search_installments ON installments;
+CREATE TRIGGER search_installments AFTER INSERT OR UPDATE OR DELETE ON installments
+    FOR EACH ROW EXECUTE FUNCTION search_sync_installment();
+DROP TRIGGER IF EXISTS search_categories ON categories;
+CREATE TRIGGER search_categories AFTER UPDATE OF name ON categories
+    FOR EACH ROW EXECUTE FUNCTION search_sync_category();
+DROP TRIGGER IF EXISTS search_payees ON payees;
+CREATE TRIGGER search_payees AFTER UPDATE OF name ON payees
+    FOR EACH ROW EXECUTE FUNCTION search_sync_payee();
+"""
+
+POSTGRES_BACKFILL = """
+INSERT INTO search_documents (id, kind, ref_id, owner_id, description, payee, category)
+SELECT cf.id * 2, 'cashflow', cf.id, cf.owner_id, cf.description, '', c.name
+FROM cash_flows cf LEFT JOIN categories c ON c.id = cf.category_id
+UNION ALL
+SELECT i.id * 2 + 1, 'installment', i.id, i.owner_id, i.description, p.name, c.name
+FROM installments i
+LEFT JOIN payees p ON p.id = i.payee_id
+LEFT JOIN categories c ON c.id = i.category_id
+ON CONFLICT (id) DO NOTHING
+"""
+
+POSTGRES_QUERY = """
+SELECT kind, ref_id, description, payee, category,
+       ts_rank(document, to_tsquery('simple', :match)) AS rank
+FROM search_documents
+WHERE owner_id = :owner_id AND document @@ to_tsquery('simple', :match)
+ORDER BY rank DESC, id DESC
+LIMIT :limit OFFSET :offset
+"""
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def setup_search_index(engine):
+    """Creates the search index, its triggers and backfills existing rows (idempotent)."""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            created = not inspect(conn).has_table("search_index")
+            if created:
+                conn.execute(text(SQLITE_TABLE))
+            for trigger in SQLITE_TRIGGERS:
+                conn.execute(text(trigger))
+            if created:
+                conn.execute(text(SQLITE_BACKFILL))
+        elif dialect == "postgresql":
+            created = not inspect(conn).has_table("search_documents")
+            conn.exec_driver_sql(POSTGRES_TABLE)
+            conn.exec_driver_sql(POSTGRES_FUNCTIONS)
+            if created:
+                conn.execute(text(POSTGRES_BACKFILL))
+
+
+def _tokens(q):
+    return _TOKEN_RE.findall(q or "")[:8]
+
+
+def search(db, user_id, q, page=1, per_page=20):
+    """
+    Ranked, prefix-matching search for one user. Returns (results, has_more).
+    Each result is a dict with kind, id, description, payee, category, date and amount.
+    """
+    tokens = _tokens(q)
+    if not tokens:
+        return [], False
+
+    page = max(int(page or 1), 1)
+    params = {"limit": per_page + 1, "offset": (page - 1) * per_page}
+
+    if db.bind.dialect.name == "postgresql":
+        params["match"] = " & ".join(f"{t}:*" for t in tokens)
+        params["owner_id"] = user_id
+        rows = db.execute(text(POSTGRES_QUERY), params).mappings().all()
+    else:
+        terms = " ".join(f'"{t}"*' for t in tokens)
+        params["match"] = f"owner_tag:u{user_id} AND {{description payee category}}: ({terms})"
+        rows = db.execute(text(SQLITE_QUERY), params).mappings().all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    # Amount/date come from the source tables in one IN query per kind
+    cashflow_ids = [r["ref_id"] for r in rows if r["kind"] == "cashflow"]
+    installment_ids = [r["ref_id"] for r in rows if r["kind"] == "installment"]
+    details = {}
+    if cashflow_ids:
+        for row in db.query(CashFlow.id, CashFlow.date, CashFlow.amount, CashFlow.type).filter(
+            CashFlow.id.in_(cashflow_ids)
+        ):
+            details[("cashflow", row.id)] = {"date": row.date, "amount": row.amount, "type": row.type}
+    if installment_ids:
+        for row in db.query(Installment.id, Installment.start_date, Installment.monthly_payment).filter(
+            Installment.id.in_(installment_ids)
+        ):
+            details[("installment", row.id)] = {
+                "date": row.start_date,
+                "amount": row.monthly_payment,
+                "type": "installment",
+            }
+
+    results = []
+    for r in rows:
+        extra = details.get((r["kind"], r["ref_id"]))
+        if not extra:
+            continue
+        results.append(
+            {
+                "kind": r["kind"],
+                "id": r["ref_id"],
+                "description": r["description"],
+                "payee": r["payee"],
+                "category": r["category"],
+                **extra,
+            }
+        )
+    return results, has_more
@@ -0,0 +1,99 @@
+from datetime import date, datetime as dt
+from dateutil.relativedelta import relativedelta
+from app.database import dialect_insert
+from app.models import DashboardSnapshot
+from app.services.cards import get_card_utilization
+from app.services.debt import calculate_monthly_totals, get_debt_burn_down, get_freedom_date
+
+# Bump whenever the payload shape changes so stale rows are recomputed on read.
+SNAPSHOT_VERSION = 2
+
+# Keys from calculate_monthly_totals that are plain numbers/strings and safe to store.
+SUMMARY_KEYS = (
+    "total_burn",
+    "total_paid",
+    "total_due",
+    "total_remaining_debt",
+    "percentage_paid",
+    "pending_cards",
+    "paid_cards",
+    "month_name",
+    "year",
+    "month",
+    "savings_delta",
+    "percent_drop",
+    "avg_monthly_burn",
+)
+
+
+def build_dashboard_snapshot(db, user_id, year, month):
+    """Computes the dashboard numbers a user sees on the 1st of the given month."""
+    as_of = date(year, month, 1)
+    stats = calculate_monthly_totals(db, year, month, user_id=user_id, as_of=as_of)
+
+    payload = {key: stats[key] for key in SUMMARY_KEYS}
+    payload["burn_down"] = get_debt_burn_down(db, user_id=user_id, start=as_of)
+    payload["freedom_date"] = get_freedom_date(db, user_id=user_id)
+    payload["card_utilization"] = get_card_utilization(db, user_id, year, month)
+    payload["version"] = SNAPSHOT_VERSION
+    return payload
+
+
+def save_dashboard_snapshot(db, user_id, year, month):
+    """
+    Upserts the snapshot row for (user, month) and returns its payload. Concurrent misses
+    for the same month (tabs, workers, the precompute run) all write; the last one wins.
+    """
+    month_year = f"{year}-{month:02d}"
+    payload = build_dashboard_snapshot(db, user_id, year, month)
+
+    stmt = dialect_insert(db)(DashboardSnapshot.__table__).values(
+        owner_id=user_id, month_year=month_year, payload=payload, computed_at=dt.now()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["owner_id", "month_year"],
+        set_={"payload": stmt.excluded.payload, "computed_at": stmt.excluded.computed_at},
+    )
+    db.execute(stmt)
+    db.commit()
+    return payload
+
+
+def get_dashboard_summary(db, user_id, year=None, month=None):
+    """
+    Returns the precomputed summary for a month, computing and storing it on a miss.
+    Unlike calculate_monthly_totals, the result carries no ORM objects ("items").
+    Read-replica sessions compute a miss without storing it.
+    """
+    today = date.today()
+    yr = int(year) if year else today.year
+    mo = int(month) if month else today.month
+
+    snapshot = (
+        db.query(DashboardSnapshot)
+        .filter(
+            DashboardSnapshot.owner_id == user_id,
+            DashboardSnapshot.month_year == f"{yr}-{mo:02d}",
+        )
+        .first()
+    )
+    if snapshot and snapshot.payload.get("version") == SNAPSHOT_VERSION:
+        return snapshot.payload
+    if db.info.get("read_only"):
+        return build_dashboard_snapshot(db, user_id, yr, mo)
+    return save_dashboard_snapshot(db, user_id, yr, mo)
+
+
+def invalidate_dashboard_snapshots(db, user_id):
+    """Drops a user's snapshots; call before committing any installment/card change."""
+    db.query(DashboardSnapshot).filter(DashboardSnapshot.owner_id == user_id).delete(
+        synchronize_session=False
+    )
+
+
+def snapshot_months(months_ahead=2, start=None):
+    """Yields (year, month) for the current month and the following ones."""
+    first = (start or date.today()).replace(day=1)
+    for i in range(months_ahead):
+        target = first + relativedelta(months=i)
+        yield target.year, target.month
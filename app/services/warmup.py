@@ -0,0 +1,198 @@
+"""
+Warm-up at startup and just before each month rolls over.
+
+A fresh worker otherwise pays for everything on its first requests: compiling every
+Jinja template, opening database connections (and attaching the SQLite archive), the
+Google OpenID metadata fetch, and each user's dashboard snapshot for the month. The
+startup pass does all of that before the worker takes traffic, for users who changed
+something in the last WARMUP_ACTIVE_DAYS days (from ledger_events; at most
+WARMUP_MAX_USERS of them, most recent first).
+
+On the 1st every user's snapshot for the new month is a miss. RolloverWarmer sleeps
+until WARMUP_ROLLOVER_LEAD_MINUTES before midnight on the last day of the month and
+computes the coming month's snapshots for the same users, so the first request after
+midnight is a hit. Like the reminder scheduler it runs per worker process; a snapshot
+another worker already wrote is simply read back.
+"""
+import asyncio
+import os
+import time
+from datetime import date, datetime as dt, time as dt_time, timedelta
+from typing import Optional
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import func, text
+
+from app.models import LedgerEvent, User
+
+WARMUP_ENABLED = os.getenv("WARMUP", "1") != "0"
+WARMUP_ACTIVE_DAYS = int(os.getenv("WARMUP_ACTIVE_DAYS", "14"))
+WARMUP_MAX_USERS = int(os.getenv("WARMUP_MAX_USERS", "200"))
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "5"))
+WARMUP_ROLLOVER_LEAD_MINUTES = int(os.getenv("WARMUP_ROLLOVER_LEAD_MINUTES", "15"))
+OAUTH_METADATA_TIMEOUT = 5
+
+
+def compile_templates(env):
+    """Loads every HTML template into the environment's cache; returns how many."""
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def prime_pool(engine, connections=WARMUP_CONNECTIONS):
+    """Opens up to the pool's size of connections at once and returns them to the pool."""
+    size = getattr(engine.pool, "size", lambda: 1)()
+    opened = []
+    try:
+        for _ in range(max(1, min(connections, size))):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+def recently_active_user_ids(db, days=WARMUP_ACTIVE_DAYS, limit=WARMUP_MAX_USERS):
+    """Active users with ledger events in the last ``days`` days, most recent first."""
+    since = dt.now() - timedelta(days=days)
+    last_event = func.max(LedgerEvent.id).label("last_event")
+    rows = (
+        db.query(LedgerEvent.owner_id, last_event)
+        .join(User, User.id == LedgerEvent.owner_id)
+        .filter(LedgerEvent.occurred_at >= since, User.is_active == True)
+        .group_by(LedgerEvent.owner_id)
+        .order_by(last_event.desc())
+        .limit(limit)
+    )
+    return [row.owner_id for row in rows]
+
+
+def warm_user_stats(session_factory, months, user_ids=None):
+    """
+    Reads (computing on a miss) each user's dashboard snapshot for the given months and
+    their cached reference lists. Returns (users warmed, failures).
+    """
+    from app.services.reference import get_user_cards, get_user_categories, get_user_payees
+    from app.services.snapshot import get_dashboard_summary
+
+    db = session_factory()
+    warmed, failed = 0, 0
+    try:
+        if user_ids is None:
+            user_ids = recently_active_user_ids(db)
+        for user_id in user_ids:
+            try:
+                for year, month in months:
+                    get_dashboard_summary(db, user_id, year, month)
+                get_user_cards(db, user_id)
+                get_user_payees(db, user_id)
+                get_user_categories(db, user_id)
+                warmed += 1
+            except Exception as e:
+                # One user's failure shouldn't stop the rest from warming
+                db.rollback()
+                failed += 1
+                print(f"⚠️ Warm-up for user {user_id} failed: {e}")
+    finally:
+        db.close()
+    return warmed, failed
+
+
+async def load_oauth_metadata():
+    """Fetches Google's OpenID configuration once, if Google sign-in is configured."""
+    from app.core.auth import oauth, GOOGLE_CLIENT_ID
+
+    if not GOOGLE_CLIENT_ID:
+        return False
+    try:
+        await asyncio.wait_for(oauth.google.load_server_metadata(), OAUTH_METADATA_TIMEOUT)
+        return True
+    except Exception as e:
+        print(f"⚠️ Google OAuth metadata not loaded: {e}")
+        return False
+
+
+async def warm_up(today=None):
+    """Startup pass; blocking work runs in a thread so the OAuth fetch overlaps it."""
+    if not WARMUP_ENABLED:
+        return
+    from app.core.ui import templates
+    from app.database import engine, read_engine, SessionLocal
+
+    started = time.perf_counter()
+    today = today or date.today()
+
+    def blocking():
+        compiled = compile_templates(templates.env)
+        pooled = prime_pool(engine)
+        if read_engine is not engine:
+            pooled += prime_pool(read_engine)
+        warmed, failed = warm_user_stats(SessionLocal, [(today.year, today.month)])
+        return compiled, pooled, warmed, failed
+
+    (compiled, pooled, warmed, failed), oauth_loaded = await asyncio.gather(
+        asyncio.to_thread(blocking), load_oauth_metadata()
+    )
+    print(
+        f"✅ Warm-up: {compiled} templates, {pooled} connections, {warmed} users"
+        f"{f' ({failed} failed)' if failed else ''}"
+        f"{', OAuth metadata' if oauth_loaded else ''} in {time.perf_counter() - started:.2f}s"
+    )
+
+
+def next_rollover(now, lead=timedelta(minutes=WARMUP_ROLLOVER_LEAD_MINUTES)):
+    """When to warm the month after ``now``'s: ``lead`` before its first midnight."""
+    next_month = now.date().replace(day=1) + relativedelta(months=1)
+    return dt.combine(next_month, dt_time.min) - lead, next_month
+
+
+class RolloverWarmer:
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running or not WARMUP_ENABLED:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def warm_month(self, month_start):
+        from app.database import SessionLocal
+
+        warmed, failed = await asyncio.to_thread(
+            warm_user_stats, self.session_factory or SessionLocal, [(month_start.year, month_start.month)]
+        )
+        print(f"✅ Rollover warm-up for {month_start:%Y-%m}: {warmed} users, {failed} failed")
+
+    async def _run(self):
+        while True:
+            fire_at, month_start = next_rollover(dt.now())
+            delay = (fire_at - dt.now()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await self.warm_month(month_start)
+            except Exception as e:
+                print(f"⚠️ Rollover warm-up failed: {e}")
+            # Past midnight, so the next_rollover() above points at the following month
+            await asyncio.sleep(max((dt.combine(month_start, dt_time.min) - dt.now()).total_seconds(), 0) + 1)
+
+
+rollover_warmer = RolloverWarmer()
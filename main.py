@@ -1,5 +1,5 @@
+import os
 from fastapi import FastAPI, Request, Depends
-from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 from datetime import datetime as dt
 
@@ -11,7 +11,8 @@ from app.models.base import Base
 # This fixes the NameError for CashFlow and Installment in your index function
 from app.models import CashFlow, Installment
 
-from app.services.debt import calculate_monthly_totals
+from app.services.dashboard import get_dashboard_data
+from app.services.budget import get_budget_status, setup_budgets
 
 # REMOVED top-level metadata creation: it's now in startup_event
 
@@ -22,12 +23,22 @@ from app.routes import (
     cashflow_router,
     auth_router,
     reports_router,
+    events_router,
+    search_router,
+    api_router,
+    admin_router,
+    calendar_router,
 )
 
 from starlette.middleware.sessions import SessionMiddleware
-from app.core.auth import get_current_user, SECRET_KEY
+from app.core.auth import SECRET_KEY
+from app.core.middleware import AuthMiddleware, PathScopedMiddleware, SESSION_PATHS
 
 from app.core.ui import templates
+from app.core.compression import CompressionMiddleware
+from app.core.memprof import MemoryProfileMiddleware
+from app.core.static import static_files
+from app.core.budget import query_budget
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
 app = FastAPI(title="Salapi")
@@ -35,82 +46,95 @@ app = FastAPI(title="Salapi")
 # Handle proxy headers for HTTPS redirection (critical for Railway/Render)
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
 
-# Required for Google OAuth state tracking
-app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+# Required for Google OAuth state tracking; no other route reads the session
+app.add_middleware(
+    PathScopedMiddleware, paths=SESSION_PATHS, middleware=SessionMiddleware, secret_key=SECRET_KEY
+)
 
-# Middleware to add current_user to all template contexts
-@app.middleware("http")
-async def add_user_to_request(request: Request, call_next):
-    # Use a direct session to ensure it gets closed properly in finally block
-    db: Session = SessionLocal()
-    try:
-        user = await get_current_user(request, db)
-        request.state.user = user
-
-        # Public paths that don't require login
-        public_paths = ["/login", "/register", "/auth", "/static", "/favicon.ico"]
-        
-        is_public = any(request.url.path.startswith(path) for path in public_paths)
-        
-        if not user and not is_public:
-            return RedirectResponse(url="/login", status_code=303)
-            
-        response = await call_next(request)
-        return response
-    finally:
-        db.close()
+# Sets request.state.user (current_user in templates) and turns away anonymous requests
+app.add_middleware(AuthMiddleware)
+
+# Samples per-route peak allocation only while switched on from /admin/memory
+app.add_middleware(MemoryProfileMiddleware)
+
+# Outermost, so every page, fragment and static file passes through it.
+# Fragments under the threshold (toasts, small OOB swaps) are sent uncompressed.
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESS_MIN_SIZE", "1400")))
 
 # Standardize templates to always include current_user
 templates.env.globals["current_user"] = None # Placeholder
 
 
 from app.seed import seed_db
+from app.services.search import setup_search_index
+from app.services.lifecycle import setup_lifecycle
+from app.services.debt import setup_card_statuses
+from app.services.partitions import setup_partitions
+from app.services.reminders import scheduler as reminder_scheduler
+from app.services.ledger import setup_ledger
+from app.services.warmup import warm_up, rollover_warmer
 
 @app.on_event("startup")
 async def startup_event():
     # Attempt to create tables on startup - more resilient for cloud environments
     try:
         Base.metadata.create_all(bind=engine)
+        setup_search_index(engine)
+        setup_lifecycle(engine, SessionLocal)
+        setup_card_statuses(engine)
+        setup_partitions(engine)
         seed_db()
+        setup_ledger(SessionLocal)
+        setup_budgets(SessionLocal)
     except Exception as e:
         print(f"⚠️ Startup DB Warning: {e}")
+    # Before taking traffic: templates, connections, OAuth metadata, active users' stats
+    try:
+        await warm_up()
+    except Exception as e:
+        print(f"⚠️ Warm-up Warning: {e}")
+    reminder_scheduler.start()
+    rollover_warmer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await reminder_scheduler.stop()
+    await rollover_warmer.stop()
 
 
 # ... router includes ...
+app.mount("/static", static_files, name="static")
 app.include_router(installments_router)
 app.include_router(forecast_router)
 app.include_router(settings_router)
 app.include_router(cashflow_router)
 app.include_router(auth_router)
 app.include_router(reports_router)
+app.include_router(events_router)
+app.include_router(search_router)
+app.include_router(api_router)
+app.include_router(admin_router)
+app.include_router(calendar_router)
 
 
 @app.get("/")
+@query_budget(5)
 async def index(request: Request, db: Session = Depends(get_db)):
     user = request.state.user
-    stats = calculate_monthly_totals(db, user_id=user.id)
-    
-    recent_cashflow = (
-        db.query(CashFlow)
-        .filter(CashFlow.owner_id == user.id)
-        .order_by(CashFlow.id.desc())
-        .limit(5)
-        .all()
-    )
-    active_installments = (
-        db.query(Installment)
-        .filter(Installment.owner_id == user.id, Installment.status == "active")
-        .all()
-    )
+    dashboard = get_dashboard_data(db, user.id)
+    budgets = get_budget_status(db, user.id)
 
     from app.core.ui import render_template
     return render_template(
         "index.html",
         request,
         {
-            "recent_cashflow": recent_cashflow,
-            "installments": active_installments,
+            "recent_cashflow": dashboard["recent_cashflow"],
+            "installments": dashboard["installments"],
             "now": dt.now(),
-            **stats,
+            "budgets": budgets,
+            "budget_label": dt.now().strftime("%B %Y"),
+            **dashboard["stats"],
         },
     )
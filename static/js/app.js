@@ -0,0 +1,93 @@
+function checkToastCookie() {
+  const match = document.cookie.match(/(^| )toast_msg=([^;]+)/);
+  if (match) {
+    const msg = decodeURIComponent(match[2].replace(/\+/g, ' '));
+    const toast = document.getElementById('toast-container');
+    toast.innerHTML = `
+        <div class="fixed bottom-6 right-6 bg-slate-900 border border-slate-700 text-white px-6 py-4 rounded-xl shadow-2xl font-black text-sm animate-fade-in z-[100] flex items-center gap-3 shadow-emerald-900/20">
+            <span class="text-xl">✨</span> ${msg}
+        </div>
+    `;
+    document.cookie = "toast_msg=; expires=Thu, 01 Jan 1970 00:00:00 UTC; path=/;";
+
+    setTimeout(() => {
+      if (toast.firstChild) {
+        toast.firstChild.style.opacity = '0';
+        toast.firstChild.style.transform = 'translateY(10px)';
+        toast.firstChild.style.transition = 'all 0.3s ease-out';
+        setTimeout(() => { toast.innerHTML = ""; }, 300);
+      }
+    }, 3500);
+  }
+}
+
+// Process toasts on regular page load
+document.addEventListener('DOMContentLoaded', checkToastCookie);
+
+// Process toasts after HTMX seamless swaps
+document.body.addEventListener('htmx:afterOnLoad', function (evt) {
+  checkToastCookie();
+});
+
+// Mobile Menu Toggle
+const menuToggle = document.getElementById('mobile-menu-toggle');
+const closeBtn = document.getElementById('mobile-close-btn');
+const navContent = document.getElementById('nav-content');
+const backdrop = document.getElementById('mobile-backdrop');
+const menuIcon = document.getElementById('menu-icon');
+const closeIcon = document.getElementById('close-icon');
+
+if (menuToggle && navContent && backdrop) {
+  function openMobileMenu() {
+    navContent.classList.remove('translate-x-full');
+    navContent.classList.add('translate-x-0');
+    backdrop.classList.remove('hidden');
+    setTimeout(() => backdrop.classList.add('opacity-100'), 10);
+    menuIcon.classList.add('hidden');
+    closeIcon.classList.remove('hidden');
+    document.body.style.overflow = 'hidden';
+
+    // Trigger staggered animation
+    const navItems = navContent.querySelectorAll('.nav-item');
+    navItems.forEach((item, index) => {
+      item.style.animationDelay = `${(index + 1) * 0.1}s`;
+      item.classList.add('nav-item-active');
+    });
+  }
+
+  function closeMobileMenu() {
+    navContent.classList.add('translate-x-full');
+    navContent.classList.remove('translate-x-0');
+    backdrop.classList.remove('opacity-100');
+    menuIcon.classList.remove('hidden');
+    closeIcon.classList.add('hidden');
+    document.body.style.overflow = '';
+    setTimeout(() => {
+      backdrop.classList.add('hidden');
+      // Reset animations
+      const navItems = navContent.querySelectorAll('.nav-item');
+      navItems.forEach(item => {
+        item.classList.remove('nav-item-active');
+      });
+    }, 300);
+  }
+
+  menuToggle.addEventListener('click', () => {
+    const isOpen = navContent.classList.contains('translate-x-0');
+    if (!isOpen) {
+      openMobileMenu();
+    } else {
+      closeMobileMenu();
+    }
+  });
+
+  if (closeBtn) closeBtn.addEventListener('click', closeMobileMenu);
+  backdrop.addEventListener('click', closeMobileMenu);
+
+  // Close menu if a link is clicked (useful for anchors)
+  navContent.querySelectorAll('a').forEach(link => {
+    link.addEventListener('click', () => {
+      if (window.innerWidth < 768) closeMobileMenu();
+    });
+  });
+}